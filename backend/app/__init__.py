@@ -6,11 +6,14 @@ import os
 from pathlib import Path
 
 from flask import Flask
-from sqlalchemy.exc import IntegrityError
+from werkzeug.middleware.proxy_fix import ProxyFix
 
+from app.bootstrap import bootstrap, load_password_cost
 from app.config import Config
 from app.extensions import db, cors, limiter
-from app.models import User
+from app.utils import admission, auth, leases, metrics, passwords, query_budget, timing
+from app.utils.query_stats import QueryStats
+from app import counting, facets, file_reaper, folders, response_cache, tags, usage  # noqa: F401  registers painting change handlers
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,31 +27,51 @@ def create_app(config_class: type[Config] | None = None) -> Flask:
     app = Flask(__name__, static_folder=None)
     app.config.from_object(config_class or Config())
     
+    # Behind nginx the client address comes from X-Forwarded-For, trusting only our own hops
+    hops = app.config.get("TRUSTED_PROXY_HOPS", 0)
+    if hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+    
     # Create required directories
     _ensure_storage_dirs(app)
     
     # Initialize extensions
     db.init_app(app)
     cors.init_app(app)
-    limiter.init_app(app)
     
-    # Create database tables
     with app.app_context():
+        # First, so request timings include every other hook
+        metrics.init_app(app, db.engine)
+        timing.init_app(app, db.engine)
+        QueryStats().init_app(app, db.engine)
+    counting.init_app(app)
+    auth.init_app(app)
+    limiter.init_app(app)  # after auth: signed-in users spend their own budget
+    with app.app_context():
+        # Registered after the middleware so budgets cover only what views issue
+        query_budget.init_app(app, db.engine)
+    leases.init_app(app)
+    passwords.init_app(app)
+    admission.init_app(app)
+    response_cache.init_app(app)
+    
+    # Create and upgrade the database once; later boots only check its version
+    if app.config.get("AUTO_BOOTSTRAP", True):
         try:
-            db.create_all()
-            logger.info("Database tables created/verified")
+            bootstrap(app)
         except Exception as e:
-            logger.error(f"Failed to create database tables: {e}")
+            logger.error(f"Failed to bootstrap database: {e}")
+    # Every worker hashes with the cost calibrated once at bootstrap
+    load_password_cost(app)
     
     # Register blueprints
     _register_blueprints(app)
     
-    # Seed default user
-    with app.app_context():
-        _seed_default_user()
+    file_reaper.init_app(app)
     
     # Health check route
     @app.get("/api/health")
+    @limiter.exempt
     def health():
         return {"status": "ok"}, 200
     
@@ -61,6 +84,7 @@ def _ensure_storage_dirs(app: Flask) -> None:
         app.config.get("IMAGE_DIR"),
         app.config.get("THUMBNAIL_DIR"),
         app.config.get("DB_DIR"),
+        app.config.get("UPLOAD_DIR"),
     ]
     for dir_path in dirs:
         if dir_path:
@@ -73,32 +97,20 @@ def _register_blueprints(app: Flask) -> None:
     from app.api.users import users_bp
     from app.api.paintings import paintings_bp
     from app.api.media import media_bp
+    from app.api.search import search_bp
+    from app.api.tags import tags_bp
+    from app.api.facets import facets_bp
+    from app.api.folders import folders_bp
+    from app.api.admin import admin_bp
+    from app.api.uploads import uploads_bp
     
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(users_bp, url_prefix="/api/users")
     app.register_blueprint(paintings_bp, url_prefix="/api/paintings")
     app.register_blueprint(media_bp, url_prefix="/media")
-
-
-def _seed_default_user() -> None:
-    """Create default user if not exists."""
-    if User.query.first():
-        return
-    
-    try:
-        user = User(
-            username="demo",
-            email="demo@canvas3t.local"
-        )
-        user.set_password("demo123456")
-        db.session.add(user)
-        db.session.commit()
-        logger.info("Default user 'demo' created")
-    except IntegrityError:
-        db.session.rollback()
-        logger.info("Default user already exists")
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Failed to seed default user: {e}")
-
-
+    app.register_blueprint(search_bp, url_prefix="/api/search")
+    app.register_blueprint(tags_bp, url_prefix="/api/tags")
+    app.register_blueprint(facets_bp, url_prefix="/api/facets")
+    app.register_blueprint(folders_bp, url_prefix="/api/folders")
+    app.register_blueprint(admin_bp, url_prefix="/api/admin")
+    app.register_blueprint(uploads_bp, url_prefix="/api/uploads")
@@ -0,0 +1,88 @@
+"""Helpers for incrementally maintained counter tables."""
+from __future__ import annotations
+
+import importlib
+
+from sqlalchemy import and_, bindparam, delete, insert, select, tuple_, update
+
+# Dialects with INSERT ... ON CONFLICT
+UPSERT_DIALECTS = ("sqlite", "postgresql")
+
+
+def upsert_insert(connection):
+    """The dialect's ``insert()`` supporting ``on_conflict_*``, or None.
+
+    Imported on first use so only the dialect in use gets loaded.
+    """
+    name = connection.dialect.name
+    if name not in UPSERT_DIALECTS:
+        return None
+    return importlib.import_module(f"sqlalchemy.dialects.{name}").insert
+
+
+def apply_deltas(connection, table, key_columns: tuple[str, ...], deltas: dict) -> None:
+    """Add ``deltas`` to counter rows of ``table``, creating missing rows.
+
+    ``deltas`` maps a key tuple (values for ``key_columns``) to a dict of
+    ``{counter_column: increment}``. Existing rows are updated in place with
+    ``column = column + increment`` so concurrent writers never lose counts;
+    missing rows are inserted with the increments as initial values. SQLite
+    and PostgreSQL do both in a single ``INSERT ... ON CONFLICT`` statement;
+    other databases select the existing keys first.
+    """
+    deltas = {key: values for key, values in deltas.items() if any(values.values())}
+    if not deltas:
+        return
+    counters = sorted({column for values in deltas.values() for column in values})
+    rows = [
+        {**dict(zip(key_columns, key)), **{c: deltas[key].get(c, 0) for c in counters}}
+        for key in deltas
+    ]
+
+    upsert = upsert_insert(connection)
+    if upsert is not None:
+        # One statement per batch, atomic per row under concurrent writers
+        stmt = upsert(table)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_={c: table.c[c] + stmt.excluded[c] for c in counters},
+            ),
+            rows,
+        )
+        return
+
+    keys = [table.c[name] for name in key_columns]
+    existing = set(connection.execute(
+        select(*keys).where(tuple_(*keys).in_(list(deltas)))
+    ).all())
+
+    updates = [
+        {**_key_params(key_columns, key), **{f"d_{c}": deltas[key].get(c, 0) for c in counters}}
+        for key in deltas if key in existing
+    ]
+    if updates:
+        connection.execute(
+            update(table)
+            .where(and_(*(column == bindparam(f"k_{column.name}") for column in keys)))
+            .values({c: table.c[c] + bindparam(f"d_{c}") for c in counters}),
+            updates,
+        )
+
+    inserts = [row for key, row in zip(deltas, rows) if key not in existing]
+    if inserts:
+        connection.execute(insert(table), inserts)
+
+
+def prune_empty(connection, table, key_columns: tuple[str, ...], keys, counter: str) -> None:
+    """Delete rows among ``keys`` whose ``counter`` dropped to zero."""
+    keys = list(keys)
+    if keys:
+        key_cols = [table.c[name] for name in key_columns]
+        connection.execute(
+            delete(table).where(tuple_(*key_cols).in_(keys), table.c[counter] <= 0)
+        )
+
+
+def _key_params(key_columns, key) -> dict:
+    return {f"k_{name}": value for name, value in zip(key_columns, key)}
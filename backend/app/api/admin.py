@@ -0,0 +1,59 @@
+"""Admin/diagnostics API endpoints."""
+import hmac
+
+from flask import Blueprint, current_app, jsonify, request
+
+admin_bp = Blueprint("admin", __name__)
+
+SLOW_QUERY_SORTS = ('total_ms', 'max_ms', 'mean_ms', 'p95_ms', 'count', 'slow_count')
+
+
+@admin_bp.before_request
+def _require_admin_token():
+    expected = current_app.config.get('ADMIN_TOKEN', '')
+    if not expected:
+        return jsonify({'error': 'Admin endpoints are disabled'}), 403
+    supplied = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(supplied, expected):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+
+@admin_bp.get("/slow-queries")
+def slow_queries():
+    """Top-N query shapes by latency, with plans for slow ones."""
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+    sort = request.args.get('sort', 'total_ms')
+    if sort not in SLOW_QUERY_SORTS:
+        return jsonify({'error': f'sort must be one of: {", ".join(SLOW_QUERY_SORTS)}'}), 400
+    stats = current_app.extensions['query_stats']
+    return jsonify({
+        'slow_query_ms': stats.slow_ms,
+        'queries': stats.top(limit, sort)
+    }), 200
+
+
+@admin_bp.delete("/slow-queries")
+def reset_slow_queries():
+    """Clear collected query statistics."""
+    current_app.extensions['query_stats'].reset()
+    return jsonify({'message': 'Query statistics reset'}), 200
+
+
+@admin_bp.get("/cache")
+def cache_stats():
+    """Response cache hit rate and size."""
+    return jsonify(current_app.extensions['response_cache'].stats()), 200
+
+
+@admin_bp.delete("/cache")
+def clear_cache():
+    """Drop every cached response and reset the counters."""
+    current_app.extensions['response_cache'].clear()
+    return jsonify({'message': 'Response cache cleared'}), 200
+
+
+@admin_bp.get("/admission")
+def admission_stats():
+    """Image decode slots, memory reservations and wait-queue counters."""
+    return jsonify(current_app.extensions['admission'].stats()), 200
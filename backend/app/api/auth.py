@@ -1,9 +1,11 @@
 """Authentication API endpoints."""
-from flask import Blueprint, jsonify, request, current_app
-from itsdangerous import URLSafeTimedSerializer
+from flask import Blueprint, current_app, g, jsonify, request
 
 from ..extensions import db
 from ..models import User
+from ..utils.auth import issue_token
+from ..utils.passwords import HasherBusy, hasher
+from ..utils.query_budget import query_budget
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -39,9 +41,7 @@ def register():
         db.session.commit()
         
         # Generate token
-        secret = current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret')
-        serializer = URLSafeTimedSerializer(secret)
-        token = serializer.dumps({'user_id': user.id, 'username': user.username})
+        token = issue_token(user)
         
         return jsonify({
             'message': 'User registered successfully',
@@ -51,12 +51,16 @@ def register():
             'user': user.to_dict()
         }), 201
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
 
 
 @auth_bp.post("/login")
+@query_budget(3)
 def login():
     """Login user and return token."""
     try:
@@ -74,10 +78,14 @@ def login():
         if not user or not user.check_password(password):
             return jsonify({'error': 'Invalid username or password'}), 401
         
+        # Upgrade hashes made with older (weaker) parameters while we have the password
+        if hasher().needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
+            current_app.extensions['auth'].forget_user(user.id)
+        
         # Generate token using application SECRET_KEY so tokens persist across restarts
-        secret = current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret')
-        serializer = URLSafeTimedSerializer(secret)
-        token = serializer.dumps({'user_id': user.id, 'username': user.username})
+        token = issue_token(user)
         
         return jsonify({
             'message': 'Login successful',
@@ -85,27 +93,27 @@ def login():
             'user': user.to_dict()
         }), 200
     
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Login failed: {str(e)}'}), 500
 
 
 @auth_bp.post("/verify")
+@query_budget(1)
 def verify_token():
     """Verify token validity."""
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-
-        if not token:
+        if not request.headers.get('Authorization'):
             return jsonify({'error': 'No token provided'}), 400
 
-        # Use app SECRET_KEY to validate token
-        secret = current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret')
-        serializer = URLSafeTimedSerializer(secret)
-        data = serializer.loads(token, max_age=86400*7)  # 7 days
-        user = User.query.get(data['user_id'])
-        
+        user = g.current_user
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            if g.auth_error == 'User not found':
+                return jsonify({'error': 'User not found'}), 404
+            return jsonify({'error': 'Token verification failed'}), 401
         
         return jsonify({
             'valid': True,
@@ -115,4 +123,3 @@ def verify_token():
     except Exception as e:
         return jsonify({'error': 'Token verification failed'}), 401
 
-
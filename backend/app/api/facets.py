@@ -0,0 +1,101 @@
+"""Facet API endpoints."""
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func, select
+
+from ..extensions import db
+from ..facets import read_facets
+from ..models import Painting, Tag, User, painting_tags
+from ..painting_events import scope_for
+from ..response_cache import cached_response
+from ..tags import filter_by_tags, parse_tags
+from ..utils.query_budget import query_budget
+
+facets_bp = Blueprint("facets", __name__)
+
+
+@facets_bp.get("")
+@query_budget(4)
+@cached_response(lambda: scope_for(request.args.get('user_id', type=int)))
+def get_facets():
+    """Counts per format, folder and tag for the current gallery filters.
+
+    Accepts the same ``user_id``, ``folder``, ``tag``/``tag_mode`` and
+    ``format`` filters as the listing. Scope, folder and format are served
+    from the maintained ``facet_counts`` table; tag filters narrow through
+    the tag index and group at most ``FACET_NARROW_MAX_ROWS`` of the newest
+    matches (``truncated`` says when there were more).
+    """
+    try:
+        user_id = request.args.get('user_id', type=int)
+        folder = request.args.get('folder', '').strip()
+        tag_names = parse_tags(','.join(request.args.getlist('tag')))
+        match_all = request.args.get('tag_mode', 'all').strip().lower() != 'any'
+        image_format = request.args.get('format', '').strip().lower()
+        tag_limit = min(max(request.args.get('tag_limit', 50, type=int), 1), 200)
+
+        if user_id and not User.query.get(user_id):
+            return jsonify({'error': 'User not found'}), 404
+
+        if not tag_names:
+            return jsonify(read_facets(scope_for(user_id), folder, image_format, tag_limit=tag_limit)), 200
+
+        return jsonify(_narrowed_facets(
+            user_id, folder, tag_names, match_all, image_format, tag_limit
+        )), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch facets: {str(e)}'}), 500
+
+
+def _narrowed_facets(user_id, folder, tag_names, match_all, image_format, tag_limit):
+    max_rows = current_app.config.get('FACET_NARROW_MAX_ROWS', 5000)
+
+    def matching(*, with_folder):
+        query = db.session.query(Painting.id)
+        if user_id:
+            query = query.filter(Painting.user_id == user_id)
+        else:
+            query = query.filter(Painting.is_public == True)  # noqa: E712
+        if with_folder and folder:
+            query = query.filter(Painting.folder == folder)
+        if image_format:
+            query = query.filter(func.lower(Painting.format) == image_format)
+        query = filter_by_tags(query, tag_names, match_all=match_all)
+        return query.order_by(Painting.id.desc()).limit(max_rows).subquery()
+
+    in_folder, in_scope = matching(with_folder=True), matching(with_folder=False)
+
+    def scoped(query, *, with_folder=True):
+        ids = in_folder if with_folder else in_scope
+        return query.filter(Painting.id.in_(select(ids.c.id)))
+
+    fmt = func.lower(Painting.format)
+    formats = scoped(db.session.query(fmt, func.count())).group_by(fmt).all()
+    folders = scoped(
+        db.session.query(Painting.folder, func.count()), with_folder=False
+    ).group_by(Painting.folder).all()
+    count = func.count().label('count')
+    tags = (
+        scoped(db.session.query(Tag.name, count)
+               .select_from(Painting)
+               .join(painting_tags, painting_tags.c.painting_id == Painting.id)
+               .join(Tag, Tag.id == painting_tags.c.tag_id))
+        .group_by(Tag.name)
+        .order_by(count.desc(), Tag.name)
+        .limit(tag_limit)
+        .all()
+    )
+
+    def items(rows):
+        return sorted(
+            ({'value': value or '', 'count': n} for value, n in rows),
+            key=lambda item: (-item['count'], item['value']),
+        )
+
+    total = sum(n for _, n in formats)
+    return {
+        'total': total,
+        'truncated': total >= max_rows,
+        'format': items(formats),
+        'folder': items(folders),
+        'tag': [{'value': name, 'count': n} for name, n in tags],
+    }
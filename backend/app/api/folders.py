@@ -0,0 +1,98 @@
+"""Folder API endpoints."""
+from flask import Blueprint, current_app, jsonify, request
+
+from ..bulk import relocate_paintings
+from ..extensions import db
+from ..folders import folder_tree
+from ..models import Painting, User
+from ..painting_events import scope_for
+from ..response_cache import cached_response
+from ..utils.auth import current_user_id, login_required
+from ..utils.layout import RelocationError
+from ..utils.query_budget import query_budget
+
+folders_bp = Blueprint("folders", __name__)
+
+
+@folders_bp.get("")
+@query_budget(2)
+@cached_response(lambda: scope_for(request.args.get('user_id', type=int)))
+def get_folder_tree():
+    """Folder tree with counts, bytes and latest thumbnails.
+
+    Scoped like the listing: a user's folders with ``user_id``, otherwise the
+    public space.
+    """
+    try:
+        user_id = request.args.get('user_id', type=int)
+        if user_id and not User.query.get(user_id):
+            return jsonify({'error': 'User not found'}), 404
+        scope = scope_for(user_id)
+        return jsonify({'scope': scope, 'tree': folder_tree(scope)}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch folders: {str(e)}'}), 500
+
+
+@folders_bp.patch("")
+@query_budget(24)
+@login_required
+def update_folder():
+    """Rename/move a folder (with its subfolders) or change its visibility.
+
+    Body: ``{"path": "...", "new_path": "...", "is_public": bool}``; either
+    change is optional. Applies to the authenticated user's paintings and
+    moves their files with renames instead of copies.
+    """
+    try:
+        user_id = current_user_id()
+        data = request.get_json(silent=True) or {}
+        path = str(data.get('path') or '').strip().strip('/')
+        new_path = data.get('new_path')
+        if new_path is not None:
+            new_path = str(new_path).strip().strip('/')
+            if not new_path:
+                return jsonify({'error': 'new_path must not be empty'}), 400
+            if path and (new_path + '/').startswith(path + '/'):
+                return jsonify({'error': 'Cannot move a folder into itself'}), 400
+            if not path:
+                return jsonify({'error': 'The root folder cannot be renamed'}), 400
+        values = {}
+        if 'is_public' in data:
+            values['is_public'] = str(data['is_public']).strip().lower() in ('true', '1', 'yes', 'on')
+        if new_path is None and not values:
+            return jsonify({'error': 'No changes given'}), 400
+
+        in_folder = Painting.folder == path
+        if path:
+            in_folder = in_folder | Painting.folder.startswith(path + '/', autoescape=True)
+        rows = db.session.execute(
+            db.select(Painting.id, Painting.folder)
+            .where(Painting.user_id == user_id, in_folder)
+        ).all()
+        if not rows:
+            return jsonify({'error': 'Folder not found'}), 404
+        ids = [row.id for row in rows]
+        per_row = None
+        if new_path is not None:
+            per_row = {row.id: {'folder': new_path + (row.folder or '')[len(path):]} for row in rows}
+
+        image_dir = current_app.config.get('IMAGE_DIR', '/app/images')
+        updated, relocation = relocate_paintings(db.session.connection(), image_dir, ids, values, per_row)
+        try:
+            db.session.commit()
+        except Exception:
+            relocation.undo()
+            raise
+        return jsonify({
+            'message': 'Folder updated',
+            'path': new_path if new_path is not None else path,
+            'updated': updated,
+        }), 200
+    except RelocationError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Folder update failed: {e}")
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Folder update failed: {e}")
+        return jsonify({'error': f'Folder update failed: {str(e)}'}), 500
@@ -2,6 +2,8 @@ from flask import Blueprint, send_file, current_app, jsonify
 import os
 import mimetypes
 
+from ..utils.timing import stage
+
 media_bp = Blueprint('media', __name__, url_prefix='/media')
 
 
@@ -12,16 +14,19 @@ def serve_image(filename):
         image_dir = current_app.config.get('IMAGE_DIR', '/app/images')
         file_path = os.path.join(image_dir, filename)
 
-        if not os.path.exists(file_path):
+        with stage('lookup'):
+            exists = os.path.exists(file_path)
+        if not exists:
             return jsonify({'error': 'Image not found'}), 404
 
         # Security: prevent path traversal
         if not os.path.abspath(file_path).startswith(os.path.abspath(image_dir)):
             return jsonify({'error': 'Access denied'}), 403
 
-        # Guess mimetype
+        # Guess mimetype; the body is streamed after the headers, so 'open' is the last stage timed
         mime_type, _ = mimetypes.guess_type(file_path)
-        return send_file(file_path, mimetype=mime_type or 'application/octet-stream')
+        with stage('open'):
+            return send_file(file_path, mimetype=mime_type or 'application/octet-stream')
 
     except Exception as e:
         return jsonify({'error': f'Failed to serve image: {str(e)}'}), 500
@@ -34,14 +39,17 @@ def download_image(filename):
         image_dir = current_app.config.get('IMAGE_DIR', '/app/images')
         file_path = os.path.join(image_dir, filename)
         
-        if not os.path.exists(file_path):
+        with stage('lookup'):
+            exists = os.path.exists(file_path)
+        if not exists:
             return jsonify({'error': 'Image not found'}), 404
         
         # Security: prevent path traversal
         if not os.path.abspath(file_path).startswith(os.path.abspath(image_dir)):
             return jsonify({'error': 'Access denied'}), 403
         
-        return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
+        with stage('open'):
+            return send_file(file_path, as_attachment=True, download_name=os.path.basename(file_path))
     
     except Exception as e:
         return jsonify({'error': f'Download failed: {str(e)}'}), 500
\ No newline at end of file
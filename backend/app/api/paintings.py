@@ -3,15 +3,31 @@ import os
 import uuid
 from pathlib import Path
 
-from flask import Blueprint, current_app, jsonify, request
-from PIL import Image
+from flask import Blueprint, current_app, g, jsonify, request
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
 from io import BytesIO
 from urllib.parse import urlparse
 
-from ..extensions import db
-from ..models import Painting, User
+from ..bulk import bulk_delete_paintings, relocate_paintings
+from ..counting import COUNT_MODES, count_paintings
+from ..extensions import db, limiter
+from ..file_reaper import wake_reaper
+from ..models import Painting, User, painting_list_query, painting_row_to_dict
+from ..painting_events import scope_for
+from ..response_cache import cached_response
+from ..tags import filter_by_tags, parse_tags
+from ..usage import check_quota
+from ..utils import admission
+from ..utils.admission import AdmissionRejected, decode_cost
+from ..utils.auth import current_user_id, login_required
+from ..utils.etags import not_modified, tagged, weak_etag
+from ..utils.layout import Relocation, RelocationError, relocated, storage_dir
+from ..utils.metrics import IMAGE_BYTES, IMAGE_PIXELS, image_stage
+from ..utils.pagination import InvalidCursor, after_cursor, decode_cursor, encode_cursor
+from ..utils.query_budget import query_budget
+from ..utils.rate_limit import bytes_cost, charge, ids_cost, pixels_cost, upload_cost
+from ..utils.timing import stage
 
 paintings_bp = Blueprint("paintings", __name__)
 
@@ -28,37 +44,16 @@ def save_image(file, username='anonymous', folder='', is_public=False):
     
     Public images are saved in /app/images/public/ folder.
     Private images are saved in /app/images/{username}/ folder.
+    See ``app.utils.layout`` for the full layout.
     """
     try:
         image_dir = current_app.config.get('IMAGE_DIR', '/app/images')
         os.makedirs(image_dir, exist_ok=True)
         
-        # Determine save location based on public status
-        if is_public:
-            # Public images go to /app/images/public/
-            user_folder = 'public'
-            user_dir = os.path.join(image_dir, user_folder)
-            os.makedirs(user_dir, exist_ok=True)
-            # Create subfolder for organization if provided
-            if folder:
-                folder_name = secure_filename(folder)
-                file_dir = os.path.join(user_dir, folder_name)
-                os.makedirs(file_dir, exist_ok=True)
-            else:
-                file_dir = user_dir
-        else:
-            # Private images go to /app/images/{username}/
-            user_folder = secure_filename(username)
-            user_dir = os.path.join(image_dir, user_folder)
-            os.makedirs(user_dir, exist_ok=True)
-            
-            # Create subfolder if provided
-            if folder:
-                folder_name = secure_filename(folder)
-                file_dir = os.path.join(user_dir, folder_name)
-                os.makedirs(file_dir, exist_ok=True)
-            else:
-                file_dir = user_dir
+        # Public images go to public/[folder]/, private ones to {username}/[folder]/
+        rel_dir = storage_dir(username, folder, is_public)
+        file_dir = os.path.join(image_dir, rel_dir)
+        os.makedirs(file_dir, exist_ok=True)
         
         # Generate prefix (UUID)
         prefix = str(uuid.uuid4())[:8]
@@ -72,29 +67,44 @@ def save_image(file, username='anonymous', folder='', is_public=False):
         filename = f"{prefix}_{name}{ext.lower()}"
         file_path = os.path.join(file_dir, filename)
         
-        # Save original
-        file.save(file_path)
+        # Read dimensions from the header only (Pillow is loaded on first upload, not at boot)
+        from PIL import Image
+        with stage('probe'), Image.open(file.stream) as probe:
+            width, height = probe.size
+            mode = probe.mode
+        file.stream.seek(0)
         
-        # Get image info
-        img = Image.open(file_path)
-        width, height = img.size
-        img_format = img.format or 'PNG'
+        # Wait for room to decode; refusals propagate to the view as 503/413
+        with admission.controller().admit(decode_cost(width, height, mode)):
+            # Save original
+            with image_stage('write'):
+                file.save(file_path)
+            with image_stage('decode'):
+                img = Image.open(file_path)
+                # Let JPEG decode at reduced scale, as thumbnail() would
+                img.draft(None, (400, 400))
+                img.load()
+            charge(pixels_cost(width, height))
+            
+            # Create thumbnail
+            thumb_filename = f"{prefix}_{name}_thumb.jpg"
+            thumb_path = os.path.join(file_dir, thumb_filename)
+            with image_stage('thumbnail'):
+                img.thumbnail((200, 200), Image.Resampling.LANCZOS)
+                if img.mode in ('RGBA', 'LA', 'P'):
+                    img = img.convert('RGB')
+            with image_stage('encode'):
+                img.save(thumb_path, 'JPEG', quality=85)
         
-        # Create thumbnail
-        thumb_filename = f"{prefix}_{name}_thumb.jpg"
-        thumb_path = os.path.join(file_dir, thumb_filename)
-        img.thumbnail((200, 200), Image.Resampling.LANCZOS)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            img = img.convert('RGB')
-        img.save(thumb_path, 'JPEG', quality=85)
+        file_size = os.path.getsize(file_path)
+        thumbnail_size = os.path.getsize(thumb_path)
+        IMAGE_BYTES.labels('in').inc(file_size)
+        IMAGE_BYTES.labels('out').inc(thumbnail_size)
+        IMAGE_PIXELS.observe(width * height)
         
         # Build relative paths
-        if folder:
-            rel_path = f"{user_folder}/{folder_name}/{filename}".replace('\\', '/')
-            thumb_rel_path = f"{user_folder}/{folder_name}/{thumb_filename}".replace('\\', '/')
-        else:
-            rel_path = f"{user_folder}/{filename}".replace('\\', '/')
-            thumb_rel_path = f"{user_folder}/{thumb_filename}".replace('\\', '/')
+        rel_path = f"{rel_dir}/{filename}"
+        thumb_rel_path = f"{rel_dir}/{thumb_filename}"
         
         return {
             'filename': rel_path,
@@ -102,14 +112,75 @@ def save_image(file, username='anonymous', folder='', is_public=False):
             'prefix': prefix,
             'width': width,
             'height': height,
-            'format': ext.lstrip('.').lower()
+            'format': ext.lstrip('.').lower(),
+            'file_size': file_size,
+            'thumbnail_size': thumbnail_size
         }
+    except AdmissionRejected:
+        raise
     except Exception as e:
         current_app.logger.error(f"Image save failed: {e}")
         return None
 
 
+def _upload_size(file):
+    """Size in bytes of an uploaded file, without reading it into memory."""
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def ingest_image(file, size, user_id, username, *, title, folder='', is_public=False,
+                 description='', tags='', source_url=None):
+    """Store ``file`` (``size`` bytes) as a new painting: quota, decode, thumbnail, row.
+
+    The one ingest path behind uploads, URL imports and finished chunked
+    uploads. Returns ``(painting, None)`` or ``(None, (message, status))``;
+    raises :class:`AdmissionRejected` when the decode is refused.
+    """
+    # Enforce storage quota before the image is decoded
+    with stage('quota'):
+        quota_error = check_quota(user_id, size)
+    if quota_error:
+        return None, (quota_error, 403)
+    
+    # Save image (with public folder segregation)
+    result = save_image(file, username=username, folder=folder, is_public=is_public)
+    if not result:
+        return None, ('Failed to save image', 500)
+    
+    painting = Painting(
+        user_id=user_id,
+        title=title,
+        description=description,
+        filename=result['filename'],
+        thumbnail=result['thumbnail'],
+        prefix=result['prefix'],
+        folder=folder,
+        width=result['width'],
+        height=result['height'],
+        format=result['format'],
+        file_size=result['file_size'],
+        thumbnail_size=result['thumbnail_size'],
+        is_public=is_public,
+        tags=tags,
+        source_url=source_url
+    )
+    db.session.add(painting)
+    with stage('commit'):
+        db.session.commit()
+    return painting, None
+
+
+def _import_cost():
+    return current_app.config.get('RATE_LIMIT_IMPORT_COST', 5)
+
+
 @paintings_bp.post("/import-url")
+@limiter.cost(_import_cost)
+@query_budget(24)
 def import_remote_image():
     """Import image from remote URL."""
     try:
@@ -126,8 +197,10 @@ def import_remote_image():
 
         # Download the image
         import requests as req_lib
-        response = req_lib.get(image_url, timeout=15)
+        with stage('fetch'):
+            response = req_lib.get(image_url, timeout=15)
         response.raise_for_status()
+        charge(bytes_cost(len(response.content)))
 
         # Determine filename from URL
         parsed = urlparse(image_url)
@@ -140,64 +213,42 @@ def import_remote_image():
         content_type = response.headers.get('Content-Type', 'application/octet-stream')
         file_storage = FileStorage(stream=file_stream, filename=filename, content_type=content_type)
 
-        # Determine user from Authorization header if present
-        user_id = None
-        username = 'anonymous'
-        auth_header = request.headers.get('Authorization', '')
-        if auth_header.startswith('Bearer '):
-            token = auth_header[7:]
-            try:
-                from itsdangerous import URLSafeTimedSerializer
-                serializer = URLSafeTimedSerializer(current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret'))
-                token_data = serializer.loads(token, max_age=7*24*3600)
-                user_id = token_data.get('user_id')
-            except Exception as e:
-                current_app.logger.warning(f"Token validation failed: {e}")
+        # Owner is the authenticated user, if any
+        user = g.current_user
+        user_id = user.id if user else None
+        username = user.username if user else 'anonymous'
 
-        if user_id:
-            user = User.query.get(user_id)
-            if user:
-                username = user.username
-
-        # Save the downloaded image into storage (with public segregation)
-        result = save_image(file_storage, username=username, folder=folder, is_public=is_public)
-        if not result:
-            return jsonify({'error': 'Failed to save imported image'}), 500
-
-        # Create painting record
-        painting = Painting(
-            user_id=user_id,
-            title=title,
-            description=payload.get('description', ''),
-            filename=result['filename'],
-            thumbnail=result['thumbnail'],
-            prefix=result['prefix'],
-            folder=folder,
-            width=result.get('width', 0),
-            height=result.get('height', 0),
-            format=result.get('format', 'png'),
-            is_public=is_public,
-            tags=tags,
-            source_url=image_url
+        painting, error = ingest_image(
+            file_storage, len(response.content), user_id, username,
+            title=title, folder=folder, is_public=is_public,
+            description=payload.get('description', ''), tags=tags, source_url=image_url,
         )
-
-        db.session.add(painting)
-        db.session.commit()
+        if error:
+            return jsonify({'error': error[0]}), error[1]
 
         return jsonify({
             'message': 'Imported and saved successfully',
             'painting': painting.to_dict()
         }), 201
     
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status, e.headers
     except Exception as e:
         current_app.logger.error(f"Import failed: {e}")
         return jsonify({'error': f'Import failed: {str(e)}'}), 500
 
 
 @paintings_bp.post("")
+@limiter.cost(upload_cost)
+@query_budget(24)
 def create_painting():
     """Upload and save a painting."""
     try:
+        # Receive and parse the multipart body up front, so its time is measured alone
+        with stage('read'):
+            request.files
+        
         # Get form data
         user_id = request.form.get('user_id', type=int)
         title = request.form.get('title', 'Untitled').strip()
@@ -207,18 +258,9 @@ def create_painting():
         description = request.form.get('description', '').strip()
         tags = request.form.get('tags', '').strip()
         
-        # Try to extract user_id from Bearer token if not provided in form
+        # Fall back to the authenticated user if not provided in form
         if not user_id:
-            from itsdangerous import URLSafeTimedSerializer
-            auth_header = request.headers.get('Authorization', '')
-            if auth_header.startswith('Bearer '):
-                token = auth_header[7:]
-                try:
-                    serializer = URLSafeTimedSerializer(current_app.config.get('SECRET_KEY', 'dev'))
-                    token_data = serializer.loads(token, max_age=7*24*3600)
-                    user_id = token_data.get('user_id')
-                except Exception as e:
-                    current_app.logger.warning(f"Token validation failed: {e}")
+            user_id = current_user_id()
         
         # Check file
         if 'image' not in request.files:
@@ -236,43 +278,29 @@ def create_painting():
         # Get or create user
         username = 'anonymous'
         if user_id:
-            user = User.query.get(user_id)
+            user = current_app.extensions['auth'].user(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
             username = user.username
         else:
             user_id = None
         
-        # Save image (with public folder segregation)
-        result = save_image(file, username=username, folder=folder, is_public=is_public)
-        if not result:
-            return jsonify({'error': 'Failed to save image'}), 500
-        
-        # Create painting record
-        painting = Painting(
-            user_id=user_id,
-            title=title,
-            description=description,
-            filename=result['filename'],
-            thumbnail=result['thumbnail'],
-            prefix=result['prefix'],
-            folder=folder,
-            width=result['width'],
-            height=result['height'],
-            format=result['format'],
-            is_public=is_public,
-            tags=tags,
-            source_url=request.form.get('source_url')
+        painting, error = ingest_image(
+            file, _upload_size(file), user_id, username,
+            title=title, folder=folder, is_public=is_public, description=description,
+            tags=tags, source_url=request.form.get('source_url'),
         )
-        
-        db.session.add(painting)
-        db.session.commit()
+        if error:
+            return jsonify({'error': error[0]}), error[1]
         
         return jsonify({
             'message': 'Painting created successfully',
             'painting': painting.to_dict()
         }), 201
     
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status, e.headers
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Upload failed: {e}")
@@ -280,42 +308,78 @@ def create_painting():
 
 
 @paintings_bp.get("")
+@query_budget(4)
+@cached_response(lambda: scope_for(request.args.get('user_id', type=int)))
 def list_paintings():
-    """List paintings (public by default, or user's own)."""
+    """List paintings (public by default, or user's own).
+
+    Two paging modes are supported:
+
+    * ``?page=N`` – classic offset pagination (default).
+    * ``?cursor=<token>`` – keyset pagination on ``(created_at, id)``. Pass an
+      empty ``cursor`` for the first page and then the returned
+      ``next_cursor`` until it is ``null``. Cost is independent of depth.
+
+    ``?count=exact|approx|none`` picks how ``total``/``pages`` are computed
+    (see :mod:`app.counting`); ``none`` skips counting entirely.
+    ``?tag=`` (repeatable or comma-separated) filters through the tag index,
+    requiring every tag unless ``?tag_mode=any``.
+    """
     try:
         user_id = request.args.get('user_id', type=int)
         folder = request.args.get('folder', '').strip()
         page = request.args.get('page', 1, type=int)
         per_page = int(os.getenv('RESULTS_PER_PAGE', 24))
+        count_mode = request.args.get('count', 'exact').strip().lower()
+        if count_mode not in COUNT_MODES:
+            return jsonify({'error': f'count must be one of: {", ".join(COUNT_MODES)}'}), 400
         
-        query = Painting.query
+        query = painting_list_query()
         
         # Filter by user
         if user_id:
             user = User.query.get(user_id)
             if not user:
                 return jsonify({'error': 'User not found'}), 404
-            query = query.filter_by(user_id=user_id)
+            query = query.filter(Painting.user_id == user_id)
         else:
             # Default to public paintings for anonymous users
-            query = query.filter_by(is_public=True)
+            query = query.filter(Painting.is_public == True)  # noqa: E712
         
         # Filter by folder
         if folder:
-            query = query.filter_by(folder=folder)
+            query = query.filter(Painting.folder == folder)
+
+        # Filter by tags
+        tag_names = parse_tags(','.join(request.args.getlist('tag')))
+        match_all = request.args.get('tag_mode', 'all').strip().lower() != 'any'
+        query = filter_by_tags(query, tag_names, match_all=match_all)
+
+        def total():
+            return count_paintings(
+                query, count_mode,
+                scope=scope_for(user_id),
+                filters=(folder, tuple(tag_names), match_all),
+                folder=folder,
+                tags=tag_names,
+            )
+
+        if 'cursor' in request.args:
+            return _list_by_cursor(query, request.args['cursor'], per_page, total)
         
         # Paginate
-        paginated = query.order_by(Painting.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        paginated = query.order_by(Painting.created_at.desc(), Painting.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False, count=False
         )
+        paginated.total = total()
         
         # Return a consistent paginated shape expected by frontend
         return jsonify({
             'total': paginated.total,
             'page': page,
             'per_page': per_page,
-            'pages': paginated.pages,
-            'paintings': [p.to_dict() for p in paginated.items]
+            'pages': paginated.pages if paginated.total is not None else None,
+            'paintings': [painting_row_to_dict(row) for row in paginated.items]
         }), 200
     
     except Exception as e:
@@ -323,31 +387,48 @@ def list_paintings():
         return jsonify({'error': f'Failed to fetch paintings: {str(e)}'}), 500
 
 
+def _list_by_cursor(query, cursor, per_page, total):
+    """Serve one keyset page of ``query`` starting after ``cursor``."""
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    total = total()
+
+    if position:
+        query = query.filter(after_cursor(Painting.created_at, Painting.id, position))
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(Painting.created_at.desc(), Painting.id.desc()).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return jsonify({
+        'total': total,
+        'per_page': per_page,
+        'next_cursor': encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        'paintings': [painting_row_to_dict(row) for row in rows]
+    }), 200
+
+
 
 @paintings_bp.get("/<int:painting_id>")
+@query_budget(2)
 def get_painting(painting_id: int):
     """Return a single painting by id."""
     try:
         painting = Painting.query.get(painting_id)
         if not painting:
             return jsonify({'error': 'Painting not found'}), 404
+        # Revalidation is answered before the owner is loaded and serialized
+        etag = weak_etag('painting', painting.id, painting.updated_at.isoformat())
         # If painting is public, return it. Otherwise verify token owner.
         if painting.is_public:
-            return jsonify(painting.to_dict()), 200
-
-        # Try to get user id from Authorization header
-        auth_header = request.headers.get('Authorization', '')
-        if auth_header.startswith('Bearer '):
-            try:
-                from itsdangerous import URLSafeTimedSerializer
-                serializer = URLSafeTimedSerializer(current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret'))
-                token = auth_header[7:]
-                data = serializer.loads(token, max_age=7*24*3600)
-                token_user_id = data.get('user_id')
-                if token_user_id == painting.user_id:
-                    return jsonify(painting.to_dict()), 200
-            except Exception:
-                pass
+            return not_modified(etag) or tagged(jsonify(painting.to_dict()), etag)
+
+        # Private paintings are visible to their owner only
+        if painting.user_id and current_user_id() == painting.user_id:
+            return not_modified(etag) or tagged(jsonify(painting.to_dict()), etag, private=True)
 
         return jsonify({'error': 'Access denied'}), 403
     except Exception as e:
@@ -356,6 +437,8 @@ def get_painting(painting_id: int):
 
 
 @paintings_bp.put("/<int:painting_id>")
+@limiter.cost(upload_cost)
+@query_budget(30)
 def update_painting(painting_id: int):
     """Update painting metadata or replace image."""
     try:
@@ -363,23 +446,12 @@ def update_painting(painting_id: int):
         if not painting:
             return jsonify({'error': 'Painting not found'}), 404
 
-        # Authorization: try to extract user from token if present
-        auth_header = request.headers.get('Authorization', '')
-        token_user_id = None
-        if auth_header.startswith('Bearer '):
-            try:
-                from itsdangerous import URLSafeTimedSerializer
-                serializer = URLSafeTimedSerializer(current_app.config.get('SECRET_KEY', 'canvas3t-dev-secret'))
-                token = auth_header[7:]
-                data = serializer.loads(token, max_age=7*24*3600)
-                token_user_id = data.get('user_id')
-            except Exception:
-                token_user_id = None
-
         # Only owner can update
-        if painting.user_id and token_user_id != painting.user_id:
+        if painting.user_id and current_user_id() != painting.user_id:
             return jsonify({'error': 'Forbidden'}), 403
 
+        relocation = Relocation(current_app.config.get('IMAGE_DIR', '/app/images'))
+
         # Parse fields
         title = request.form.get('title')
         folder = request.form.get('folder')
@@ -400,8 +472,16 @@ def update_painting(painting_id: int):
         # If new image provided, save and update paths
         if 'image' in request.files:
             file = request.files['image']
+            quota_error = check_quota(
+                painting.user_id,
+                _upload_size(file) - painting.file_size - painting.thumbnail_size,
+                new_paintings=0,
+            )
+            if quota_error:
+                return jsonify({'error': quota_error}), 403
             username = painting.user.username if painting.user else 'anonymous'
-            result = save_image(file, username=username, folder=painting.folder)
+            result = save_image(file, username=username, folder=painting.folder,
+                                is_public=painting.is_public)
             if not result:
                 return jsonify({'error': 'Failed to save new image'}), 500
             painting.filename = result['filename']
@@ -410,15 +490,187 @@ def update_painting(painting_id: int):
             painting.width = result.get('width', painting.width)
             painting.height = result.get('height', painting.height)
             painting.format = result.get('format', painting.format)
-
-        db.session.commit()
+            painting.file_size = result['file_size']
+            painting.thumbnail_size = result['thumbnail_size']
+        elif folder is not None or is_public_str is not None:
+            # Keep files where the new folder/visibility puts them
+            username = painting.user.username if painting.user else 'anonymous'
+            directory = storage_dir(username, painting.folder, painting.is_public)
+            moves = {path: relocated(path, directory) for path in (painting.filename, painting.thumbnail) if path}
+            relocation.move(moves)
+            painting.filename = moves[painting.filename]
+            if painting.thumbnail:
+                painting.thumbnail = moves[painting.thumbnail]
+
+        try:
+            db.session.commit()
+        except Exception:
+            relocation.undo()
+            raise
         return jsonify({'message': 'Painting updated', 'painting': painting.to_dict()}), 200
+    except RelocationError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Update painting failed: {e}")
+        return jsonify({'error': str(e)}), 409
+    except AdmissionRejected as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status, e.headers
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Update painting failed: {e}")
         return jsonify({'error': f'Update failed: {str(e)}'}), 500
 
 
+BULK_TEXT_FIELDS = ('title', 'description', 'folder', 'tags')
+
+
+@paintings_bp.patch("")
+@limiter.cost(ids_cost)
+@query_budget(24)
+@login_required
+def bulk_update():
+    """Apply the same metadata changes to many paintings in one transaction.
+
+    Body: ``{"ids": [...], "changes": {...}}``. ``changes`` may set
+    ``title``, ``description``, ``folder``, ``tags`` and ``is_public``, or
+    edit tag lists with ``add_tags`` / ``remove_tags``.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        ids, error = _bulk_ids(data)
+        if error:
+            return error
+        changes = data.get('changes') or {}
+
+        unknown = set(changes) - {*BULK_TEXT_FIELDS, 'is_public', 'add_tags', 'remove_tags'}
+        if unknown:
+            return jsonify({'error': f"Unsupported fields: {', '.join(sorted(unknown))}"}), 400
+        if 'tags' in changes and ('add_tags' in changes or 'remove_tags' in changes):
+            return jsonify({'error': 'Use either tags or add_tags/remove_tags'}), 400
+
+        values = {}
+        for field in BULK_TEXT_FIELDS:
+            if field in changes:
+                if not isinstance(changes[field], str):
+                    return jsonify({'error': f'{field} must be a string'}), 400
+                values[field] = changes[field].strip()
+        if 'is_public' in changes:
+            values['is_public'] = str(changes['is_public']).strip().lower() in ('true', '1', 'yes', 'on')
+        add_tags = parse_tags(_tag_list(changes.get('add_tags')))
+        remove_tags = set(parse_tags(_tag_list(changes.get('remove_tags'))))
+        if not values and not add_tags and not remove_tags:
+            return jsonify({'error': 'No changes given'}), 400
+
+        error = _check_owner(ids, current_user_id())
+        if error:
+            return error
+
+        per_row = None
+        if add_tags or remove_tags:
+            current = db.session.execute(
+                db.select(Painting.id, Painting.tags).where(Painting.id.in_(ids))
+            ).all()
+            per_row = {}
+            for painting_id, tags in current:
+                names = [n for n in parse_tags(tags) if n not in remove_tags]
+                names += [n for n in add_tags if n not in names]
+                per_row[painting_id] = {'tags': ', '.join(names)}
+
+        image_dir = current_app.config.get('IMAGE_DIR', '/app/images')
+        updated, relocation = relocate_paintings(db.session.connection(), image_dir, ids, values, per_row)
+        try:
+            db.session.commit()
+        except Exception:
+            relocation.undo()
+            raise
+        return jsonify({'message': 'Paintings updated', 'updated': updated, 'ids': ids}), 200
+    except RelocationError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Bulk update failed: {e}")
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Bulk update failed: {e}")
+        return jsonify({'error': f'Bulk update failed: {str(e)}'}), 500
 
 
+def _tag_list(value):
+    """Accept tags as a list or a comma-separated string."""
+    if isinstance(value, list):
+        return ','.join(str(v) for v in value)
+    return value or ''
+
+
+@paintings_bp.delete("/<int:painting_id>")
+@query_budget(16)
+@login_required
+def delete_painting(painting_id: int):
+    """Delete one of the caller's paintings; its files are removed in the background."""
+    try:
+        painting = Painting.query.get(painting_id)
+        if not painting:
+            return jsonify({'error': 'Painting not found'}), 404
+
+        # Anonymous uploads belong to nobody, so nobody may delete them
+        if painting.user_id is None or current_user_id() != painting.user_id:
+            return jsonify({'error': 'Forbidden'}), 403
+
+        db.session.delete(painting)
+        db.session.commit()
+        wake_reaper()
+        return jsonify({'message': 'Painting deleted', 'id': painting_id}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Delete painting failed: {e}")
+        return jsonify({'error': f'Delete failed: {str(e)}'}), 500
+
+
+@paintings_bp.delete("")
+@limiter.cost(ids_cost)
+@query_budget(20)
+@login_required
+def bulk_delete():
+    """Delete many paintings in one transaction. Body: ``{"ids": [...]}``."""
+    try:
+        ids, error = _bulk_ids(request.get_json(silent=True) or {})
+        if error:
+            return error
+        error = _check_owner(ids, current_user_id())
+        if error:
+            return error
+
+        deleted = bulk_delete_paintings(db.session.connection(), ids)
+        db.session.commit()
+        wake_reaper()
+        return jsonify({'message': 'Paintings deleted', 'deleted': deleted, 'ids': ids}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Bulk delete failed: {e}")
+        return jsonify({'error': f'Bulk delete failed: {str(e)}'}), 500
+
+
+def _bulk_ids(data):
+    """Validate the ``ids`` list of a bulk request; return ``(ids, error_response)``."""
+    ids = data.get('ids')
+    if not isinstance(ids, list) or not ids or not all(isinstance(i, int) for i in ids):
+        return None, (jsonify({'error': 'ids must be a non-empty list of painting ids'}), 400)
+    ids = list(dict.fromkeys(ids))
+    max_ids = current_app.config.get('BULK_MAX_IDS', 1000)
+    if len(ids) > max_ids:
+        return None, (jsonify({'error': f'At most {max_ids} paintings per request'}), 400)
+    return ids, None
+
+
+def _check_owner(ids, user_id):
+    """Check ownership of every painting in one query; unowned paintings are off limits."""
+    owners = dict(db.session.execute(
+        db.select(Painting.id, Painting.user_id).where(Painting.id.in_(ids))
+    ).all())
+    missing = [i for i in ids if i not in owners]
+    if missing:
+        return jsonify({'error': 'Paintings not found', 'ids': missing}), 404
+    forbidden = [i for i in ids if owners[i] is None or owners[i] != user_id]
+    if forbidden:
+        return jsonify({'error': 'Forbidden', 'ids': forbidden}), 403
+    return None
 
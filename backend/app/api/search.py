@@ -1,36 +1,82 @@
+"""Search API endpoints."""
 from __future__ import annotations
 
-from flask import Blueprint, request
-from sqlalchemy import or_
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import func
 
-from ..models import Painting
-from ..schemas import PaintingSchema
+from ..counting import COUNT_MODES, count_paintings
+from ..models import Painting, User, painting_list_query, painting_row_to_dict
+from ..painting_events import scope_for
+from ..response_cache import cached_response
+from ..search_index import apply_search
+from ..tags import filter_by_tags, parse_tags
+from ..utils.query_budget import query_budget
 
 search_bp = Blueprint("search", __name__)
-painting_schema = PaintingSchema()
+
+MAX_PER_PAGE = 100
 
 
 @search_bp.get("")
+@query_budget(4)
+@cached_response(lambda: scope_for(request.args.get("user_id", type=int)))
 def search():
-    query = Painting.query
-    term = request.args.get("q")
-    folder = request.args.get("folder")
-    tag = request.args.get("tag")
-    image_format = request.args.get("format")
-
-    if term:
-        like = f"%{term}%"
-        clauses = [Painting.title.ilike(like), Painting.tags.ilike(like)]
-        if term.isdigit():
-            clauses.append(Painting.id == int(term))
-        query = query.filter(or_(*clauses))
-    if folder:
-        query = query.filter(Painting.folder == folder)
-    if tag:
-        query = query.filter(Painting.tags.ilike(f"%{tag}%"))
-    if image_format:
-        query = query.filter(Painting.format == image_format.upper())
-
-    results = query.limit(50).all()
-    return {"items": painting_schema.dump(results, many=True)}
+    """Full-text search over paintings.
+
+    ``q`` words are prefix-matched against title, description and tags and
+    results are ranked with BM25. ``tag`` (repeatable or comma-separated,
+    combined per ``tag_mode=all|any``), ``folder``, ``format`` and
+    ``user_id`` narrow the result set; without ``user_id`` only public
+    paintings are searched. Paged with ``page``/``per_page``; ``count``
+    works as for the listing.
+    """
+    try:
+        term = request.args.get("q", "").strip()
+        tag_names = parse_tags(",".join(request.args.getlist("tag")))
+        match_all = request.args.get("tag_mode", "all").strip().lower() != "any"
+        folder = request.args.get("folder", "").strip()
+        image_format = request.args.get("format", "").strip()
+        user_id = request.args.get("user_id", type=int)
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = request.args.get("per_page", current_app.config["RESULTS_PER_PAGE"], type=int)
+        per_page = min(max(per_page, 1), MAX_PER_PAGE)
+        count_mode = request.args.get("count", "exact").strip().lower()
+        if count_mode not in COUNT_MODES:
+            return jsonify({"error": f"count must be one of: {', '.join(COUNT_MODES)}"}), 400
+
+        query = painting_list_query()
+        if user_id:
+            if not User.query.get(user_id):
+                return jsonify({"error": "User not found"}), 404
+            query = query.filter(Painting.user_id == user_id)
+        else:
+            query = query.filter(Painting.is_public == True)  # noqa: E712
+        if folder:
+            query = query.filter(Painting.folder == folder)
+        if image_format:
+            query = query.filter(func.lower(Painting.format) == image_format.lower())
+
+        query = filter_by_tags(query, tag_names, match_all=match_all)
+
+        query, ranked = apply_search(query, term)
+        if not ranked:
+            query = query.order_by(Painting.created_at.desc(), Painting.id.desc())
+
+        # Text matches have no maintained counter, so approx means cached exact
+        total = count_paintings(
+            query, "exact" if count_mode == "approx" else count_mode,
+            scope=scope_for(user_id),
+            filters=("search", term, folder, image_format, tuple(tag_names), match_all),
+        )
+        rows = query.offset((page - 1) * per_page).limit(per_page).all()
+
+        return jsonify({
+            "items": [painting_row_to_dict(row) for row in rows],
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+        }), 200
 
+    except Exception as e:
+        current_app.logger.error(f"Search failed: {e}")
+        return jsonify({"error": f"Search failed: {str(e)}"}), 500
@@ -0,0 +1,108 @@
+"""Tag API endpoints."""
+import sys
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import exists, func, or_
+
+from ..extensions import db
+from ..models import Painting, Tag, User, painting_tags
+from ..utils.auth import current_user_id
+from ..utils.query_budget import query_budget
+
+tags_bp = Blueprint("tags", __name__)
+
+MAX_LIMIT = 100
+
+
+def _limit():
+    return min(max(request.args.get('limit', 20, type=int), 1), MAX_LIMIT)
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string above every name starting with ``prefix``; None when nothing is."""
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        return None
+    following = ord(stripped[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000  # surrogates cannot be stored, so skip past them
+    return stripped[:-1] + chr(following)
+
+
+def _visible_tags(query):
+    """Tags on a public painting, or on one of the signed-in user's own."""
+    visible = Tag.public_count > 0
+    viewer = current_user_id()
+    if viewer:
+        owned = exists().where(
+            painting_tags.c.tag_id == Tag.id,
+            Painting.id == painting_tags.c.painting_id,
+            Painting.user_id == viewer,
+        )
+        visible = or_(visible, owned)
+    return query.filter(visible)
+
+
+@tags_bp.get("")
+@query_budget(1)
+def list_tags():
+    """List tags, optionally by name prefix (for autocomplete).
+
+    Tags used only on private paintings are listed for their owner alone.
+    """
+    try:
+        prefix = request.args.get('prefix', '').strip().lower()
+        query = _visible_tags(Tag.query)
+        if prefix:
+            # Range scan on the unique name index; LIKE 'x%' would not use it
+            query = query.filter(Tag.name >= prefix)
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                query = query.filter(Tag.name < upper)
+        tags = query.order_by(Tag.name).limit(_limit()).all()
+        return jsonify({'tags': [t.to_dict() for t in tags]}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch tags: {str(e)}'}), 500
+
+
+@tags_bp.get("/popular")
+@query_budget(2)
+def popular_tags():
+    """Most used tags across public paintings, or for one user.
+
+    A user's private paintings count only when that user is signed in.
+    """
+    try:
+        limit = _limit()
+        user_id = request.args.get('user_id', type=int)
+        if not user_id:
+            tags = (
+                Tag.query.filter(Tag.public_count > 0)
+                .order_by(Tag.public_count.desc(), Tag.name)
+                .limit(limit)
+                .all()
+            )
+            return jsonify({
+                'tags': [{'name': t.name, 'count': t.public_count} for t in tags]
+            }), 200
+
+        if not User.query.get(user_id):
+            return jsonify({'error': 'User not found'}), 404
+        count = func.count().label('count')
+        query = (
+            db.session.query(Tag.name, count)
+            .join(painting_tags, painting_tags.c.tag_id == Tag.id)
+            .join(Painting, Painting.id == painting_tags.c.painting_id)
+            .filter(Painting.user_id == user_id)
+        )
+        if current_user_id() != user_id:
+            query = query.filter(Painting.is_public == True)  # noqa: E712
+        rows = (
+            query.group_by(Tag.id)
+            .order_by(count.desc(), Tag.name)
+            .limit(limit)
+            .all()
+        )
+        return jsonify({'tags': [{'name': name, 'count': n} for name, n in rows]}), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch tags: {str(e)}'}), 500
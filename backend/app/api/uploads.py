@@ -0,0 +1,194 @@
+"""Resumable upload API endpoints.
+
+``POST /api/uploads`` opens a session, ``PUT /api/uploads/<id>?offset=N``
+stores one chunk, ``GET /api/uploads/<id>`` lists the received ranges and
+``POST /api/uploads/<id>/complete`` turns the assembled file into a painting
+through the same ingest path as a single-request upload.
+"""
+import json
+from datetime import datetime
+
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.datastructures import FileStorage
+from werkzeug.utils import secure_filename
+
+from .. import uploads
+from ..extensions import db, limiter
+from ..models import UploadSession
+from ..usage import check_quota
+from ..utils.admission import AdmissionRejected
+from ..utils.auth import current_user_id
+from ..utils.query_budget import query_budget
+from ..utils.rate_limit import upload_cost
+from ..utils.timing import stage
+from .paintings import ALLOWED_EXTENSIONS, allowed_file, ingest_image
+
+uploads_bp = Blueprint("uploads", __name__)
+
+
+def _session(upload_id):
+    """The live session ``upload_id`` and None, or None and an error response."""
+    session = db.session.get(UploadSession, upload_id)
+    if not session or session.expires_at < datetime.utcnow():
+        return None, (jsonify({'error': 'Upload not found'}), 404)
+    if session.user_id and current_user_id() != session.user_id:
+        return None, (jsonify({'error': 'Forbidden'}), 403)
+    return session, None
+
+
+def _state(session, ranges):
+    return {
+        'id': session.id,
+        'filename': session.filename,
+        'size': session.size,
+        'received': ranges,
+        'complete': uploads.is_complete(ranges, session.size),
+        'expires_at': session.expires_at.isoformat()
+    }
+
+
+@uploads_bp.post("")
+@query_budget(6)
+def create_upload():
+    """Open a resumable upload for a file of ``size`` bytes."""
+    try:
+        data = request.get_json() or {}
+        filename = secure_filename(str(data.get('filename', '')))
+        size = data.get('size')
+        if not filename or not allowed_file(filename):
+            return jsonify({
+                'error': f'File type not allowed. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
+            }), 400
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'error': 'size must be a positive integer'}), 400
+        max_bytes = current_app.config.get('UPLOAD_MAX_MB', 200) * 1024 * 1024
+        if size > max_bytes:
+            return jsonify({'error': f'Upload exceeds {max_bytes} bytes'}), 413
+
+        user_id = current_user_id()
+        quota_error = check_quota(user_id, size)
+        if quota_error:
+            return jsonify({'error': quota_error}), 403
+
+        is_public = str(data.get('is_public', 'false')).strip().lower() in ('true', '1', 'yes', 'on')
+        fields = {
+            'title': str(data.get('title', 'Untitled')).strip(),
+            'folder': str(data.get('folder', '')).strip(),
+            'is_public': is_public,
+            'description': str(data.get('description', '')).strip(),
+            'tags': str(data.get('tags', '')).strip()
+        }
+        session = uploads.create_session(user_id, filename, size, fields)
+        return jsonify({
+            **_state(session, []),
+            'chunk_size': current_app.config.get('UPLOAD_CHUNK_MB', 4) * 1024 * 1024
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Create upload failed: {e}")
+        return jsonify({'error': f'Create upload failed: {str(e)}'}), 500
+
+
+@uploads_bp.put("/<upload_id>")
+@limiter.cost(upload_cost)
+@query_budget(5)
+def put_chunk(upload_id):
+    """Store the request body at byte ``offset``; chunks may arrive in any order."""
+    try:
+        session, error = _session(upload_id)
+        if error:
+            return error
+        if session.state != 'open':
+            return jsonify({'error': 'Upload is being finalized'}), 409
+        offset = request.args.get('offset', type=int)
+        length = request.content_length
+        if offset is None or offset < 0:
+            return jsonify({'error': 'offset query parameter required'}), 400
+        if not length:
+            return jsonify({'error': 'Content-Length required'}), 411
+        if length > (current_app.config.get('MAX_CONTENT_LENGTH') or length):
+            return jsonify({'error': 'Chunk too large'}), 413
+        if offset + length > session.size:
+            return jsonify({'error': f'Chunk ends past the upload size ({session.size} bytes)'}), 416
+
+        with stage('write'):
+            written = uploads.write_chunk(session, offset, request.stream, length)
+        if written < length:
+            return jsonify({'error': f'Chunk truncated after {written} bytes'}), 400
+        return jsonify(_state(session, uploads.received_ranges(session.id))), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Upload chunk failed: {e}")
+        return jsonify({'error': f'Upload chunk failed: {str(e)}'}), 500
+
+
+@uploads_bp.get("/<upload_id>")
+@query_budget(2)
+def get_upload(upload_id):
+    """Received byte ranges, so an interrupted client knows what to resend."""
+    session, error = _session(upload_id)
+    if error:
+        return error
+    return jsonify(_state(session, uploads.received_ranges(session.id))), 200
+
+
+@uploads_bp.post("/<upload_id>/complete")
+@query_budget(32)
+def complete_upload(upload_id):
+    """Ingest the assembled file as a painting and close the session."""
+    try:
+        session, error = _session(upload_id)
+        if error:
+            return error
+        ranges = uploads.received_ranges(session.id)
+        if not uploads.is_complete(ranges, session.size):
+            return jsonify({'error': 'Upload is incomplete', **_state(session, ranges)}), 409
+        if not uploads.claim(session.id):
+            return jsonify({'error': 'Upload is already being finalized'}), 409
+
+        username = 'anonymous'
+        if session.user_id:
+            user = current_app.extensions['auth'].user(session.user_id)
+            username = user.username if user else username
+        fields = json.loads(session.fields)
+        try:
+            with open(uploads.spool_path(session.id), 'rb') as spool:
+                painting, error = ingest_image(
+                    FileStorage(stream=spool, filename=session.filename),
+                    session.size, session.user_id, username, **fields,
+                )
+        except Exception:
+            db.session.rollback()
+            uploads.release(session.id)
+            raise
+        if error:
+            uploads.release(session.id)
+            return jsonify({'error': error[0]}), error[1]
+
+        uploads.discard([session.id])
+        return jsonify({
+            'message': 'Painting created successfully',
+            'painting': painting.to_dict()
+        }), 201
+    except AdmissionRejected as e:
+        return jsonify({'error': str(e)}), e.status, e.headers
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Complete upload failed: {e}")
+        return jsonify({'error': f'Complete upload failed: {str(e)}'}), 500
+
+
+@uploads_bp.delete("/<upload_id>")
+@query_budget(4)
+def abort_upload(upload_id):
+    """Abandon an upload and free its spool file."""
+    try:
+        session, error = _session(upload_id)
+        if error:
+            return error
+        uploads.discard([session.id])
+        return jsonify({'message': 'Upload aborted', 'id': upload_id}), 200
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Abort upload failed: {e}")
+        return jsonify({'error': f'Abort failed: {str(e)}'}), 500
@@ -1,9 +1,13 @@
 """Users API endpoints."""
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy.exc import IntegrityError
 
 from ..extensions import db
 from ..models import User
+from ..usage import get_usage
+from ..utils.etags import not_modified, tagged, weak_etag
+from ..utils.passwords import HasherBusy
+from ..utils.query_budget import query_budget
 
 users_bp = Blueprint("users", __name__)
 
@@ -50,12 +54,16 @@ def register():
     except IntegrityError:
         db.session.rollback()
         return jsonify({'error': 'User already exists'}), 409
+    except HasherBusy as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
 
 
 @users_bp.get("")
+@query_budget(1)
 def list_users():
     """List all users."""
     try:
@@ -69,14 +77,34 @@ def list_users():
 
 
 @users_bp.get("/<int:user_id>")
+@query_budget(1)
 def get_user(user_id: int):
     """Get user by ID."""
     try:
         user = User.query.get(user_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
-        return jsonify(user.to_dict()), 200
+        etag = weak_etag('user', user.id, user.updated_at.isoformat() if user.updated_at else None)
+        return not_modified(etag) or tagged(jsonify(user.to_dict()), etag)
     except Exception as e:
         return jsonify({'error': f'Failed to fetch user: {str(e)}'}), 500
 
 
+
+
+@users_bp.get("/<int:user_id>/usage")
+@query_budget(2)
+def get_user_usage(user_id: int):
+    """Get storage usage and quotas for a user."""
+    try:
+        if not User.query.get(user_id):
+            return jsonify({'error': 'User not found'}), 404
+        return jsonify({
+            'usage': get_usage(user_id),
+            'quota': {
+                'max_paintings': current_app.config.get('QUOTA_MAX_PAINTINGS') or None,
+                'max_bytes': current_app.config.get('QUOTA_MAX_BYTES') or None
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to fetch usage: {str(e)}'}), 500
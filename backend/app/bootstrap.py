@@ -0,0 +1,153 @@
+"""One-time database bootstrap: schema creation, upgrades and seed data.
+
+Creating tables, upgrading the schema and hashing the seed user's password
+used to run in every worker at boot. :func:`bootstrap` now does the work once
+per database. Every later call only reads ``app_meta.schema_version``, one
+primary-key lookup. Concurrent first boots are serialized by a lock: a file
+lock next to the SQLite database or a PostgreSQL advisory lock. The process
+that wins does the work and the others find it done.
+
+Bump :data:`SCHEMA_VERSION` whenever models, :mod:`app.schema` or the seed
+data change, so existing databases get upgraded on the next boot. Deployments
+can run ``python manage.py bootstrap`` before starting workers and set
+``AUTO_BOOTSTRAP=false``.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from .extensions import db
+from .models import AppMeta, User
+from .schema import ensure_schema
+from .utils.passwords import calibrate
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 5
+
+# Arbitrary 64-bit key for pg_advisory_lock
+_PG_LOCK_KEY = 0x63616E766173
+
+_VERSION_KEY = "schema_version"
+_HASH_COST_KEY = "password_hash_iterations"
+
+
+def current_version() -> int:
+    """Bootstrap version recorded in the database; 0 when never bootstrapped."""
+    try:
+        with db.engine.connect() as conn:
+            value = conn.execute(
+                select(AppMeta.value).where(AppMeta.key == _VERSION_KEY)
+            ).scalar()
+    except SQLAlchemyError:
+        return 0  # app_meta does not exist yet
+    return int(value or 0)
+
+
+def bootstrap(app, *, force: bool = False) -> bool:
+    """Bring the database to :data:`SCHEMA_VERSION`; return True if work was done."""
+    with app.app_context():
+        if not force and current_version() >= SCHEMA_VERSION:
+            return False
+        with _bootstrap_lock(app):
+            # Another process may have finished while we waited for the lock
+            if not force and current_version() >= SCHEMA_VERSION:
+                return False
+            db.create_all()
+            ensure_schema()
+            _calibrate_password_hashing(app)
+            load_password_cost(app)
+            _seed_default_user()
+            _set_version(SCHEMA_VERSION)
+            logger.info(f"Database bootstrapped to version {SCHEMA_VERSION}")
+            return True
+
+
+@contextmanager
+def _bootstrap_lock(app):
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+        return
+
+    try:
+        import fcntl
+    except ImportError:  # Windows: the dev server runs a single process
+        yield
+        return
+
+    lock_dir = app.config.get("DB_DIR") or app.instance_path
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, ".bootstrap.lock"), "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def load_password_cost(app) -> None:
+    """Point the app's hasher at ``PASSWORD_HASH_ITERATIONS`` or the cost bootstrap measured."""
+    iterations = app.config.get("PASSWORD_HASH_ITERATIONS")
+    if not iterations:
+        with app.app_context():
+            try:
+                with db.engine.connect() as conn:
+                    iterations = conn.execute(
+                        select(AppMeta.value).where(AppMeta.key == _HASH_COST_KEY)
+                    ).scalar()
+            except SQLAlchemyError:
+                iterations = None
+    if iterations:
+        app.extensions["passwords"].use_iterations(int(iterations))
+    else:
+        logger.warning("Password hash cost not bootstrapped yet; using werkzeug's default")
+
+
+def _calibrate_password_hashing(app) -> None:
+    """Measure the pbkdf2 cost once, so every worker hashes with the same one."""
+    if app.config.get("PASSWORD_HASH_ITERATIONS") or db.session.get(AppMeta, _HASH_COST_KEY):
+        return
+    iterations = calibrate(app.config.get("PASSWORD_HASH_TARGET_MS", 250))
+    db.session.add(AppMeta(key=_HASH_COST_KEY, value=str(iterations)))
+    db.session.commit()
+    logger.info(f"Password hashing calibrated to {iterations} pbkdf2 iterations")
+
+
+def _set_version(version: int) -> None:
+    meta = db.session.get(AppMeta, _VERSION_KEY) or AppMeta(key=_VERSION_KEY)
+    meta.value = str(version)
+    db.session.add(meta)
+    db.session.commit()
+
+
+def _seed_default_user() -> None:
+    """Create default user if not exists."""
+    if User.query.first():
+        return
+
+    try:
+        user = User(
+            username="demo",
+            email="demo@canvas3t.local"
+        )
+        user.set_password("demo123456")
+        db.session.add(user)
+        db.session.commit()
+        logger.info("Default user 'demo' created")
+    except IntegrityError:
+        db.session.rollback()
+        logger.info("Default user already exists")
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to seed default user: {e}")
@@ -0,0 +1,148 @@
+"""Set-based painting writes for bulk endpoints, imports and benchmarks.
+
+Rows bypass the ORM, so the change hook is fed here, once per batch.
+"""
+from __future__ import annotations
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from .models import Painting, User
+from .painting_events import SNAPSHOT_FIELDS, dispatch, snapshot_paintings
+from .utils.layout import Relocation, relocated, storage_dir
+
+_table = Painting.__table__
+
+
+def _with_defaults(row: dict) -> dict:
+    """Fill column defaults the ORM would normally apply on flush."""
+    values = dict(row)
+    for column in _table.columns:
+        if column.name in values or column.primary_key:
+            continue
+        default = column.default
+        if default is None:
+            values[column.name] = None
+        elif default.is_callable:
+            values[column.name] = default.arg(None)
+        else:
+            values[column.name] = default.arg
+    return values
+
+
+def bulk_insert_paintings(connection, rows: list[dict]) -> list[int]:
+    """Insert ``rows`` (column values) in one round trip; return their ids in order.
+
+    PostgreSQL reserves ids from the sequence and streams rows with ``COPY``;
+    other databases use a multi-row ``INSERT ... RETURNING``.
+    """
+    if not rows:
+        return []
+    rows = [_with_defaults(row) for row in rows]
+    if connection.dialect.name == "postgresql":
+        ids = _copy_rows(connection, rows)
+    else:
+        result = connection.execute(
+            insert(_table).returning(_table.c.id, sort_by_parameter_order=True), rows
+        )
+        ids = list(result.scalars())
+    for row, painting_id in zip(rows, ids):
+        row["id"] = painting_id
+    dispatch(connection, [
+        (None, {field: row[field] for field in SNAPSHOT_FIELDS}) for row in rows
+    ])
+    return ids
+
+
+def _copy_rows(connection, rows: list[dict]) -> list[int]:
+    ids = list(connection.exec_driver_sql(
+        "SELECT nextval(pg_get_serial_sequence('paintings', 'id')) "
+        "FROM generate_series(1, %(n)s)", {"n": len(rows)}
+    ).scalars())
+    columns = ["id", *(c.name for c in _table.columns if not c.primary_key)]
+    cursor = connection.connection.driver_connection.cursor()
+    with cursor.copy(f"COPY paintings ({', '.join(columns)}) FROM STDIN") as copy:
+        for painting_id, row in zip(ids, rows):
+            copy.write_row([painting_id, *(row[c] for c in columns[1:])])
+    return ids
+
+
+def bulk_update_paintings(connection, ids: list[int], values: dict | None = None,
+                          per_row: dict[int, dict] | None = None) -> int:
+    """Apply ``values`` to every painting in ``ids`` and ``per_row[id]`` to single rows.
+
+    Shared values go out as one ``UPDATE ... WHERE id IN``; per-row values
+    (every entry setting the same columns) as one executemany ``UPDATE``.
+    Derived tables are refreshed once for the whole batch. Returns the number
+    of paintings updated.
+    """
+    ids = list(ids)
+    values, per_row = values or {}, per_row or {}
+    if not ids or not (values or per_row):
+        return 0
+    before = snapshot_paintings(connection, ids)
+    if values:
+        connection.execute(update(_table).where(_table.c.id.in_(ids)).values(values))
+    if per_row:
+        columns = sorted({column for row in per_row.values() for column in row})
+        connection.execute(
+            update(_table).where(_table.c.id == bindparam("b_id"))
+            .values({column: bindparam(f"b_{column}") for column in columns}),
+            [
+                {"b_id": painting_id, **{f"b_{c}": row[c] for c in columns}}
+                for painting_id, row in per_row.items()
+            ],
+        )
+    after = snapshot_paintings(connection, ids)
+    dispatch(connection, [(before[i], after[i]) for i in before])
+    return len(before)
+
+
+def bulk_delete_paintings(connection, ids: list[int]) -> int:
+    """Delete paintings ``ids`` with one ``DELETE``; return how many existed.
+
+    Their files are queued for the reaper by the change hook.
+    """
+    before = snapshot_paintings(connection, ids)
+    if not before:
+        return 0
+    connection.execute(delete(_table).where(_table.c.id.in_(list(before))))
+    dispatch(connection, [(snapshot, None) for snapshot in before.values()])
+    return len(before)
+
+
+def relocate_paintings(connection, image_dir: str, ids: list[int], values: dict,
+                       per_row: dict[int, dict] | None = None) -> tuple[int, Relocation]:
+    """Like :func:`bulk_update_paintings`, moving files when folder or visibility change.
+
+    Files are renamed before the rows are updated and the returned
+    :class:`Relocation` must be undone if the transaction does not commit.
+    Raises :class:`~app.utils.layout.RelocationError` (with nothing moved)
+    when a file cannot be moved.
+    """
+    relocation = Relocation(image_dir)
+    per_row = dict(per_row or {})
+    changed = set(values).union(*per_row.values())
+    if changed & {"folder", "is_public"}:
+        rows = connection.execute(
+            select(_table.c.id, _table.c.filename, _table.c.thumbnail, _table.c.folder,
+                   _table.c.is_public, User.username)
+            .select_from(_table.outerjoin(User, User.id == _table.c.user_id))
+            .where(_table.c.id.in_(ids))
+        ).all()
+        moves = {}
+        for row in rows:
+            target = {**values, **per_row.get(row.id, {})}
+            directory = storage_dir(row.username, target.get("folder", row.folder),
+                                    target.get("is_public", row.is_public))
+            paths = {"filename": relocated(row.filename, directory),
+                     "thumbnail": relocated(row.thumbnail, directory)}
+            moves[row.filename] = paths["filename"]
+            if row.thumbnail:
+                moves[row.thumbnail] = paths["thumbnail"]
+            per_row[row.id] = {**per_row.get(row.id, {}), **paths}
+        relocation.move(moves)
+    try:
+        return bulk_update_paintings(connection, ids, values, per_row), relocation
+    except Exception:
+        relocation.undo()
+        raise
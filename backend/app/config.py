@@ -8,22 +8,120 @@ ROOT_DIR = BASE_DIR.parent
 DATA_DIR = Path(os.getenv("DATA_DIR", ROOT_DIR / "data"))
 DB_DIR = Path(os.getenv("DB_DIR", DATA_DIR / "db"))
 IMAGE_DIR = Path(os.getenv("IMAGE_DIR", DATA_DIR / "images"))
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", DATA_DIR / "uploads"))
 THUMBNAIL_DIR = Path(os.getenv("THUMBNAIL_DIR", IMAGE_DIR / "thumbnails"))
 DB_PATH = Path(os.getenv("DB_PATH", DB_DIR / "app.db"))
 
 
+def database_url(url: str) -> str:
+    """Normalize ``postgres://`` URLs (Heroku style) to the psycopg 3 driver."""
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+psycopg://" + url[len(prefix):]
+    return url
+
+
+def engine_options(url: str) -> dict:
+    """Connection pool settings for server databases; SQLite keeps the defaults."""
+    if not url.startswith("postgresql"):
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": True,
+    }
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "canvas3t-dev-secret")
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+    TOKEN_MAX_AGE = int(os.getenv("TOKEN_MAX_AGE", str(7 * 24 * 3600)))
+    # Verified tokens and user records are reused for this many seconds
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+    AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+    # pbkdf2 iterations; unset, bootstrap calibrates once to PASSWORD_HASH_TARGET_MS
+    # (never below werkzeug's default) and stores the result for every worker
+    PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "0"))
+    PASSWORD_HASH_TARGET_MS = float(os.getenv("PASSWORD_HASH_TARGET_MS", "250"))
+    # Concurrent hashes across all workers, requests per worker allowed to wait, and how long they wait (s)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "32"))
+    PASSWORD_HASH_WAIT = float(os.getenv("PASSWORD_HASH_WAIT", "10"))
+    SQLALCHEMY_DATABASE_URI = database_url(os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}"))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Create/upgrade the database on boot when needed; disable when running
+    # ``manage.py bootstrap`` as a separate deploy step
+    AUTO_BOOTSTRAP = os.getenv("AUTO_BOOTSTRAP", "true").lower() == "true"
     MAX_CONTENT_LENGTH = int(os.getenv("MAX_UPLOAD_MB", "20")) * 1024 * 1024
     IMAGE_DIR = str(IMAGE_DIR)
     THUMBNAIL_DIR = str(THUMBNAIL_DIR)
+    # Resumable uploads: spool files, largest file, suggested chunk size, idle expiry (s)
+    UPLOAD_DIR = str(UPLOAD_DIR)
+    UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "200"))
+    UPLOAD_CHUNK_MB = int(os.getenv("UPLOAD_CHUNK_MB", "4"))
+    UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+    # A finalize claim older than this is presumed dead and may be taken over
+    UPLOAD_FINALIZE_TIMEOUT = int(os.getenv("UPLOAD_FINALIZE_TIMEOUT", "600"))
     DATA_DIR = str(DATA_DIR)
     DB_DIR = str(DB_DIR)
     THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "512"))
+    # Image decode admission across all workers: concurrent decodes, decoded-memory budget,
+    # and how many uploads per worker may wait (and for how long, in seconds) before getting 503
+    IMAGE_MAX_CONCURRENT = int(os.getenv("IMAGE_MAX_CONCURRENT", "2"))
+    IMAGE_MEMORY_BUDGET_MB = int(os.getenv("IMAGE_MEMORY_BUDGET_MB", "512"))
+    IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", "8"))
+    IMAGE_QUEUE_TIMEOUT = float(os.getenv("IMAGE_QUEUE_TIMEOUT", "5"))
+    # Where the node-wide budgets are leased: sqlite (shared by workers) or memory (per process)
+    LEASE_STORAGE = os.getenv("LEASE_STORAGE", "sqlite")
+    LEASE_DB = os.getenv("LEASE_DB", "")  # defaults to DB_DIR/leases.db
     RESULTS_PER_PAGE = int(os.getenv("RESULTS_PER_PAGE", "20"))
+    # Tag-filtered facets group at most this many of the newest matching paintings
+    FACET_NARROW_MAX_ROWS = int(os.getenv("FACET_NARROW_MAX_ROWS", "5000"))
+    # Most paintings a single bulk request may touch
+    BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", "1000"))
+    # Statements slower than this are logged with their query plan
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+    QUERY_STATS_MAX_SHAPES = int(os.getenv("QUERY_STATS_MAX_SHAPES", "1000"))
+    # Per-request SQL budgets declared on views: off, warn or raise. Empty means
+    # warn under FLASK_DEBUG or TESTING and off otherwise, since counting hooks
+    # every statement
+    QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "")
+    # Requests slower than this log their Server-Timing stages at INFO (others at DEBUG)
+    SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    # Prometheus metrics at /metrics (set PROMETHEUS_MULTIPROC_DIR under gunicorn)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Shared secret for /api/admin endpoints (X-Admin-Token); empty disables them
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+    COUNT_CACHE_SIZE = int(os.getenv("COUNT_CACHE_SIZE", "2048"))
+    # Cached list responses (see app/response_cache.py): memory or none
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+    RESPONSE_CACHE_VERSION_TTL = float(os.getenv("RESPONSE_CACHE_VERSION_TTL", "1"))
     CORS_ALLOW_ORIGINS = os.getenv("CORS_ALLOW_ORIGINS", "*")
+    # Background deletion of files released by deleted or replaced paintings
+    REAPER_ENABLED = os.getenv("REAPER_ENABLED", "true").lower() == "true"
+    REAPER_INTERVAL = float(os.getenv("REAPER_INTERVAL", "5"))
+    REAPER_BATCH_SIZE = int(os.getenv("REAPER_BATCH_SIZE", "200"))
+    REAPER_MAX_FILES_PER_SECOND = float(os.getenv("REAPER_MAX_FILES_PER_SECOND", "100"))
     ENABLE_RATE_LIMITS = os.getenv("ENABLE_RATE_LIMITS", "true").lower() == "true"
+    # Budgets in cost units (1 per plain request) for anonymous IPs and signed-in users
     RATE_LIMIT = os.getenv("RATE_LIMIT", "50/minute")
+    RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "200/minute")
+    # Extra units per this many uploaded/fetched bytes and decoded pixels, and per URL import
+    RATE_LIMIT_COST_BYTES = int(os.getenv("RATE_LIMIT_COST_BYTES", str(1 << 20)))
+    RATE_LIMIT_COST_PIXELS = int(os.getenv("RATE_LIMIT_COST_PIXELS", "4000000"))
+    RATE_LIMIT_IMPORT_COST = float(os.getenv("RATE_LIMIT_IMPORT_COST", "5"))
+    # Reverse proxies in front of the app (1 for the bundled nginx); their X-Forwarded-For
+    # entries give the client address that per-IP budgets key on. 0 trusts none.
+    TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+    # "sqlite" shares budgets across the workers of one node; "memory" is per process
+    RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "sqlite")
+    RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "")  # defaults to DB_DIR/ratelimit.db
+    RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    # Per-user storage quotas; 0 disables the limit
+    QUOTA_MAX_PAINTINGS = int(os.getenv("QUOTA_MAX_PAINTINGS", "0"))
+    QUOTA_MAX_BYTES = int(os.getenv("QUOTA_MAX_MB", "0")) * 1024 * 1024
 
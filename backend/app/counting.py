@@ -0,0 +1,106 @@
+"""Count strategies for paginated listings.
+
+``COUNT(*)`` over a filtered set is often as expensive as fetching the page,
+so listings pick one of three strategies with ``?count=``:
+
+* ``exact`` (default) – a real count, cached per filter key. Each listing
+  scope (``public`` or ``user:<id>``) has a version counter bumped in the
+  same transaction as any painting write touching it; cached counts are keyed
+  on that version, so a write invalidates them for every worker at once.
+* ``approx`` – read from the maintained facet counters when they cover the
+  filters (scope, folder, one tag); otherwise falls back to ``exact``.
+* ``none`` – no count at all; ``total`` is ``null``.
+"""
+from __future__ import annotations
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import select
+
+from .aggregates import apply_deltas
+from .extensions import db
+from .facets import TOTAL, folder_scope
+from .models import CacheVersion, FacetCount
+from .painting_events import on_painting_change, snapshot_scopes
+from .utils.lru import LRUCache
+
+COUNT_MODES = ("exact", "approx", "none")
+
+_versions = CacheVersion.__table__
+
+
+@on_painting_change
+def _bump_versions(connection, changes) -> None:
+    scopes = {
+        scope
+        for change in changes
+        for snapshot in change if snapshot
+        for scope in snapshot_scopes(snapshot)
+    }
+    apply_deltas(connection, _versions, ("scope",), {(scope,): {"version": 1} for scope in scopes})
+
+
+def init_app(app) -> None:
+    # ``g`` outlives a request when an app context was already pushed (tests,
+    # CLI), so start every request with a fresh version memo
+    @app.before_request
+    def _reset_scope_versions():
+        g.pop("scope_versions", None)
+
+
+def scope_version(scope: str) -> int:
+    """Current write version of ``scope``, read at most once per request."""
+    versions = g.setdefault("scope_versions", {}) if has_request_context() else {}
+    if scope not in versions:
+        versions[scope] = db.session.execute(
+            select(CacheVersion.version).where(CacheVersion.scope == scope)
+        ).scalar() or 0
+    return versions[scope]
+
+
+def count_paintings(query, mode: str, *, scope: str, filters: tuple,
+                    folder: str = "", tags: list[str] | None = None):
+    """Return the total for ``query`` using ``mode``; ``None`` for ``none``.
+
+    ``filters`` must identify the filter set completely (it is the cache key);
+    ``folder``/``tags`` let ``approx`` find a matching counter.
+    """
+    if mode == "none":
+        return None
+    if mode == "approx":
+        approx = _counter_total(scope, folder, tags or [])
+        if approx is not None:
+            return approx
+
+    cache = _cache()
+    key = (scope, scope_version(scope), filters)
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total)
+    return total
+
+
+def _counter_total(scope, folder, tags):
+    narrowed = folder_scope(scope, folder) if folder else scope
+    if not tags:
+        facet, value = TOTAL, ""
+    elif len(tags) == 1:
+        facet, value = "tag", tags[0]
+    else:
+        return None
+    count = db.session.execute(
+        select(FacetCount.count).where(
+            FacetCount.scope == narrowed, FacetCount.facet == facet, FacetCount.value == value
+        )
+    ).scalar()
+    return count or 0
+
+
+def _cache() -> LRUCache:
+    # One cache per app, so separate apps (and databases) never share counts
+    cache = current_app.extensions.get("count_cache")
+    if cache is None:
+        cache = current_app.extensions["count_cache"] = LRUCache(
+            current_app.config.get("COUNT_CACHE_SIZE", 2048)
+        )
+    return cache
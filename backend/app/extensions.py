@@ -1,22 +1,19 @@
 """Flask extensions initialization."""
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+
+from .utils.rate_limit import RateLimiter
 
 db = SQLAlchemy()
 cors = CORS(resources={
     r"/api/*": {
         "origins": ["*"],
-        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-        "allow_headers": ["Content-Type", "Authorization"],
-        "expose_headers": ["Content-Length"],
+        "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+        "expose_headers": ["Content-Length", "ETag", "Retry-After", "Server-Timing"],
         "supports_credentials": False
     }
 })
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
-)
+# One sliding-window limiter shared by all workers (see app.utils.rate_limit)
+limiter = RateLimiter()
 
@@ -0,0 +1,118 @@
+"""Facet counts per format, folder and tag, maintained on painting writes.
+
+Every painting contributes to the ``public`` scope (when public) and to its
+owner's ``user:<id>`` scope, both overall and narrowed to its folder, its
+format, or both. The facet sidebar for a scope, folder and format is then a
+couple of primary-key range reads instead of one ``GROUP BY`` scan per facet.
+"""
+from __future__ import annotations
+
+import logging
+from collections import Counter
+
+from sqlalchemy import delete, select
+
+from .aggregates import apply_deltas, prune_empty
+from .extensions import db
+from .models import FacetCount
+from .painting_events import on_painting_change, replay_paintings, snapshot_scopes
+from .tags import parse_tags
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("format", "folder", "tag")
+TOTAL = "_total"
+KEY_COLUMNS = ("scope", "facet", "value")
+
+_table = FacetCount.__table__
+
+
+def folder_scope(scope: str, folder: str) -> str:
+    return f"{scope}:f:{folder}"
+
+
+def format_scope(scope: str, image_format: str) -> str:
+    # Folders go last (see folder_scope), so free-form folder names cannot collide
+    return f"{scope}:t:{image_format}"
+
+
+def _keys(snapshot):
+    image_format = (snapshot["format"] or "").lower()
+    folder = snapshot["folder"] or ""
+    tags = parse_tags(snapshot["tags"])
+    for scope in snapshot_scopes(snapshot):
+        typed = format_scope(scope, image_format)
+        yield scope, "folder", folder
+        yield typed, "folder", folder
+        for narrowed in (scope, folder_scope(scope, folder)):
+            yield narrowed, "format", image_format
+        # Inside a format scope the format facet is the total, so it is not stored
+        for narrowed in (scope, folder_scope(scope, folder), typed, folder_scope(typed, folder)):
+            yield narrowed, TOTAL, ""
+            for tag in tags:
+                yield narrowed, "tag", tag
+
+
+@on_painting_change
+def _update_facets(connection, changes) -> None:
+    deltas: Counter = Counter()
+    for before, after in changes:
+        if before:
+            deltas.subtract(_keys(before))
+        if after:
+            deltas.update(_keys(after))
+    apply_deltas(connection, _table, KEY_COLUMNS, {k: {"count": d} for k, d in deltas.items()})
+    prune_empty(connection, _table, KEY_COLUMNS, [k for k, d in deltas.items() if d < 0], "count")
+
+
+def read_facets(scope: str, folder: str = "", image_format: str = "", *, tag_limit: int = 50) -> dict:
+    """Return ``{"total", "format", "folder", "tag"}`` for a scope and optional folder and format.
+
+    The folder facet always covers the whole scope (of that format) so the
+    sidebar can offer sibling folders while one is selected.
+    """
+    base = format_scope(scope, image_format) if image_format else scope
+    narrowed = folder_scope(base, folder) if folder else base
+    rows = db.session.execute(
+        select(FacetCount.scope, FacetCount.facet, FacetCount.value, FacetCount.count).where(
+            ((FacetCount.scope == narrowed) & FacetCount.facet.in_(("format", TOTAL)))
+            | ((FacetCount.scope == base) & (FacetCount.facet == "folder"))
+        )
+    ).all()
+    tags = db.session.execute(
+        select(FacetCount.value, FacetCount.count)
+        .where(FacetCount.scope == narrowed, FacetCount.facet == "tag")
+        .order_by(FacetCount.count.desc(), FacetCount.value)
+        .limit(tag_limit)
+    ).all()
+
+    result = {"total": 0, "format": [], "folder": [], "tag": []}
+    for _, facet, value, count in rows:
+        if facet == TOTAL:
+            result["total"] = count
+        else:
+            result[facet].append({"value": value, "count": count})
+    if image_format and result["total"]:
+        result["format"] = [{"value": image_format, "count": result["total"]}]
+    for facet in ("format", "folder"):
+        result[facet].sort(key=lambda item: (-item["count"], item["value"]))
+    result["tag"] = [{"value": value, "count": count} for value, count in tags]
+    return result
+
+
+def backfill_facets() -> None:
+    """Build facet counts from existing paintings if they were never built.
+
+    Counts from before format scopes existed are rebuilt as well.
+    """
+    with db.engine.begin() as conn:
+        if conn.execute(select(FacetCount.scope).limit(1)).first():
+            if conn.execute(
+                select(FacetCount.scope)
+                .where(FacetCount.facet == "folder", FacetCount.scope.like("%:t:%")).limit(1)
+            ).first():
+                return
+            conn.execute(delete(FacetCount))
+        total = replay_paintings(conn, _update_facets)
+    if total:
+        logger.info(f"Facet counts backfilled from {total} paintings")
@@ -0,0 +1,174 @@
+"""Deferred, throttled removal of image files that no painting uses any more.
+
+Deleting or replacing a painting only queues its old files in
+``pending_file_deletions``, in the same transaction as the row change, so a
+rolled back delete never loses files and the request never waits on disk.
+A background :class:`FileReaper` thread per process unlinks queued files in
+batches, capped at ``REAPER_MAX_FILES_PER_SECOND`` so a large deletion does
+not compete with image reads for disk bandwidth. The same thread expires
+abandoned resumable uploads (:func:`app.uploads.expire_sessions`).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+
+from .extensions import db
+from .models import Painting, PendingFileDeletion
+from .painting_events import on_painting_change
+from .uploads import expire_sessions
+
+logger = logging.getLogger(__name__)
+
+# Give up on a file after this many failed unlink attempts
+MAX_ATTEMPTS = 5
+
+_table = PendingFileDeletion.__table__
+
+
+def _files(snapshot) -> set[str]:
+    return {path for path in (snapshot["filename"], snapshot["thumbnail"]) if path} if snapshot else set()
+
+
+@on_painting_change
+def _enqueue_released_files(connection, changes) -> None:
+    released: set[str] = set()
+    for before, after in changes:
+        kept = {os.path.basename(path) for path in _files(after)}
+        # A file that moved keeps its (uniquely prefixed) name; it was renamed, not released
+        released |= {path for path in _files(before) - _files(after) if os.path.basename(path) not in kept}
+    if released:
+        now = datetime.utcnow()
+        connection.execute(insert(_table), [
+            {"path": path, "attempts": 0, "enqueued_at": now} for path in sorted(released)
+        ])
+
+
+def pending_count() -> int:
+    """Number of files still waiting to be deleted."""
+    return db.session.scalar(select(func.count()).select_from(_table))
+
+
+def reap_batch(batch_size: int | None = None, max_per_second: float | None = None) -> int:
+    """Unlink up to ``batch_size`` queued files; return how many entries were settled.
+
+    Paths that a painting references again (a file moved back into place
+    before the reaper got to it) are dropped from the queue without touching
+    the file.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get("REAPER_BATCH_SIZE", 200)
+    if max_per_second is None:
+        max_per_second = config.get("REAPER_MAX_FILES_PER_SECOND", 100)
+    image_dir = config["IMAGE_DIR"]
+
+    rows = db.session.execute(
+        select(_table.c.id, _table.c.path, _table.c.attempts).order_by(_table.c.id).limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+    paths = {row.path for row in rows}
+    in_use = set(db.session.scalars(
+        select(Painting.filename).where(Painting.filename.in_(paths))
+    )) | set(db.session.scalars(
+        select(Painting.thumbnail).where(Painting.thumbnail.in_(paths))
+    ))
+    db.session.rollback()  # do not hold a read transaction while touching the disk
+
+    done, failed = [], []
+    interval = 1.0 / max_per_second if max_per_second > 0 else 0
+    for row in rows:
+        if row.path not in in_use:
+            started = time.monotonic()
+            try:
+                os.unlink(os.path.join(image_dir, row.path))
+            except FileNotFoundError:
+                pass
+            except OSError as exc:
+                logger.warning(f"Could not delete {row.path}: {exc}")
+                failed.append(row)
+                continue
+            if interval:
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        done.append(row.id)
+
+    given_up = [row for row in failed if row.attempts + 1 >= MAX_ATTEMPTS]
+    for row in given_up:
+        logger.error(f"Giving up on deleting {row.path} after {MAX_ATTEMPTS} attempts")
+    done += [row.id for row in given_up]
+    retry = [row.id for row in failed if row not in given_up]
+    if done:
+        db.session.execute(delete(_table).where(_table.c.id.in_(done)))
+    if retry:
+        db.session.execute(
+            update(_table).where(_table.c.id.in_(retry)).values(attempts=_table.c.attempts + 1)
+        )
+    db.session.commit()
+    return len(done)
+
+
+def reap_all(**kwargs) -> int:
+    """Drain the queue (used by ``manage.py reap-files``); return entries settled."""
+    total = 0
+    while True:
+        settled = reap_batch(**kwargs)
+        if not settled:
+            return total
+        total += settled
+
+
+class FileReaper:
+    """Background thread draining the deletion queue of one app."""
+
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config.get("REAPER_INTERVAL", 5.0)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="file-reaper", daemon=True)
+
+    def start(self) -> "FileReaper":
+        self._thread.start()
+        return self
+
+    def wake(self) -> None:
+        """Start the next batch now instead of at the next interval."""
+        self._wake.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    # Keep going while full batches come back
+                    while not self._stop.is_set() and reap_batch() >= self.app.config.get("REAPER_BATCH_SIZE", 200):
+                        pass
+                    expire_sessions()
+                except Exception as exc:
+                    logger.error(f"File reaper batch failed: {exc}")
+                finally:
+                    db.session.remove()
+
+
+def init_app(app) -> None:
+    """Start the reaper thread unless disabled (tests and one-off commands)."""
+    if app.config.get("REAPER_ENABLED", True) and not app.config.get("TESTING"):
+        app.extensions["file_reaper"] = FileReaper(app).start()
+
+
+def wake_reaper() -> None:
+    reaper = current_app.extensions.get("file_reaper")
+    if reaper:
+        reaper.wake()
@@ -0,0 +1,180 @@
+"""Materialized folder tree per scope, maintained on painting writes.
+
+Folders only exist as the ``Painting.folder`` string. ``folder_stats`` keeps
+one row per (scope, folder) with the painting count, bytes on disk and a
+pointer to the newest painting, so a user's folder structure is read from a
+handful of rows instead of scanning all of their paintings. Folder strings
+containing ``/`` are presented as nested folders.
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+
+from sqlalchemy import and_, bindparam, null, or_, select, tuple_, update
+
+from .aggregates import apply_deltas, prune_empty
+from .extensions import db
+from .models import FolderStat, Painting
+from .painting_events import on_painting_change, replay_paintings, snapshot_scopes
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ("scope", "path")
+
+_table = FolderStat.__table__
+
+
+def _keys(snapshot):
+    return [(scope, snapshot["folder"] or "") for scope in snapshot_scopes(snapshot)]
+
+
+def _size(snapshot) -> int:
+    return (snapshot["file_size"] or 0) + (snapshot["thumbnail_size"] or 0)
+
+
+def _scope_filter(scope: str):
+    if scope == "public":
+        return Painting.is_public == True  # noqa: E712
+    return Painting.user_id == int(scope.split(":", 1)[1])
+
+
+@on_painting_change
+def _update_folder_stats(connection, changes) -> None:
+    deltas: dict = defaultdict(lambda: {"painting_count": 0, "total_bytes": 0})
+    removed: dict = {}
+    for before, after in changes:
+        if before:
+            for key in _keys(before):
+                deltas[key]["painting_count"] -= 1
+                deltas[key]["total_bytes"] -= _size(before)
+                removed[key + (before["id"],)] = key
+        if after:
+            for key in _keys(after):
+                deltas[key]["painting_count"] += 1
+                deltas[key]["total_bytes"] += _size(after)
+    apply_deltas(connection, _table, KEY_COLUMNS, deltas)
+    prune_empty(connection, _table, KEY_COLUMNS, list(deltas), "painting_count")
+
+    # Paintings that left a folder (or changed thumbnail) may have been its
+    # latest; re-select the pointer for those folders only.
+    if removed:
+        stale = connection.execute(
+            select(FolderStat.scope, FolderStat.path).where(
+                tuple_(FolderStat.scope, FolderStat.path, FolderStat.latest_painting_id).in_(
+                    list(removed)
+                )
+            )
+        ).all()
+        for scope, path in stale:
+            _recompute_latest(connection, scope, path)
+
+    # Paintings that arrived may be newer than the current pointer
+    arrivals = [
+        {"b_scope": scope, "b_path": path, "b_id": after["id"],
+         "b_thumb": after["thumbnail"], "b_created": after["created_at"]}
+        for _, after in changes if after
+        for scope, path in _keys(after)
+    ]
+    if arrivals:
+        connection.execute(
+            update(_table)
+            .where(
+                _table.c.scope == bindparam("b_scope"),
+                _table.c.path == bindparam("b_path"),
+                or_(
+                    _table.c.latest_painting_id.is_(None),
+                    tuple_(_table.c.latest_created_at, _table.c.latest_painting_id)
+                    <= tuple_(bindparam("b_created", type_=db.DateTime), bindparam("b_id")),
+                ),
+            )
+            .values(
+                latest_painting_id=bindparam("b_id"),
+                latest_thumbnail=bindparam("b_thumb"),
+                latest_created_at=bindparam("b_created"),
+            ),
+            arrivals,
+        )
+
+
+def _recompute_latest(connection, scope: str, path: str) -> None:
+    latest = connection.execute(
+        select(Painting.id, Painting.thumbnail, Painting.created_at)
+        .where(_scope_filter(scope), Painting.folder == path)
+        .order_by(Painting.created_at.desc(), Painting.id.desc())
+        .limit(1)
+    ).first()
+    connection.execute(
+        update(_table)
+        .where(and_(_table.c.scope == scope, _table.c.path == path))
+        .values(
+            latest_painting_id=latest.id if latest else null(),
+            latest_thumbnail=latest.thumbnail if latest else null(),
+            latest_created_at=latest.created_at if latest else null(),
+        )
+    )
+
+
+def folder_tree(scope: str) -> dict:
+    """Return the nested folder tree for ``scope``.
+
+    Each node carries its own ``painting_count``/``total_bytes`` plus
+    ``subtree_count``/``subtree_bytes`` including descendants, and the newest
+    painting anywhere in its subtree.
+    """
+    rows = db.session.execute(select(FolderStat).where(FolderStat.scope == scope)).scalars().all()
+
+    root = _node("", "")
+    nodes = {"": root}
+    for row in sorted(rows, key=lambda r: r.path):
+        node = _ensure_node(nodes, row.path)
+        node["painting_count"] = row.painting_count
+        node["total_bytes"] = row.total_bytes
+        if row.latest_painting_id:
+            node["latest"] = {
+                "painting_id": row.latest_painting_id,
+                "thumbnail_url": f"/media/images/{row.latest_thumbnail}" if row.latest_thumbnail else None,
+                "created_at": row.latest_created_at.isoformat() if row.latest_created_at else None,
+            }
+    _roll_up(root)
+    return root
+
+
+def _node(name: str, path: str) -> dict:
+    return {
+        "name": name, "path": path, "painting_count": 0, "total_bytes": 0,
+        "subtree_count": 0, "subtree_bytes": 0, "latest": None, "children": [],
+    }
+
+
+def _ensure_node(nodes: dict, path: str) -> dict:
+    if path in nodes:
+        return nodes[path]
+    parent_path, _, name = path.rpartition("/")
+    parent = _ensure_node(nodes, parent_path)
+    node = nodes[path] = _node(name, path)
+    parent["children"].append(node)
+    return node
+
+
+def _roll_up(node: dict) -> None:
+    node["subtree_count"] = node["painting_count"]
+    node["subtree_bytes"] = node["total_bytes"]
+    for child in node["children"]:
+        _roll_up(child)
+        node["subtree_count"] += child["subtree_count"]
+        node["subtree_bytes"] += child["subtree_bytes"]
+        if child["latest"] and (
+            not node["latest"] or child["latest"]["created_at"] > node["latest"]["created_at"]
+        ):
+            node["latest"] = child["latest"]
+
+
+def backfill_folder_stats() -> None:
+    """Build folder stats from existing paintings if they were never built."""
+    with db.engine.begin() as conn:
+        if conn.execute(select(FolderStat.scope).limit(1)).first():
+            return
+        total = replay_paintings(conn, _update_folder_stats)
+    if total:
+        logger.info(f"Folder stats backfilled from {total} paintings")
@@ -1,7 +1,7 @@
 """Database models."""
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from .extensions import db
+from .utils.passwords import hasher
 
 
 class User(db.Model):
@@ -18,12 +18,12 @@ class User(db.Model):
     paintings = db.relationship('Painting', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set password."""
-        self.password_hash = generate_password_hash(password, method='pbkdf2:sha256')
+        """Hash and set password (on the hashing pool)."""
+        self.password_hash = hasher().hash(password)
     
     def check_password(self, password):
-        """Verify password against hash."""
-        return check_password_hash(self.password_hash, password)
+        """Verify password against hash (on the hashing pool)."""
+        return hasher().verify(self.password_hash, password)
     
     def to_dict(self):
         """Return user as dictionary."""
@@ -55,40 +55,209 @@ class Painting(db.Model):
     is_public = db.Column(db.Boolean, default=False, nullable=False, index=True)
     tags = db.Column(db.Text, default='')
     thumbnail = db.Column(db.String(512))
+    file_size = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # bytes on disk
+    thumbnail_size = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     source_url = db.Column(db.String(1024))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     __table_args__ = (
         db.Index('idx_user_public_created', 'user_id', 'is_public', 'created_at'),
+        # Keyset pagination: equality prefix + (created_at, id) sort key
+        db.Index('idx_public_created_id', 'is_public', 'created_at', 'id'),
+        db.Index('idx_user_created_id', 'user_id', 'created_at', 'id'),
+        # Folder listings and latest-in-folder lookups
+        db.Index('idx_user_folder_created', 'user_id', 'folder', 'created_at'),
+        db.Index('idx_public_folder_created', 'is_public', 'folder', 'created_at'),
     )
     
     def to_dict(self):
         """Return painting as dictionary."""
+        return _painting_dict(self, self.user.username if self.user else None)
+    
+    def __repr__(self):
+        return f'<Painting {self.title}>'
+
+
+
+
+class Tag(db.Model):
+    """Normalized tag with maintained usage counters."""
+    __tablename__ = 'tags'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    painting_count = db.Column(db.Integer, default=0, nullable=False)
+    public_count = db.Column(db.Integer, default=0, nullable=False, index=True)
+    
+    def to_dict(self):
+        """Return tag as dictionary."""
         return {
-            'id': self.id,
-            'user_id': self.user_id,
-            'username': self.user.username if self.user else 'Anonymous',
-            'title': self.title,
-            'description': self.description,
-            'filename': self.filename,
-            'prefix': self.prefix,
-            'folder': self.folder,
-            'width': self.width,
-            'height': self.height,
-            'format': self.format,
-            'is_public': self.is_public,
-            'tags': self.tags,
-            'thumbnail': self.thumbnail,
-            'source_url': self.source_url,
-            # Add URLs for frontend convenience (served by media blueprint)
-            'image_url': f"/media/images/{self.filename}" if self.filename else None,
-            'thumbnail_url': f"/media/images/{self.thumbnail}" if self.thumbnail else None,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'name': self.name,
+            'painting_count': self.painting_count,
+            'public_count': self.public_count
         }
     
     def __repr__(self):
-        return f'<Painting {self.title}>'
+        return f'<Tag {self.name}>'
+
+
+# Painting <-> tag association, maintained by app.tags from Painting.tags
+painting_tags = db.Table(
+    'painting_tags',
+    db.Column('painting_id', db.Integer, db.ForeignKey('paintings.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('idx_painting_tags_tag', 'tag_id', 'painting_id'),
+)
+
+
+class FacetCount(db.Model):
+    """Maintained painting count for one facet value within a scope.
+
+    ``scope`` is ``public`` or ``user:<id>``, optionally narrowed to a folder
+    as ``<scope>:f:<folder>``. ``facet`` is ``format``, ``folder``, ``tag`` or
+    ``_total`` (with an empty ``value``).
+    """
+    __tablename__ = 'facet_counts'
+    
+    scope = db.Column(db.String(300), primary_key=True)
+    facet = db.Column(db.String(16), primary_key=True)
+    value = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_facet_counts_top', 'scope', 'facet', 'count'),
+    )
+
+
+class UserUsage(db.Model):
+    """Maintained storage totals for one user, used for quota checks."""
+    __tablename__ = 'user_usage'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    painting_count = db.Column(db.Integer, default=0, nullable=False)
+    original_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    derivative_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    
+    def to_dict(self):
+        """Return usage as dictionary."""
+        return {
+            'painting_count': self.painting_count,
+            'original_bytes': self.original_bytes,
+            'derivative_bytes': self.derivative_bytes,
+            'total_bytes': self.original_bytes + self.derivative_bytes
+        }
+
+
+class FolderStat(db.Model):
+    """Maintained per-folder totals for one scope (``public`` or ``user:<id>``)."""
+    __tablename__ = 'folder_stats'
+    
+    scope = db.Column(db.String(64), primary_key=True)
+    path = db.Column(db.String(255), primary_key=True)
+    painting_count = db.Column(db.Integer, default=0, nullable=False)
+    total_bytes = db.Column(db.BigInteger, default=0, nullable=False)
+    latest_painting_id = db.Column(db.Integer)
+    latest_thumbnail = db.Column(db.String(512))
+    latest_created_at = db.Column(db.DateTime)
+
+
+class CacheVersion(db.Model):
+    """Version counter per listing scope, bumped on every painting write in it."""
+    __tablename__ = 'cache_versions'
+    
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+
+
+class AppMeta(db.Model):
+    """Key/value facts about the database itself, such as its bootstrap version."""
+    __tablename__ = 'app_meta'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.String(255), nullable=False)
+
+
+class PendingFileDeletion(db.Model):
+    """Image file waiting for the background reaper to unlink it."""
+    __tablename__ = 'pending_file_deletions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(512), nullable=False)  # relative to IMAGE_DIR
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    enqueued_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class UploadSession(db.Model):
+    """Resumable upload in progress; its bytes are assembled in a spool file."""
+    __tablename__ = 'upload_sessions'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=True, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    fields = db.Column(db.Text, default='{}', nullable=False)  # JSON painting metadata
+    state = db.Column(db.String(16), default='open', nullable=False)  # open | finalizing
+    claimed_at = db.Column(db.DateTime, nullable=True)  # when finalizing began
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class UploadChunk(db.Model):
+    """One received byte range of an upload (append-only, so parallel PUTs never race)."""
+    __tablename__ = 'upload_chunks'
+
+    session_id = db.Column(db.String(32), db.ForeignKey('upload_sessions.id', ondelete='CASCADE'), primary_key=True)
+    offset = db.Column(db.BigInteger, primary_key=True)
+    length = db.Column(db.BigInteger, primary_key=True)
+
+
+# Columns needed to serialize a painting for list endpoints.
+PAINTING_LIST_COLUMNS = (
+    Painting.id, Painting.user_id, Painting.title, Painting.description,
+    Painting.filename, Painting.prefix, Painting.folder, Painting.width,
+    Painting.height, Painting.format, Painting.is_public, Painting.tags,
+    Painting.thumbnail, Painting.source_url, Painting.created_at, Painting.updated_at,
+)
+
+
+def painting_list_query():
+    """Column-only painting query with the owner's username joined in.
+
+    Returns plain rows instead of ORM instances, so serializing a page costs a
+    single SELECT no matter how many owners appear on it. Filter with explicit
+    ``Painting.<column>`` expressions: ``filter_by`` would target ``User``.
+    """
+    return db.session.query(*PAINTING_LIST_COLUMNS, User.username).outerjoin(
+        User, User.id == Painting.user_id
+    )
+
+
+def painting_row_to_dict(row):
+    """Serialize a row from :func:`painting_list_query`."""
+    return _painting_dict(row, row.username)
 
 
+def _painting_dict(p, username):
+    return {
+        'id': p.id,
+        'user_id': p.user_id,
+        'username': username or 'Anonymous',
+        'title': p.title,
+        'description': p.description,
+        'filename': p.filename,
+        'prefix': p.prefix,
+        'folder': p.folder,
+        'width': p.width,
+        'height': p.height,
+        'format': p.format,
+        'is_public': p.is_public,
+        'tags': p.tags,
+        'thumbnail': p.thumbnail,
+        'source_url': p.source_url,
+        # Add URLs for frontend convenience (served by media blueprint)
+        'image_url': f"/media/images/{p.filename}" if p.filename else None,
+        'thumbnail_url': f"/media/images/{p.thumbnail}" if p.thumbnail else None,
+        'created_at': p.created_at.isoformat() if p.created_at else None,
+        'updated_at': p.updated_at.isoformat() if p.updated_at else None
+    }
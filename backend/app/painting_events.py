@@ -0,0 +1,122 @@
+"""Keep data derived from ``paintings`` in step with painting writes.
+
+Derived tables (tag index, aggregates, ...) register a handler with
+:func:`on_painting_change`. Handlers run inside the writing transaction and
+receive the connection plus a list of ``(before, after)`` snapshot pairs:
+``before`` is ``None`` for inserts and ``after`` is ``None`` for deletes.
+
+ORM writes are picked up automatically from the session flush. Set-based
+``UPDATE``/``DELETE`` statements bypass the ORM, so code issuing them must
+take snapshots with :func:`snapshot_paintings` and call :func:`dispatch`
+itself, once per batch.
+"""
+from __future__ import annotations
+
+from typing import Callable, Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from .models import Painting
+
+# Painting columns handlers may rely on
+SNAPSHOT_FIELDS = (
+    "id", "user_id", "is_public", "folder", "format", "tags", "filename", "thumbnail",
+    "created_at", "file_size", "thumbnail_size",
+)
+
+Snapshot = dict
+Change = tuple  # (Snapshot | None, Snapshot | None)
+
+_handlers: list[Callable] = []
+
+
+def scope_for(user_id: int | None) -> str:
+    """Listing scope for ``user_id``: ``user:<id>``, or ``public`` for the public feed."""
+    return f"user:{user_id}" if user_id else "public"
+
+
+def snapshot_scopes(snapshot: Snapshot) -> list[str]:
+    """Listing scopes a painting appears in: its owner's and, if public, ``public``."""
+    scopes = []
+    if snapshot["user_id"]:
+        scopes.append(scope_for(snapshot["user_id"]))
+    if snapshot["is_public"]:
+        scopes.append("public")
+    return scopes
+
+
+def on_painting_change(handler: Callable) -> Callable:
+    """Register ``handler(connection, changes)``; usable as a decorator."""
+    _handlers.append(handler)
+    return handler
+
+
+def dispatch(connection, changes: list[Change]) -> None:
+    """Run every registered handler for ``changes``."""
+    changes = [change for change in changes if change[0] != change[1]]
+    if not changes:
+        return
+    for handler in _handlers:
+        handler(connection, changes)
+
+
+def snapshot_paintings(connection, ids: Iterable[int]) -> dict[int, Snapshot]:
+    """Load snapshots for ``ids`` straight from the database."""
+    ids = list(ids)
+    if not ids:
+        return {}
+    columns = [getattr(Painting, field) for field in SNAPSHOT_FIELDS]
+    rows = connection.execute(select(*columns).where(Painting.id.in_(ids)))
+    return {row.id: dict(row._mapping) for row in rows}
+
+
+def replay_paintings(connection, handler: Callable, *, batch_size: int = 1000) -> int:
+    """Feed every existing painting to ``handler`` as an insert.
+
+    Used to build a derived table for the first time. Returns the number of
+    paintings replayed.
+    """
+    columns = [getattr(Painting, field) for field in SNAPSHOT_FIELDS]
+    last_id, total = 0, 0
+    while True:
+        rows = connection.execute(
+            select(*columns).where(Painting.id > last_id).order_by(Painting.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        handler(connection, [(None, dict(row._mapping)) for row in rows])
+        last_id = rows[-1].id
+        total += len(rows)
+
+
+def _current(painting: Painting) -> Snapshot:
+    return {field: getattr(painting, field) for field in SNAPSHOT_FIELDS}
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_previous_state(session, flush_context, instances) -> None:
+    # Attribute history is incomplete for expired attributes, so read the
+    # pre-flush state of modified and deleted paintings from the database.
+    ids = [
+        obj.id for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, Painting) and obj.id is not None
+    ]
+    session.info["painting_snapshots"] = snapshot_paintings(session.connection(), ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_painting_changes(session, flush_context) -> None:
+    previous = session.info.pop("painting_snapshots", {})
+    changes: list[Change] = []
+    for obj in session.new:
+        if isinstance(obj, Painting):
+            changes.append((None, _current(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Painting) and obj.id in previous:
+            changes.append((previous[obj.id], _current(obj)))
+    for obj in session.deleted:
+        if isinstance(obj, Painting) and obj.id in previous:
+            changes.append((previous[obj.id], None))
+    if changes:
+        dispatch(session.connection(), changes)
@@ -0,0 +1,191 @@
+"""Cached JSON responses for list endpoints, invalidated by scope versions.
+
+Views decorated with :func:`cached_response` name the listing scope a
+request reads (``public`` or ``user:<id>``). The cache key combines the
+endpoint, that scope's write version (see :mod:`app.counting`) and the
+normalized query string, so any painting write in the scope makes every
+older entry unreachable for all workers; entries also expire after
+``RESPONSE_CACHE_TTL`` seconds as a backstop for writes outside the hook.
+
+To keep hits off the database entirely, scope versions are themselves cached
+per process for ``RESPONSE_CACHE_VERSION_TTL`` seconds (writes made in this
+process drop them immediately). Other workers therefore serve at most that
+many seconds of stale listings.
+
+Storage is pluggable: ``RESPONSE_CACHE_BACKEND`` names a factory registered
+with :func:`register_backend`. ``memory`` (per-process LRU) and ``none`` ship
+here; a shared store only has to provide ``get``/``set``/``clear`` over
+string keys and bytes-like values.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from functools import wraps
+from typing import Callable
+from urllib.parse import urlencode
+
+from flask import Response, current_app, g, has_app_context, make_response, request
+
+from .counting import scope_version
+from .painting_events import on_painting_change, snapshot_scopes
+from .utils.etags import not_modified, tagged, weak_etag
+from .utils.lru import LRUCache
+from .utils.metrics import cache_lookup
+
+
+class NullBackend:
+    """Backend that stores nothing (``RESPONSE_CACHE_BACKEND=none``)."""
+
+    evictions = 0
+
+    def __len__(self) -> int:
+        return 0
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+
+_backends: dict[str, Callable] = {
+    "memory": lambda app: LRUCache(app.config.get("RESPONSE_CACHE_SIZE", 1024)),
+    "none": lambda app: NullBackend(),
+}
+
+
+def register_backend(name: str, factory: Callable) -> None:
+    """Make ``factory(app)`` available as ``RESPONSE_CACHE_BACKEND=name``."""
+    _backends[name] = factory
+
+
+class ResponseCache:
+    """Per-app response cache with hit-rate counters."""
+
+    def __init__(self, app) -> None:
+        backend = app.config.get("RESPONSE_CACHE_BACKEND", "memory")
+        if backend not in _backends:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND {backend!r}")
+        self.backend_name = backend
+        self.backend = _backends[backend](app)
+        self.ttl = app.config.get("RESPONSE_CACHE_TTL", 300)
+        self.version_ttl = app.config.get("RESPONSE_CACHE_VERSION_TTL", 1.0)
+        self._versions: dict[str, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.stores = 0
+
+    def version(self, scope: str) -> int:
+        now = time.monotonic()
+        cached = self._versions.get(scope)
+        if cached and cached[1] > now:
+            # Counts computed on a miss are keyed on the same version
+            g.setdefault("scope_versions", {})[scope] = cached[0]
+            return cached[0]
+        version = scope_version(scope)
+        self._versions[scope] = (version, now + self.version_ttl)
+        return version
+
+    def forget_versions(self, scopes) -> None:
+        for scope in scopes:
+            self._versions.pop(scope, None)
+
+    def get(self, key: str) -> bytes | None:
+        entry = self.backend.get(key)
+        hit = entry is not None and entry[1] > time.time()
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[0] if hit else None
+
+    def set(self, key: str, body: bytes) -> None:
+        self.backend.set(key, (body, time.time() + self.ttl))
+        with self._lock:
+            self.stores += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+        self._versions.clear()
+        with self._lock:
+            self.hits = self.misses = self.stores = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.backend.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+def init_app(app) -> None:
+    app.extensions["response_cache"] = ResponseCache(app)
+
+
+def cache_key(scope: str, version: int) -> str:
+    """Key for the current request: endpoint, scope version and sorted query string."""
+    params = sorted((key, value.strip()) for key, values in request.args.lists() for value in values)
+    return f"{request.endpoint}|{scope}|{version}|{urlencode(params)}"
+
+
+def cached_response(scope_for_request: Callable[[], str | None]):
+    """Serve a view's 200 JSON responses from the cache.
+
+    ``scope_for_request()`` returns the listing scope the request reads, or
+    ``None`` to bypass the cache. Responses carry a weak ETag derived from the
+    cache key, so a client revalidating with ``If-None-Match`` gets a ``304``
+    without a cache lookup or any query beyond the version check.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get("response_cache")
+            scope = scope_for_request() if cache is not None else None
+            if scope is None:
+                return view(*args, **kwargs)
+
+            key = cache_key(scope, cache.version(scope))
+            etag = weak_etag(key)
+            unchanged = not_modified(etag)
+            if unchanged is not None:
+                cache_lookup("response", True)
+                return unchanged
+
+            body = cache.get(key)
+            cache_lookup("response", body is not None)
+            if body is not None:
+                response = Response(body, status=200, mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                return tagged(response, etag)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and response.is_json:
+                cache.set(key, response.get_data())
+            response.headers["X-Cache"] = "MISS"
+            return tagged(response, etag)
+        return wrapper
+    return decorator
+
+
+@on_painting_change
+def _forget_local_versions(connection, changes) -> None:
+    # Writes from this process should not wait out the version TTL here
+    if not has_app_context():
+        return
+    cache = current_app.extensions.get("response_cache")
+    if cache is not None:
+        cache.forget_versions({
+            scope
+            for change in changes
+            for snapshot in change if snapshot
+            for scope in snapshot_scopes(snapshot)
+        })
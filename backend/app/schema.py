@@ -0,0 +1,81 @@
+"""Schema maintenance that ``db.create_all()`` does not cover.
+
+``create_all`` skips tables that already exist, so columns and indexes added
+to a model after the table was first created never reach existing databases.
+The helpers here bring an existing database up to date and are safe to run
+repeatedly. They also own database objects SQLAlchemy does not model, such
+as the full-text search index, and backfill derived tables (tag index, facet
+counts, folder stats, storage usage) the first time they appear.
+"""
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import inspect
+
+from .extensions import db
+from .facets import backfill_facets
+from .folders import backfill_folder_stats
+from .search_index import ensure_search_index
+from .tags import backfill_tags
+from .usage import backfill_usage, refresh_file_sizes
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_schema() -> None:
+    """Bring an existing database up to date with the models."""
+    added = _ensure_columns()
+    _ensure_indexes()
+    ensure_search_index()
+    if ("paintings", "file_size") in added:
+        _backfill_file_sizes()
+    backfill_tags()
+    backfill_facets()
+    backfill_folder_stats()
+    backfill_usage()
+
+
+def _ensure_columns() -> set[tuple[str, str]]:
+    """Add model columns missing from existing tables; return what was added.
+
+    Only columns that are nullable or carry a scalar default can be added this
+    way, which is how new columns should be declared.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(engine.dialect)}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                elif column.default is not None and column.default.is_scalar:
+                    ddl += f" DEFAULT {column.default.arg!r}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.exec_driver_sql(ddl)
+                added.add((table.name, column.name))
+                logger.info(f"Added column {table.name}.{column.name}")
+    return added
+
+
+def _ensure_indexes() -> None:
+    """Create any indexes declared on the models but missing in the database."""
+    engine = db.engine
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def _backfill_file_sizes() -> None:
+    """Fill ``file_size``/``thumbnail_size`` for rows created before they existed."""
+    with db.engine.begin() as conn:
+        changed = refresh_file_sizes(conn)
+    logger.info(f"File sizes recorded for {changed} paintings")
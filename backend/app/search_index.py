@@ -0,0 +1,211 @@
+"""Full-text search index over painting title, description and tags.
+
+Each database gets its native implementation:
+
+* SQLite: an external-content FTS5 table kept in sync with ``paintings`` by
+  triggers, so every write path (ORM, bulk UPDATE, raw SQL) updates it in the
+  same transaction. Ranked with ``bm25()``.
+* PostgreSQL: a stored generated ``tsvector`` column with a GIN index, ranked
+  with ``ts_rank_cd()``; with ``pg_trgm`` installed, titles also match on
+  trigram word similarity, which tolerates typos.
+* Anything else falls back to ``LIKE`` matching.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from sqlalchemy import column, func, literal_column, or_, table
+
+from .extensions import db
+from .models import Painting
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "paintings_fts"
+
+# bm25() column weights, in FTS column order: title, description, tags
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_fts_table = table(FTS_TABLE, column("rowid"))
+
+# Search backend per database URL, probed once
+_backends: dict[str, str] = {}
+
+_FTS_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description, tags,
+        content='paintings', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON paintings BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON paintings BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description, tags ON paintings BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, tags)
+        VALUES ('delete', old.id, old.title, old.description, old.tags);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, tags)
+        VALUES (new.id, new.title, new.description, new.tags);
+    END
+    """,
+)
+
+# 'simple' config: no stemming or stop words, matching FTS5's unicode61
+_TSVECTOR_DDL = (
+    """
+    ALTER TABLE paintings ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(tags, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_paintings_search ON paintings USING GIN (search_vector)",
+)
+
+_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_paintings_title_trgm ON paintings USING GIN (title gin_trgm_ops)",
+)
+
+
+def search_backend() -> str:
+    """Return ``fts5``, ``tsvector``, ``tsvector+trgm`` or ``like`` for the bound database."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backends:
+        _backends[key] = _probe_backend(engine)
+    return _backends[key]
+
+
+def _probe_backend(engine) -> str:
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            options = {row[0] for row in conn.exec_driver_sql("PRAGMA compile_options")}
+            return "fts5" if "ENABLE_FTS5" in options else "like"
+        if engine.dialect.name == "postgresql":
+            has_vector = conn.exec_driver_sql(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'paintings' AND column_name = 'search_vector'"
+            ).first()
+            if not has_vector:
+                return "like"
+            has_trgm = conn.exec_driver_sql(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            ).first()
+            return "tsvector+trgm" if has_trgm else "tsvector"
+    return "like"
+
+
+def fts_available() -> bool:
+    """Return True when the bound database is SQLite with FTS5 compiled in."""
+    return search_backend() == "fts5"
+
+
+def ensure_search_index() -> None:
+    """Create the native search index for the bound database."""
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        _ensure_tsvector(engine)
+    elif fts_available():
+        _ensure_fts5(engine)
+    else:
+        logger.info("No full-text index available; search falls back to LIKE matching")
+    # Probe now so the first search request does not pay for it
+    _backends[str(engine.url)] = _probe_backend(engine)
+
+
+def _ensure_fts5(engine) -> None:
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        for statement in _FTS_DDL:
+            conn.exec_driver_sql(statement)
+        if not exists:
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            logger.info("Search index built")
+
+
+def _ensure_tsvector(engine) -> None:
+    # The generated column is computed for existing rows when it is added
+    with engine.begin() as conn:
+        for statement in _TSVECTOR_DDL:
+            conn.exec_driver_sql(statement)
+    try:
+        with engine.begin() as conn:
+            for statement in _TRGM_DDL:
+                conn.exec_driver_sql(statement)
+    except Exception as exc:
+        # CREATE EXTENSION needs privileges the app role may not have
+        logger.warning(f"pg_trgm unavailable, typo-tolerant title search disabled: {exc}")
+
+
+def build_match(term: str | None) -> str | None:
+    """Translate user input into an FTS5 MATCH expression.
+
+    Every word of ``term`` becomes a quoted prefix query (``"wat"*`` matches
+    ``watercolor``) and all words must match.
+    """
+    return " ".join(f'"{token}"*' for token in _TOKEN_RE.findall(term or "")) or None
+
+
+def build_tsquery(term: str | None) -> str | None:
+    """PostgreSQL equivalent of :func:`build_match` for ``to_tsquery``."""
+    return " & ".join(f"{token.lower()}:*" for token in _TOKEN_RE.findall(term or "")) or None
+
+
+def apply_search(query, term: str | None):
+    """Restrict ``query`` to matching paintings, best matches first.
+
+    Returns the filtered query and whether ranking was applied; callers add
+    their own ordering when it was not.
+    """
+    backend = search_backend()
+    if backend == "fts5":
+        match = build_match(term)
+        if not match:
+            return query, False
+        fts = literal_column(FTS_TABLE)
+        query = (
+            query.join(_fts_table, _fts_table.c.rowid == Painting.id)
+            .filter(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, *BM25_WEIGHTS), Painting.id.desc())
+        )
+        return query, True
+
+    if backend.startswith("tsvector"):
+        tsquery_text = build_tsquery(term)
+        if not tsquery_text:
+            return query, False
+        vector = literal_column("paintings.search_vector")
+        tsquery = func.to_tsquery("simple", tsquery_text)
+        matches = vector.op("@@")(tsquery)
+        rank = func.ts_rank_cd(vector, tsquery)
+        if backend == "tsvector+trgm":
+            matches = or_(matches, Painting.title.op("%>")(term))
+            rank = rank + func.word_similarity(term, Painting.title)
+        return query.filter(matches).order_by(rank.desc(), Painting.id.desc()), True
+
+    # Portable fallback: substring scans
+    for word in _TOKEN_RE.findall(term or ""):
+        like = f"%{word}%"
+        query = query.filter(or_(
+            Painting.title.ilike(like), Painting.description.ilike(like), Painting.tags.ilike(like)
+        ))
+    return query, False
@@ -0,0 +1,141 @@
+"""Normalized tag index derived from the free-text ``Painting.tags`` column.
+
+``Painting.tags`` stays the source of truth: it is what clients send and
+receive. The ``tags`` and ``painting_tags`` tables are rebuilt from it on
+every painting write, so tag filters, counts and popularity are index
+lookups rather than ``LIKE`` scans (which also matched ``cat`` in
+``catalog``).
+"""
+from __future__ import annotations
+
+import logging
+import re
+from collections import Counter
+
+from sqlalchemy import and_, bindparam, delete, func, insert, select, update
+
+from .aggregates import upsert_insert
+from .extensions import db
+from .models import Painting, Tag, painting_tags
+from .painting_events import on_painting_change, replay_paintings
+
+logger = logging.getLogger(__name__)
+
+MAX_TAG_LENGTH = 64
+
+_SPACE_RE = re.compile(r"\s+")
+_tags = Tag.__table__
+
+
+def parse_tags(text: str | None) -> list[str]:
+    """Split a comma-separated tag string into normalized, unique names."""
+    names: list[str] = []
+    for raw in (text or "").split(","):
+        name = _SPACE_RE.sub(" ", raw).strip().lower()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def filter_by_tags(query, names: list[str], *, match_all: bool = True):
+    """Restrict ``query`` to paintings carrying all (or any) of ``names``."""
+    if not names:
+        return query
+    matching = select(painting_tags.c.painting_id).where(
+        painting_tags.c.tag_id.in_(select(Tag.id).where(Tag.name.in_(names)))
+    )
+    if match_all:
+        matching = matching.group_by(painting_tags.c.painting_id).having(
+            func.count() == len(names)
+        )
+    return query.filter(Painting.id.in_(matching))
+
+
+def _tag_ids(connection, names: set[str]) -> dict[str, int]:
+    """Return ids for ``names``, creating missing tags."""
+    if not names:
+        return {}
+    ids = dict(connection.execute(select(Tag.name, Tag.id).where(Tag.name.in_(names))).all())
+    missing = names - ids.keys()
+    if missing:
+        upsert = upsert_insert(connection)
+        # A concurrent writer may create the same tag between select and insert
+        stmt = upsert(_tags).on_conflict_do_nothing(index_elements=["name"]) if upsert else insert(_tags)
+        connection.execute(stmt, [
+            {"name": name, "painting_count": 0, "public_count": 0} for name in missing
+        ])
+        ids.update(connection.execute(
+            select(Tag.name, Tag.id).where(Tag.name.in_(missing))
+        ).all())
+    return ids
+
+
+@on_painting_change
+def _sync_painting_tags(connection, changes) -> None:
+    removed: list[tuple[int, str]] = []
+    added: list[tuple[int, str]] = []
+    counts: Counter[str] = Counter()
+    public_counts: Counter[str] = Counter()
+
+    for before, after in changes:
+        old = set(parse_tags(before["tags"])) if before else set()
+        new = set(parse_tags(after["tags"])) if after else set()
+        was_public = bool(before and before["is_public"])
+        is_public = bool(after and after["is_public"])
+        painting_id = (after or before)["id"]
+
+        for name in old - new:
+            removed.append((painting_id, name))
+            counts[name] -= 1
+            public_counts[name] -= was_public
+        for name in new - old:
+            added.append((painting_id, name))
+            counts[name] += 1
+            public_counts[name] += is_public
+        if was_public != is_public:
+            for name in old & new:
+                public_counts[name] += 1 if is_public else -1
+
+    touched = set(counts) | set(public_counts)
+    if not touched:
+        return
+    ids = _tag_ids(connection, touched)
+
+    if removed:
+        connection.execute(
+            delete(painting_tags).where(and_(
+                painting_tags.c.painting_id == bindparam("b_painting"),
+                painting_tags.c.tag_id == bindparam("b_tag"),
+            )),
+            [{"b_painting": pid, "b_tag": ids[name]} for pid, name in removed],
+        )
+    if added:
+        connection.execute(insert(painting_tags), [
+            {"painting_id": pid, "tag_id": ids[name]} for pid, name in added
+        ])
+
+    deltas = [
+        {"b_tag": ids[name], "b_count": counts[name], "b_public": public_counts[name]}
+        for name in touched if counts[name] or public_counts[name]
+    ]
+    if deltas:
+        connection.execute(
+            update(_tags).where(_tags.c.id == bindparam("b_tag")).values(
+                painting_count=_tags.c.painting_count + bindparam("b_count"),
+                public_count=_tags.c.public_count + bindparam("b_public"),
+            ),
+            deltas,
+        )
+    connection.execute(
+        delete(_tags).where(_tags.c.id.in_(ids.values()), _tags.c.painting_count <= 0)
+    )
+
+
+def backfill_tags() -> None:
+    """Populate the tag index from ``Painting.tags`` if it has never been built."""
+    with db.engine.begin() as conn:
+        if conn.execute(select(painting_tags.c.tag_id).limit(1)).first():
+            return
+        total = replay_paintings(conn, _sync_painting_tags)
+    if total:
+        logger.info(f"Tag index backfilled from {total} paintings")
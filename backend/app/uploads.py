@@ -0,0 +1,161 @@
+"""Resumable chunked uploads.
+
+A client creates a session with the final size and the painting metadata,
+PUTs chunks at byte offsets (in any order, in parallel, retried as often as
+needed) and finalizes the session once every byte has arrived. Chunks are
+written with ``os.pwrite`` straight into a spool file of the final size
+under ``UPLOAD_DIR``. Each received range is its own ``upload_chunks`` row,
+so writers in different workers never update the same record. Sessions
+idle for longer than ``UPLOAD_SESSION_TTL`` are removed, spool file and all,
+by :func:`expire_sessions`, which the file reaper runs. A worker that dies
+while finalizing leaves its claim behind; once it is older than
+``UPLOAD_FINALIZE_TIMEOUT`` the client's next finalize takes it over.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, delete, insert, or_, select, update
+
+from .aggregates import upsert_insert
+from .extensions import db
+from .models import UploadChunk, UploadSession
+
+logger = logging.getLogger(__name__)
+
+_BLOCK = 1 << 20
+_chunks = UploadChunk.__table__
+_sessions = UploadSession.__table__
+
+
+def spool_path(session_id: str) -> str:
+    return os.path.join(current_app.config['UPLOAD_DIR'], f'{session_id}.part')
+
+
+def _expiry() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=current_app.config.get('UPLOAD_SESSION_TTL', 86400))
+
+
+def create_session(user_id: int | None, filename: str, size: int, fields: dict) -> UploadSession:
+    """Open a session and allocate its spool file."""
+    session = UploadSession(id=uuid.uuid4().hex, user_id=user_id, filename=filename, size=size,
+                            fields=json.dumps(fields), expires_at=_expiry())
+    os.makedirs(current_app.config['UPLOAD_DIR'], exist_ok=True)
+    with open(spool_path(session.id), 'wb') as spool:
+        spool.truncate(size)
+    db.session.add(session)
+    db.session.commit()
+    return session
+
+
+def write_chunk(session: UploadSession, offset: int, stream, length: int) -> int:
+    """Copy ``length`` bytes from ``stream`` to ``offset``; return how many arrived.
+
+    Only the bytes actually written are recorded, so a chunk cut short by a
+    dropped connection shows up as a partial range the client can resend.
+    """
+    fd = os.open(spool_path(session.id), os.O_WRONLY)
+    written = 0
+    try:
+        while written < length:
+            block = stream.read(min(_BLOCK, length - written))
+            if not block:
+                break
+            os.pwrite(fd, block, offset + written)
+            written += len(block)
+    finally:
+        os.close(fd)
+    if written:
+        _record(offset, written, session.id)
+    return written
+
+
+def _record(offset: int, length: int, session_id: str) -> None:
+    connection = db.session.connection()
+    row = {'session_id': session_id, 'offset': offset, 'length': length}
+    upsert = upsert_insert(connection)
+    if upsert is not None:
+        connection.execute(upsert(_chunks).values(row).on_conflict_do_nothing())
+    elif connection.execute(select(_chunks.c.offset).filter_by(**row)).first() is None:
+        connection.execute(insert(_chunks).values(row))
+    connection.execute(update(_sessions).where(_sessions.c.id == session_id).values(expires_at=_expiry()))
+    db.session.commit()
+
+
+def received_ranges(session_id: str) -> list[list[int]]:
+    """Merged ``[start, end)`` byte ranges received so far."""
+    rows = db.session.execute(
+        select(_chunks.c.offset, _chunks.c.length)
+        .where(_chunks.c.session_id == session_id).order_by(_chunks.c.offset)
+    ).all()
+    ranges: list[list[int]] = []
+    for offset, length in rows:
+        if ranges and offset <= ranges[-1][1]:
+            ranges[-1][1] = max(ranges[-1][1], offset + length)
+        else:
+            ranges.append([offset, offset + length])
+    return ranges
+
+
+def is_complete(ranges: list[list[int]], size: int) -> bool:
+    return size == 0 or ranges == [[0, size]]
+
+
+def claim(session_id: str, now: datetime | None = None) -> bool:
+    """Move a session to ``finalizing``; False if someone else is finalizing it.
+
+    A claim older than ``UPLOAD_FINALIZE_TIMEOUT`` belongs to a worker that
+    died mid-way and is taken over.
+    """
+    now = now or datetime.utcnow()
+    stale = now - timedelta(seconds=current_app.config.get('UPLOAD_FINALIZE_TIMEOUT', 600))
+    claimable = or_(
+        _sessions.c.state == 'open',
+        and_(_sessions.c.state == 'finalizing',
+             or_(_sessions.c.claimed_at.is_(None), _sessions.c.claimed_at < stale)),
+    )
+    result = db.session.execute(
+        update(_sessions).where(_sessions.c.id == session_id, claimable)
+        .values(state='finalizing', claimed_at=now)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def release(session_id: str) -> None:
+    """Reopen a session whose finalization failed, so the client can retry it."""
+    db.session.execute(
+        update(_sessions).where(_sessions.c.id == session_id).values(state='open', claimed_at=None)
+    )
+    db.session.commit()
+
+
+def discard(session_ids: list[str]) -> None:
+    """Drop sessions, their chunk records and their spool files."""
+    if not session_ids:
+        return
+    db.session.execute(delete(_chunks).where(_chunks.c.session_id.in_(session_ids)))
+    db.session.execute(delete(_sessions).where(_sessions.c.id.in_(session_ids)))
+    db.session.commit()
+    for session_id in session_ids:
+        try:
+            os.remove(spool_path(session_id))
+        except FileNotFoundError:
+            pass
+
+
+def expire_sessions(now: datetime | None = None) -> int:
+    """Discard sessions idle past their expiry; return how many."""
+    now = now or datetime.utcnow()
+    expired = list(db.session.scalars(
+        select(_sessions.c.id).where(_sessions.c.expires_at < now)
+    ))
+    discard(expired)
+    if expired:
+        logger.info(f"Expired {len(expired)} abandoned upload sessions")
+    return len(expired)
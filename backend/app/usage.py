@@ -0,0 +1,167 @@
+"""Per-user storage accounting and quota checks.
+
+``user_usage`` holds painting count and byte totals per user, kept current
+by the painting change hook in the same transaction as the write. Quota
+checks are therefore a primary-key read instead of a walk over the user's
+image directory. :func:`reconcile_usage` repairs any drift.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from collections import defaultdict
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, select, update
+
+from .aggregates import apply_deltas
+from .extensions import db
+from .models import Painting, UserUsage
+from .painting_events import dispatch, on_painting_change, replay_paintings, snapshot_paintings
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ("user_id",)
+
+_table = UserUsage.__table__
+
+
+def _empty():
+    return {"painting_count": 0, "original_bytes": 0, "derivative_bytes": 0}
+
+
+@on_painting_change
+def _update_usage(connection, changes) -> None:
+    deltas: dict = defaultdict(_empty)
+    for before, after in changes:
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot and snapshot["user_id"]:
+                delta = deltas[(snapshot["user_id"],)]
+                delta["painting_count"] += sign
+                delta["original_bytes"] += sign * (snapshot["file_size"] or 0)
+                delta["derivative_bytes"] += sign * (snapshot["thumbnail_size"] or 0)
+    apply_deltas(connection, _table, KEY_COLUMNS, deltas)
+
+
+def get_usage(user_id: int) -> dict:
+    """Return the usage totals for ``user_id`` (zeros when nothing is stored)."""
+    usage = db.session.get(UserUsage, user_id)
+    return usage.to_dict() if usage else {**_empty(), "total_bytes": 0}
+
+
+def check_quota(user_id: int | None, incoming_bytes: int, *, new_paintings: int = 1) -> str | None:
+    """Return an error message if storing ``incoming_bytes`` would exceed a quota."""
+    if not user_id:
+        return None
+    max_paintings = current_app.config.get("QUOTA_MAX_PAINTINGS", 0)
+    max_bytes = current_app.config.get("QUOTA_MAX_BYTES", 0)
+    if not max_paintings and not max_bytes:
+        return None
+    usage = get_usage(user_id)
+    if max_paintings and usage["painting_count"] + new_paintings > max_paintings:
+        return f"Painting quota exceeded ({max_paintings} paintings)"
+    if max_bytes and usage["total_bytes"] + incoming_bytes > max_bytes:
+        return f"Storage quota exceeded ({max_bytes // (1024 * 1024)} MB)"
+    return None
+
+
+def reconcile_usage(*, stat_files: bool = False) -> list[dict]:
+    """Recompute ``user_usage`` from ``paintings`` and return the rows that drifted.
+
+    With ``stat_files`` the recorded file sizes are first refreshed from disk,
+    which also catches files changed or removed outside the application.
+    """
+    with db.engine.begin() as conn:
+        if stat_files:
+            refresh_file_sizes(conn)
+        actual = {
+            row.user_id: {
+                "painting_count": row.painting_count,
+                "original_bytes": int(row.original_bytes or 0),
+                "derivative_bytes": int(row.derivative_bytes or 0),
+            }
+            for row in conn.execute(
+                select(
+                    Painting.user_id,
+                    func.count().label("painting_count"),
+                    func.sum(Painting.file_size).label("original_bytes"),
+                    func.sum(Painting.thumbnail_size).label("derivative_bytes"),
+                )
+                .where(Painting.user_id.isnot(None))
+                .group_by(Painting.user_id)
+            )
+        }
+        recorded = {
+            row.user_id: {
+                "painting_count": row.painting_count,
+                "original_bytes": row.original_bytes,
+                "derivative_bytes": row.derivative_bytes,
+            }
+            for row in conn.execute(select(_table))
+        }
+
+        drift = []
+        for user_id in actual.keys() | recorded.keys():
+            expected = actual.get(user_id, _empty())
+            if recorded.get(user_id) != expected:
+                drift.append({"user_id": user_id, "recorded": recorded.get(user_id), "actual": expected})
+        if drift:
+            ids = [item["user_id"] for item in drift]
+            conn.execute(delete(_table).where(_table.c.user_id.in_(ids)))
+            conn.execute(insert(_table), [
+                {"user_id": item["user_id"], **item["actual"]} for item in drift
+            ])
+    for item in drift:
+        logger.warning(f"Usage drift repaired for user {item['user_id']}: {item}")
+    return drift
+
+
+def refresh_file_sizes(connection) -> int:
+    """Re-read recorded file sizes from disk; return how many paintings changed.
+
+    Changes go through :func:`dispatch` so every size-derived table follows.
+    """
+    image_dir = current_app.config["IMAGE_DIR"]
+
+    def size(rel_path):
+        try:
+            return os.path.getsize(os.path.join(image_dir, rel_path)) if rel_path else 0
+        except OSError:
+            return 0
+
+    rows = connection.execute(
+        select(Painting.id, Painting.filename, Painting.thumbnail,
+               Painting.file_size, Painting.thumbnail_size)
+    ).all()
+    changed = [
+        {"b_id": r.id, "b_file": size(r.filename), "b_thumb": size(r.thumbnail)}
+        for r in rows
+    ]
+    changed = [
+        item for item, r in zip(changed, rows)
+        if (item["b_file"], item["b_thumb"]) != (r.file_size, r.thumbnail_size)
+    ]
+    if not changed:
+        return 0
+    ids = [item["b_id"] for item in changed]
+    before = snapshot_paintings(connection, ids)
+    table = Painting.__table__
+    connection.execute(
+        update(table).where(table.c.id == bindparam("b_id")).values(
+            file_size=bindparam("b_file"), thumbnail_size=bindparam("b_thumb")
+        ),
+        changed,
+    )
+    after = snapshot_paintings(connection, ids)
+    dispatch(connection, [(before[i], after[i]) for i in ids])
+    return len(changed)
+
+
+def backfill_usage() -> None:
+    """Build usage totals from existing paintings if they were never built."""
+    with db.engine.begin() as conn:
+        if conn.execute(select(UserUsage.user_id).limit(1)).first():
+            return
+        total = replay_paintings(conn, _update_usage)
+    if total:
+        logger.info(f"Storage usage backfilled from {total} paintings")
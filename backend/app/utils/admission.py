@@ -0,0 +1,219 @@
+"""Admission control for image decoding.
+
+Decoding is what eats memory and CPU, so every decode first reserves its
+estimated footprint here. The estimate comes from the header dimensions,
+which Pillow reads without decoding. At most ``IMAGE_MAX_CONCURRENT``
+decodes run at once within ``IMAGE_MEMORY_BUDGET_MB``. Up to
+``IMAGE_QUEUE_SIZE`` more per worker wait in FIFO order for
+``IMAGE_QUEUE_TIMEOUT`` seconds. Anything beyond that is refused straight
+away with :class:`AdmissionRejected`, which views turn into ``503`` plus
+``Retry-After``. The budgets are leased from the node's
+:class:`~app.utils.leases.LeaseStore`, so they hold across all workers.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+from .leases import LeaseStore
+from .timing import record
+
+logger = logging.getLogger(__name__)
+
+# Bytes per pixel once decoded, by Pillow mode; unknown modes count as RGBA
+_MODE_BYTES = {'1': 1, 'L': 1, 'P': 1, 'LA': 2, 'I;16': 2, 'RGB': 3, 'YCbCr': 3,
+               'LAB': 3, 'HSV': 3, 'RGBA': 4, 'CMYK': 4, 'I': 4, 'F': 4}
+
+
+class AdmissionRejected(Exception):
+    """The decode was refused: ``503`` when busy, ``413`` when it can never fit."""
+
+    def __init__(self, message: str, status: int = 503, retry_after: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def headers(self) -> dict:
+        return {'Retry-After': str(self.retry_after)} if self.retry_after else {}
+
+
+def decode_cost(width: int, height: int, mode: str = 'RGBA') -> int:
+    """Estimated peak bytes for decoding and thumbnailing a ``width`` x ``height`` image.
+
+    The decoded frame plus one converted copy of the same size.
+    """
+    return width * height * _MODE_BYTES.get(mode, 4) * 2
+
+
+class AdmissionController:
+    """Concurrency and memory budget with a short FIFO wait queue.
+
+    Without a ``store`` the budget covers this process only.
+    """
+
+    # Seconds between retries while the budget is held by other workers
+    POLL = 0.02
+
+    def __init__(self, max_concurrent: int = 2, memory_budget: int = 512 << 20,
+                 queue_size: int = 8, queue_timeout: float = 5.0,
+                 store: LeaseStore | None = None) -> None:
+        self.max_concurrent = max_concurrent
+        self.memory_budget = memory_budget
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.store = store
+        self._cond = threading.Condition()
+        self._queue: deque = deque()
+        self.active = 0
+        self.memory_in_use = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.peak_waiting = 0
+        self._wait_total = 0.0
+        self._service_total = 0.0
+
+    def _fits(self, cost: int) -> bool:
+        return self.active < self.max_concurrent and self.memory_in_use + cost <= self.memory_budget
+
+    def _reserve(self, cost: int):
+        """The lease for ``cost`` bytes and a slot (True when local), or None when busy."""
+        if not self._fits(cost):
+            return None
+        if self.store is None:
+            return True
+        try:
+            return self.store.try_acquire('decode', cost, self.max_concurrent, self.memory_budget)
+        except sqlite3.Error as e:
+            # Fall back to this worker's share rather than refusing every upload
+            logger.warning(f'Lease store unavailable: {e}')
+            return True
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the mean decode time."""
+        mean = self._service_total / self.admitted if self.admitted else 1.0
+        rounds = (len(self._queue) + 1) / self.max_concurrent
+        return max(1, math.ceil(mean * rounds))
+
+    def _acquire(self, cost: int):
+        if cost > self.memory_budget:
+            self.rejected += 1
+            raise AdmissionRejected('Image is too large to process', status=413)
+        started = time.monotonic()
+        poll = self.POLL if self.store is not None else None
+        with self._cond:
+            lease = None if self._queue else self._reserve(cost)
+            if lease is not None:
+                self._take(cost, started)
+                return lease
+            if len(self._queue) >= self.queue_size:
+                self.rejected += 1
+                raise AdmissionRejected('Image processing is busy', retry_after=self._retry_after())
+            ticket = object()
+            self._queue.append(ticket)
+            self.queued += 1
+            self.peak_waiting = max(self.peak_waiting, len(self._queue))
+            deadline = started + self.queue_timeout
+            try:
+                while True:
+                    if self._queue[0] is ticket:
+                        lease = self._reserve(cost)
+                        if lease is not None:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise AdmissionRejected('Image processing is busy',
+                                                retry_after=self._retry_after())
+                    # Other workers' releases do not notify us, so look again shortly
+                    self._cond.wait(min(remaining, poll) if poll else remaining)
+            finally:
+                self._queue.remove(ticket)
+                # The next ticket in line may fit now that this one has moved
+                self._cond.notify_all()
+            self._take(cost, started)
+            return lease
+
+    def _take(self, cost: int, started: float) -> None:
+        self.active += 1
+        self.memory_in_use += cost
+        self.admitted += 1
+        waited = time.monotonic() - started
+        self._wait_total += waited
+        record('queue', waited)
+
+    def _release(self, cost: int, service: float, lease=True) -> None:
+        if lease is not True:
+            try:
+                self.store.release(lease)
+            except sqlite3.Error as e:
+                logger.warning(f'Lease store unavailable: {e}')
+        with self._cond:
+            self.active -= 1
+            self.memory_in_use -= cost
+            self._service_total += service
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, cost: int):
+        """Hold ``cost`` bytes of the budget and a decode slot for the block.
+
+        Raises :class:`AdmissionRejected` when neither is available in time.
+        """
+        lease = self._acquire(cost)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(cost, time.monotonic() - started, lease)
+
+    def stats(self) -> dict:
+        node = {}
+        if self.store is not None:
+            node['node_active'], node['node_memory_in_use'] = self.store.usage('decode')
+        with self._cond:
+            return {
+                **node,
+                'active': self.active,
+                'waiting': len(self._queue),
+                'memory_in_use': self.memory_in_use,
+                'max_concurrent': self.max_concurrent,
+                'memory_budget': self.memory_budget,
+                'queue_size': self.queue_size,
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'peak_waiting': self.peak_waiting,
+                'mean_wait_ms': round(self._wait_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+                'mean_decode_ms': round(self._service_total / self.admitted * 1000, 2) if self.admitted else 0.0,
+            }
+
+
+def init_app(app) -> None:
+    app.extensions['admission'] = AdmissionController(
+        max_concurrent=app.config.get('IMAGE_MAX_CONCURRENT', 2),
+        memory_budget=app.config.get('IMAGE_MEMORY_BUDGET_MB', 512) << 20,
+        queue_size=app.config.get('IMAGE_QUEUE_SIZE', 8),
+        queue_timeout=app.config.get('IMAGE_QUEUE_TIMEOUT', 5.0),
+        store=app.extensions.get('leases'),
+    )
+
+
+def controller() -> AdmissionController:
+    """The app's controller; a default-sized one outside an app context."""
+    if has_app_context() and 'admission' in current_app.extensions:
+        return current_app.extensions['admission']
+    return _default
+
+
+_default = AdmissionController()
@@ -0,0 +1,138 @@
+"""Request authentication: Bearer tokens resolved once per request.
+
+A ``before_request`` hook reads the ``Authorization`` header and sets
+``g.current_user`` to an :class:`AuthUser` (or ``None``) for every
+blueprint. Verified tokens and the user records they point to are kept in
+bounded LRU caches for ``AUTH_CACHE_TTL`` seconds, so repeat requests skip
+both the signature check and the user lookup. A cached token never outlives
+its own expiry; a deleted user stays signed in for at most the TTL.
+"""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from ..extensions import db
+from ..models import User
+from .lru import LRUCache
+from .metrics import cache_lookup
+
+DEFAULT_SECRET = 'canvas3t-dev-secret'
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """The authenticated user, detached from any database session."""
+
+    id: int
+    username: str
+    email: str
+    created_at: datetime | None
+
+    def to_dict(self) -> dict:
+        """Same shape as :meth:`User.to_dict`."""
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class Authenticator:
+    """Token codec plus the verified-token and user caches of one app."""
+
+    def __init__(self, app) -> None:
+        self.serializer = URLSafeTimedSerializer(app.config.get('SECRET_KEY', DEFAULT_SECRET))
+        self.max_age = app.config.get('TOKEN_MAX_AGE', 7 * 24 * 3600)
+        self.ttl = app.config.get('AUTH_CACHE_TTL', 60)
+        size = app.config.get('AUTH_CACHE_SIZE', 4096)
+        self.tokens = LRUCache(size)  # token -> (user_id, valid_until)
+        self.users = LRUCache(size)   # user_id -> (AuthUser, valid_until)
+
+    def issue(self, user) -> str:
+        return self.serializer.dumps({'user_id': user.id, 'username': user.username})
+
+    def user_id_for(self, token: str) -> int | None:
+        """Verified user id of ``token``; None when invalid or expired."""
+        now = time.time()
+        cached = self.tokens.get(token)
+        cache_lookup('auth_token', bool(cached and cached[1] > now))
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            data, issued = self.serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except (BadSignature, SignatureExpired):
+            return None
+        user_id = data.get('user_id') if isinstance(data, dict) else None
+        if user_id:
+            expires = issued.timestamp() + self.max_age
+            self.tokens.set(token, (user_id, min(now + self.ttl, expires)))
+        return user_id
+
+    def user(self, user_id: int) -> AuthUser | None:
+        now = time.time()
+        cached = self.users.get(user_id)
+        cache_lookup('auth_user', bool(cached and cached[1] > now))
+        if cached and cached[1] > now:
+            return cached[0]
+        row = db.session.execute(
+            db.select(User.id, User.username, User.email, User.created_at).where(User.id == user_id)
+        ).first()
+        user = AuthUser(*row) if row else None
+        if user:
+            self.users.set(user_id, (user, now + self.ttl))
+        return user
+
+    def forget_user(self, user_id: int) -> None:
+        """Drop a cached user record (after it changed or was deleted)."""
+        self.users.delete(user_id)
+
+
+def init_app(app) -> None:
+    app.extensions['auth'] = Authenticator(app)
+    app.before_request(_load_current_user)
+
+
+def _load_current_user() -> None:
+    g.current_user = None
+    g.auth_error = None
+    header = request.headers.get('Authorization', '')
+    if not header:
+        return
+    if not header.startswith('Bearer ') or not header[7:].strip():
+        g.auth_error = 'Malformed Authorization header'
+        return
+    auth = current_app.extensions['auth']
+    user_id = auth.user_id_for(header[7:].strip())
+    if not user_id:
+        g.auth_error = 'Invalid or expired token'
+        return
+    g.current_user = auth.user(user_id)
+    if g.current_user is None:
+        g.auth_error = 'User not found'
+
+
+def issue_token(user) -> str:
+    """Signed login token for ``user``."""
+    return current_app.extensions['auth'].issue(user)
+
+
+def current_user_id() -> int | None:
+    user = g.get('current_user')
+    return user.id if user else None
+
+
+def login_required(view):
+    """Reject requests without a valid Bearer token with ``401``."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.get('current_user') is None:
+            return jsonify({'error': g.get('auth_error') or 'Authentication required'}), 401
+        return view(*args, **kwargs)
+    return wrapper
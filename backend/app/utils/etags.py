@@ -0,0 +1,41 @@
+"""Weak ETags computed from cheap version data instead of response bodies.
+
+Views build the tag from what identifies a representation (a scope version,
+a row's ``updated_at``) and check ``If-None-Match`` before loading or
+serializing anything else.
+"""
+from __future__ import annotations
+
+import hashlib
+
+from flask import Response, make_response, request
+
+
+def weak_etag(*parts) -> str:
+    """Opaque ETag value for ``parts`` (without the ``W/`` prefix and quotes)."""
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def not_modified(etag: str) -> Response | None:
+    """A ``304`` response if the client already holds ``etag``, else None."""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+
+def tagged(response, etag: str, *, private: bool = False):
+    """Attach ``etag`` to a view result; non-200 results are left untouched.
+
+    ``Cache-Control: no-cache`` lets browsers keep the body but revalidate it
+    on every use, which is what turns refetches into ``304`` responses.
+    """
+    response = make_response(response)
+    if response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        response.cache_control.no_cache = True
+        if private:
+            response.cache_control.private = True
+    return response
@@ -0,0 +1,97 @@
+"""On-disk image layout and atomic relocation of stored files.
+
+Images live under ``IMAGE_DIR`` as ``public/<folder>/<file>`` or
+``<username>/<folder>/<file>`` (the folder level is omitted for the root
+folder). File names carry a unique prefix, so a painting's files keep their
+basename wherever they move.
+"""
+from __future__ import annotations
+
+import os
+import posixpath
+
+from werkzeug.utils import secure_filename
+
+PUBLIC_ROOT = 'public'
+
+
+class RelocationError(RuntimeError):
+    """A file could not be moved; every move done so far was reverted."""
+
+
+def storage_dir(username: str | None, folder: str | None, is_public: bool) -> str:
+    """Relative directory for a painting with this owner, folder and visibility."""
+    root = PUBLIC_ROOT if is_public else secure_filename(username or 'anonymous')
+    folder_name = secure_filename(folder) if folder else ''
+    return f"{root}/{folder_name}" if folder_name else root
+
+
+def relocated(path: str | None, directory: str) -> str | None:
+    """``path`` moved into ``directory``, keeping its file name."""
+    return f"{directory}/{posixpath.basename(path)}" if path else path
+
+
+class Relocation:
+    """A batch of file moves that can be undone as a whole.
+
+    Moves are ``os.rename`` calls, atomic on one filesystem and independent of
+    file size. When every file of a private folder directory moves to the same
+    new directory, the directory itself is renamed in one call.
+    """
+
+    def __init__(self, image_dir: str):
+        self.image_dir = image_dir
+        self._done: list[tuple[str, str]] = []
+
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.image_dir, rel_path)
+
+    def move(self, moves: dict[str, str]) -> None:
+        """Apply ``{old_rel_path: new_rel_path}``; on failure undo and raise."""
+        by_dir: dict[tuple[str, str], list[str]] = {}
+        for old, new in moves.items():
+            if old != new:
+                key = (posixpath.dirname(old), posixpath.dirname(new))
+                by_dir.setdefault(key, []).append(posixpath.basename(old))
+        try:
+            for (old_dir, new_dir), names in by_dir.items():
+                if not self._move_directory(old_dir, new_dir, names):
+                    for name in names:
+                        self._rename(f"{old_dir}/{name}", f"{new_dir}/{name}")
+        except OSError as exc:
+            self.undo()
+            raise RelocationError(f"Could not move files: {exc}") from exc
+
+    def _move_directory(self, old_dir: str, new_dir: str, names: list[str]) -> bool:
+        # Only a folder directory (never a user or public root) that holds
+        # exactly the moving files, going to a directory that does not exist.
+        # Folder names map to directories through secure_filename, so two
+        # folders may share one; comparing contents guards against that.
+        if '/' not in old_dir or old_dir.split('/', 1)[0] == PUBLIC_ROOT:
+            return False
+        if os.path.exists(self._abs(new_dir)):
+            return False
+        try:
+            if set(os.listdir(self._abs(old_dir))) != set(names):
+                return False
+        except FileNotFoundError:
+            return False
+        self._rename(old_dir, new_dir)
+        return True
+
+    def _rename(self, old: str, new: str) -> None:
+        src, dst = self._abs(old), self._abs(new)
+        if not os.path.exists(src):
+            return  # nothing on disk to move (missing thumbnail, external file)
+        if os.path.exists(dst):
+            raise FileExistsError(dst)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        os.rename(src, dst)
+        self._done.append((src, dst))
+
+    def undo(self) -> None:
+        """Move everything back, newest first."""
+        while self._done:
+            src, dst = self._done.pop()
+            os.makedirs(os.path.dirname(src), exist_ok=True)
+            os.rename(dst, src)
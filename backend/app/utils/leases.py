@@ -0,0 +1,89 @@
+"""Capacity shared by every worker process on the node.
+
+A lease holds one slot and ``cost`` units of a named pool (image decodes,
+password hashes) until it is released. Leases live in a small WAL-mode
+SQLite file (``LEASE_DB``), so gunicorn workers draw from one budget
+instead of one each. Leases left behind by a worker that died are dropped
+the next time anyone acquires from the pool.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LeaseStore:
+    """Slots and units of named pools, leased across processes."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                ' id INTEGER PRIMARY KEY, pool TEXT NOT NULL, pid INTEGER NOT NULL,'
+                ' cost INTEGER NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_leases_pool ON leases (pool)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are per thread and never cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def try_acquire(self, pool: str, cost: int, slots: int, budget: int) -> int | None:
+        """Lease a slot and ``cost`` units of ``pool``; the lease id, or None when it does not fit."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            pids = [row[0] for row in conn.execute('SELECT DISTINCT pid FROM leases WHERE pool = ?', (pool,))]
+            dead = [pid for pid in pids if pid != os.getpid() and not _alive(pid)]
+            if dead:
+                conn.execute(f'DELETE FROM leases WHERE pid IN ({",".join("?" * len(dead))})', dead)
+            held, used = conn.execute(
+                'SELECT count(*), coalesce(sum(cost), 0) FROM leases WHERE pool = ?', (pool,)
+            ).fetchone()
+            lease = None
+            if held < slots and used + cost <= budget:
+                lease = conn.execute(
+                    'INSERT INTO leases (pool, pid, cost) VALUES (?, ?, ?)', (pool, os.getpid(), cost)
+                ).lastrowid
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return lease
+
+    def release(self, lease: int) -> None:
+        self._connect().execute('DELETE FROM leases WHERE id = ?', (lease,))
+
+    def usage(self, pool: str) -> tuple[int, int]:
+        """``(slots, units)`` currently leased from ``pool`` by all workers."""
+        return tuple(self._connect().execute(
+            'SELECT count(*), coalesce(sum(cost), 0) FROM leases WHERE pool = ?', (pool,)
+        ).fetchone())
+
+
+def init_app(app) -> None:
+    """Open the node's lease store (``LEASE_STORAGE=memory`` keeps budgets per process)."""
+    if app.config.get('LEASE_STORAGE', 'sqlite') == 'memory':
+        app.extensions['leases'] = None
+        return
+    path = app.config.get('LEASE_DB') or os.path.join(app.config['DB_DIR'], 'leases.db')
+    app.extensions['leases'] = LeaseStore(path)
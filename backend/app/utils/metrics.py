@@ -0,0 +1,146 @@
+"""Prometheus metrics served at ``/metrics``.
+
+Covers HTTP requests per blueprint and endpoint, the image pipeline (stage
+durations, bytes, pixels), SQL statement latency, cache hits and load
+shedding. Under gunicorn, set ``PROMETHEUS_MULTIPROC_DIR`` to an empty
+directory before the workers start (see ``gunicorn.conf.py``). Each worker
+then writes its samples there and ``/metrics`` merges them, whichever
+worker answers the scrape.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+from .rate_limit import RateLimiter
+from .timing import record
+
+_FAST = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+
+REQUESTS = Counter('http_requests_total', 'HTTP requests handled',
+                   ['blueprint', 'endpoint', 'method', 'status'])
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency',
+                            ['blueprint', 'endpoint', 'method'],
+                            buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10, 30))
+REQUEST_ERRORS = Counter('http_request_errors_total', 'HTTP requests answered with a 5xx status',
+                         ['blueprint', 'endpoint', 'status'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'HTTP requests being handled',
+                  ['blueprint', 'endpoint'], multiprocess_mode='livesum')
+
+IMAGE_STAGE = Histogram('image_stage_duration_seconds', 'Image pipeline stage durations', ['stage'],
+                        buckets=(.001, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10))
+IMAGE_BYTES = Counter('image_bytes_total', 'Image bytes read (in) and written as derivatives (out)',
+                      ['direction'])
+IMAGE_PIXELS = Histogram('image_pixels', 'Pixels per decoded image',
+                         buckets=(1e5, 5e5, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6, 64e6))
+
+DB_LATENCY = Histogram('db_query_duration_seconds', 'SQL statement latency', ['operation'], buckets=_FAST)
+CACHE_REQUESTS = Counter('cache_requests_total', 'Cache lookups', ['cache', 'result'])
+SHED = Counter('requests_shed_total', 'Requests refused to protect capacity', ['reason'])
+
+_OPERATIONS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+
+
+@contextmanager
+def image_stage(stage: str):
+    """Time one image pipeline stage (``write``, ``decode``, ``thumbnail``, ``encode``).
+
+    The duration also goes into the request's ``Server-Timing``.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        IMAGE_STAGE.labels(stage).observe(elapsed)
+        record(stage, elapsed)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def _labels():
+    return request.blueprint or 'app', request.endpoint or 'unmatched'
+
+
+def _start():
+    g.metrics_labels = _labels()
+    g.metrics_started = time.perf_counter()
+    IN_FLIGHT.labels(*g.metrics_labels).inc()
+
+
+def _finish(response):
+    labels = g.get('metrics_labels')
+    if labels is None:
+        return response
+    blueprint, endpoint = labels
+    status = str(response.status_code)
+    REQUEST_LATENCY.labels(blueprint, endpoint, request.method).observe(
+        time.perf_counter() - g.metrics_started)
+    REQUESTS.labels(blueprint, endpoint, request.method, status).inc()
+    if response.status_code >= 500:
+        REQUEST_ERRORS.labels(blueprint, endpoint, status).inc()
+    if response.status_code in (429, 503):
+        SHED.labels('rate_limit' if response.status_code == 429 else 'overload').inc()
+    return response
+
+
+def _leave(exc):
+    labels = g.pop('metrics_labels', None)
+    if labels is not None:
+        IN_FLIGHT.labels(*labels).dec()
+
+
+def _time_statements(engine) -> None:
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_started')
+        if not started:
+            return
+        verb = statement.lstrip()[:6].upper()
+        DB_LATENCY.labels(verb if verb in _OPERATIONS else 'OTHER').observe(time.perf_counter() - started.pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        started = context.connection.info.get('metrics_started') if context.connection else None
+        if started:
+            started.pop()
+
+
+def render() -> Response:
+    """Current samples in the Prometheus text format, merged across workers."""
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def init_app(app: Flask, engine) -> None:
+    """Instrument requests and ``engine`` and serve ``/metrics`` (unless ``METRICS_ENABLED`` is off)."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_leave)
+    _time_statements(engine)
+    app.add_url_rule('/metrics', 'metrics', RateLimiter.exempt(render))
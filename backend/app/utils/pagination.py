@@ -0,0 +1,39 @@
+"""Keyset (cursor) pagination helpers."""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client supplied cursor cannot be decoded."""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Return an opaque cursor pointing just after ``(created_at, row_id)``."""
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by :func:`encode_cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (binascii.Error, UnicodeError, ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def after_cursor(created_col, id_col, cursor: tuple[datetime, int]):
+    """Filter clause selecting rows that sort after ``cursor`` in descending order.
+
+    Uses a row-value comparison so SQLite and PostgreSQL can seek directly
+    into a ``(..., created_at, id)`` index instead of skipping rows.
+    """
+    created_at, row_id = cursor
+    return tuple_(created_col, id_col) < tuple_(created_at, row_id)
@@ -0,0 +1,175 @@
+"""Password hashing with a node-wide cap on concurrent hashes.
+
+Every hash holds one of ``PASSWORD_HASH_WORKERS`` slots leased from the
+node's :class:`~app.utils.leases.LeaseStore`, so hashing CPU stays capped
+however many workers and requests try to log in at once. At most
+``PASSWORD_HASH_QUEUE`` more requests per worker wait for a slot, for up to
+``PASSWORD_HASH_WAIT`` seconds; the rest are turned away with
+:class:`HasherBusy` instead of piling up.
+
+The pbkdf2 iteration count is ``PASSWORD_HASH_ITERATIONS`` or, when unset,
+calibrated once at bootstrap so one hash takes about
+``PASSWORD_HASH_TARGET_MS``, and stored for every worker to share (see
+:mod:`app.bootstrap`). It never drops below werkzeug's default except under
+``TESTING``, where suites pin a cheap cost. Hashes made
+with fewer iterations are upgraded by the login endpoint (see
+:meth:`PasswordHasher.needs_rehash`).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+from flask import current_app, has_app_context
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from .leases import LeaseStore
+
+logger = logging.getLogger(__name__)
+
+HASH_NAME = 'sha256'
+_PROBE_ITERATIONS = 20_000
+_ROUND_TO = 10_000
+_calibrated: dict[float, int] = {}
+
+
+class HasherBusy(Exception):
+    """Raised when every hashing slot and queue place is taken."""
+
+
+def calibrate(target_ms: float) -> int:
+    """Iteration count that makes one hash take about ``target_ms`` here.
+
+    Extrapolated from a short probe and cached per process; never below
+    werkzeug's default. Bootstrap runs it once per database.
+    """
+    if target_ms not in _calibrated:
+        started = time.perf_counter()
+        hashlib.pbkdf2_hmac(HASH_NAME, b'calibrate', b'salt', _PROBE_ITERATIONS)
+        per_ms = _PROBE_ITERATIONS / max((time.perf_counter() - started) * 1000, 1e-3)
+        iterations = int(per_ms * target_ms) // _ROUND_TO * _ROUND_TO
+        _calibrated[target_ms] = max(iterations, DEFAULT_PBKDF2_ITERATIONS)
+    return _calibrated[target_ms]
+
+
+def _iterations(method: str) -> int | None:
+    """pbkdf2 iteration count of a stored hash; None for other schemes."""
+    name, _, rest = method.partition(':')
+    if name != 'pbkdf2':
+        return None
+    hash_name, _, iterations = rest.partition(':')
+    if hash_name != HASH_NAME:
+        return None
+    return int(iterations) if iterations else DEFAULT_PBKDF2_ITERATIONS
+
+
+class PasswordHasher:
+    """Hashing slots plus the current pbkdf2 parameters.
+
+    Without a ``store`` the slots cover this process only. ``floor`` is the
+    least iteration count :meth:`use_iterations` accepts.
+    """
+
+    # Seconds between retries while every slot is held by other workers
+    POLL = 0.02
+
+    def __init__(self, iterations: int, workers: int = 2, queue: int = 32,
+                 wait: float = 10.0, store: LeaseStore | None = None,
+                 floor: int = DEFAULT_PBKDF2_ITERATIONS) -> None:
+        self.floor = floor
+        self.use_iterations(iterations)
+        self.workers = workers
+        self.wait = wait
+        self.store = store
+        self.rejected = 0
+        # Requests of this process hashing or waiting to
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._running = threading.BoundedSemaphore(workers)
+
+    def use_iterations(self, iterations: int) -> None:
+        self.iterations = max(iterations, self.floor)
+        self.method = f'pbkdf2:{HASH_NAME}:{self.iterations}'
+
+    def _busy(self) -> HasherBusy:
+        self.rejected += 1
+        return HasherBusy('Too many password operations in progress')
+
+    def _lease(self, deadline: float):
+        """A node-wide hashing slot (True when local) before ``deadline``."""
+        while self.store is not None:
+            try:
+                lease = self.store.try_acquire('hash', 1, self.workers, self.workers)
+            except sqlite3.Error as e:
+                logger.warning(f'Lease store unavailable: {e}')
+                break
+            if lease is not None:
+                return lease
+            if time.monotonic() >= deadline:
+                raise self._busy()
+            time.sleep(self.POLL)
+        if not self._running.acquire(timeout=max(deadline - time.monotonic(), 0)):
+            raise self._busy()
+        return True
+
+    def _unlease(self, lease) -> None:
+        if lease is True:
+            self._running.release()
+            return
+        try:
+            self.store.release(lease)
+        except sqlite3.Error as e:
+            logger.warning(f'Lease store unavailable: {e}')
+
+    def _run(self, fn, *args):
+        # Hash on the request's own thread: a hop to a pool would not free a sync worker
+        deadline = time.monotonic() + self.wait
+        if not self._slots.acquire(timeout=self.wait):
+            raise self._busy()
+        try:
+            lease = self._lease(deadline)
+            try:
+                return fn(*args)
+            finally:
+                self._unlease(lease)
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        """True when ``pwhash`` uses another scheme or fewer iterations."""
+        iterations = _iterations(pwhash.partition('$')[0])
+        return iterations is None or iterations < self.iterations
+
+
+def init_app(app) -> None:
+    """Install the hasher; without ``PASSWORD_HASH_ITERATIONS`` it waits for the bootstrapped cost."""
+    app.extensions['passwords'] = PasswordHasher(
+        app.config.get('PASSWORD_HASH_ITERATIONS') or DEFAULT_PBKDF2_ITERATIONS,
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 2),
+        queue=app.config.get('PASSWORD_HASH_QUEUE', 32),
+        wait=app.config.get('PASSWORD_HASH_WAIT', 10.0),
+        store=app.extensions.get('leases'),
+        floor=1 if app.testing else DEFAULT_PBKDF2_ITERATIONS,
+    )
+
+
+def hasher() -> PasswordHasher:
+    """The app's hasher; a default one outside an app context."""
+    if has_app_context() and 'passwords' in current_app.extensions:
+        return current_app.extensions['passwords']
+    return _default
+
+
+_default = PasswordHasher(DEFAULT_PBKDF2_ITERATIONS)
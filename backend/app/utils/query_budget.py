@@ -0,0 +1,85 @@
+"""Per-request SQL query budgets.
+
+Views declare how many statements they may issue with :func:`query_budget`.
+Every request's statement count is reported in the ``X-Query-Count``
+header; a request over budget is logged (``QUERY_BUDGET_MODE=warn``) or
+raises :class:`QueryBudgetExceeded` (``raise``, used by the test suite) so
+N+1 regressions fail loudly instead of slipping in. Unless configured, the
+mode is ``warn`` in debug and testing and ``off`` in production, where no
+counter is installed and no header is sent.
+"""
+from __future__ import annotations
+
+import logging
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+BUDGET_MODES = ("off", "warn", "raise")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a view issues more statements than its declared budget."""
+
+
+def query_budget(limit: int):
+    """Declare the maximum number of SQL statements a view may issue."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+class QueryCounter:
+    """Context manager recording statements executed on ``engine``."""
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def init_app(app: Flask, engine) -> None:
+    """Count statements per request and enforce declared budgets."""
+    mode = app.config.get("QUERY_BUDGET_MODE") or ("warn" if app.debug or app.testing else "off")
+    if mode not in BUDGET_MODES:
+        raise ValueError(f"QUERY_BUDGET_MODE must be one of {BUDGET_MODES}")
+    if mode == "off":
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and "query_count" in g:
+            g.query_count += 1
+
+    @app.before_request
+    def _start_count():
+        g.query_count = 0
+
+    @app.after_request
+    def _check_budget(response):
+        count = g.pop("query_count", 0)
+        response.headers["X-Query-Count"] = str(count)
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", None)
+        if budget is not None and count > budget:
+            message = f"{request.endpoint} issued {count} queries (budget {budget})"
+            if mode == "raise":
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,197 @@
+"""Per-statement latency statistics and slow-query logging.
+
+Listens to the engine's cursor events, groups statements by *shape* (SQL
+with literals and ``IN`` lists collapsed), and keeps a latency histogram per
+shape. Statements slower than ``SLOW_QUERY_MS`` are logged together with
+their query plan, flagging full table scans, so missing indexes show up
+before users notice.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import re
+import threading
+import time
+
+from flask import Flask, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds (last bucket is +Inf)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize ``statement`` so executions differing only in values group together."""
+    shape = _STRING_RE.sub("?", statement)
+    shape = _NUMBER_RE.sub("?", shape)
+    shape = _IN_LIST_RE.sub("IN (...)", shape)
+    return _SPACE_RE.sub(" ", shape).strip()
+
+
+def is_full_scan(plan: list[str]) -> bool:
+    """True when a query plan reads a whole table rather than seeking an index."""
+    for line in plan:
+        # SQLite: "SCAN paintings" (but not "SCAN t USING INDEX" or virtual tables)
+        if line.startswith("SCAN ") and "USING" not in line and "VIRTUAL TABLE" not in line:
+            return True
+        # PostgreSQL
+        if "Seq Scan on" in line:
+            return True
+    return False
+
+
+class ShapeStats:
+    """Aggregated timings for one statement shape."""
+
+    __slots__ = ("shape", "count", "total_ms", "max_ms", "buckets", "slow_count",
+                 "plan", "full_scan", "endpoints")
+
+    def __init__(self, shape: str) -> None:
+        self.shape = shape
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.slow_count = 0
+        self.plan: list[str] | None = None
+        self.full_scan = False
+        self.endpoints: set[str] = set()
+
+    def percentile(self, fraction: float) -> float | None:
+        """Upper bound of the bucket holding the given percentile."""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= target:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "shape": self.shape,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else None,
+            "max_ms": round(self.max_ms, 3),
+            "p95_ms": self.percentile(0.95),
+            "slow_count": self.slow_count,
+            "full_scan": self.full_scan,
+            "plan": self.plan,
+            "endpoints": sorted(self.endpoints),
+            "histogram": dict(zip([*map(str, BUCKETS_MS), "+Inf"], self.buckets)),
+        }
+
+
+class QueryStats:
+    """Collects :class:`ShapeStats` for one engine."""
+
+    def __init__(self, slow_ms: float = 100.0, max_shapes: int = 1000) -> None:
+        self.slow_ms = slow_ms
+        self.max_shapes = max_shapes
+        self._shapes: dict[str, ShapeStats] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask, engine) -> None:
+        """Attach to ``engine`` and expose as ``app.extensions["query_stats"]``."""
+        self.slow_ms = app.config.get("SLOW_QUERY_MS", self.slow_ms)
+        self.max_shapes = app.config.get("QUERY_STATS_MAX_SHAPES", self.max_shapes)
+        app.extensions["query_stats"] = self
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        context._query_start = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context._query_start) * 1000
+        self.record(statement, elapsed_ms, cursor=cursor, parameters=parameters,
+                    explain=not executemany, dialect=conn.dialect.name)
+
+    def record(self, statement: str, elapsed_ms: float, *, cursor=None, parameters=None,
+               explain: bool = False, dialect: str = "sqlite") -> None:
+        shape = statement_shape(statement)
+        slow = elapsed_ms >= self.slow_ms
+        with self._lock:
+            stats = self._shapes.get(shape)
+            if stats is None:
+                if len(self._shapes) >= self.max_shapes:
+                    return
+                stats = self._shapes[shape] = ShapeStats(shape)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            if has_request_context() and request.endpoint and len(stats.endpoints) < 20:
+                stats.endpoints.add(request.endpoint)
+            if slow:
+                stats.slow_count += 1
+            need_plan = slow and stats.plan is None
+
+        if not slow:
+            return
+        plan = None
+        if need_plan and explain and cursor is not None:
+            plan = self._explain(cursor, statement, parameters, dialect)
+            if plan is not None:
+                with self._lock:
+                    stats.plan = plan
+                    stats.full_scan = is_full_scan(plan)
+        logger.warning(
+            f"Slow query ({elapsed_ms:.1f} ms"
+            f"{', FULL SCAN' if stats.full_scan else ''}): {shape}"
+            + (f"\n  plan: {' | '.join(plan)}" if plan else "")
+        )
+
+    @staticmethod
+    def _explain(cursor, statement, parameters, dialect) -> list[str] | None:
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+        # A failed statement aborts the whole PostgreSQL transaction, so guard
+        # the request's own transaction with a savepoint (SQLite needs none)
+        guard = dialect != "sqlite"
+        try:
+            # A fresh DBAPI cursor bypasses SQLAlchemy events (no recursion)
+            explain_cursor = cursor.connection.cursor()
+            try:
+                if guard:
+                    explain_cursor.execute("SAVEPOINT query_stats_explain")
+                try:
+                    explain_cursor.execute(prefix + statement, parameters or ())
+                    rows = explain_cursor.fetchall()
+                except Exception:
+                    if guard:
+                        explain_cursor.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+                    raise
+                finally:
+                    if guard:
+                        explain_cursor.execute("RELEASE SAVEPOINT query_stats_explain")
+            finally:
+                explain_cursor.close()
+        except Exception as exc:  # pragma: no cover - best effort diagnostics
+            logger.debug(f"EXPLAIN failed: {exc}")
+            return None
+        # SQLite rows are (id, parent, notused, detail); PostgreSQL rows are (line,)
+        return [str(row[-1]) for row in rows]
+
+    def top(self, limit: int = 20, sort: str = "total_ms") -> list[dict]:
+        """Return the ``limit`` heaviest shapes by ``sort`` (a ``to_dict`` key)."""
+        with self._lock:
+            items = [stats.to_dict() for stats in self._shapes.values()]
+        return sorted(items, key=lambda item: item.get(sort) or 0, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._shapes.clear()
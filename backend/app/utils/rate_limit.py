@@ -1,44 +1,290 @@
+"""Sliding-window rate limiting shared by every worker on the node.
+
+Each key keeps three numbers: the current fixed window, the amount spent in
+it and the amount spent in the window before. The estimate for the last
+``window`` seconds weights the previous window by how much of it still
+overlaps, which is accurate to a few percent at O(1) memory per key.
+
+The ``sqlite`` store keeps that state in a small WAL-mode SQLite file
+(``RATE_LIMIT_DB``), so all gunicorn workers draw from one budget; the
+``memory`` store is per process. Both keep at most ``RATE_LIMIT_MAX_KEYS``
+keys and drop the ones idle longest.
+
+Budgets are spent by cost, not by request: a view declares its weight with
+:meth:`RateLimiter.cost` (a number or a function of the request, e.g. bytes
+uploaded) and may :func:`charge` more once it knows what it processed.
+Every request spends its IP's budget (``RATE_LIMIT``) and, when signed in,
+the user's too (``RATE_LIMIT_USER``), so neither many accounts behind one
+address nor one account spread over many addresses escapes a limit. A call
+is charged to all its keys or to none; ``Retry-After`` says when the fullest
+budget will have room for it.
+"""
 from __future__ import annotations
 
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
 import time
-from collections import defaultdict, deque
-from typing import Deque
 
-from flask import Flask, abort, current_app, request
+from flask import Flask, current_app, g, jsonify, request
+
+from .lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_RULE = re.compile(r'^\s*(\d+)\s*(?:/|per)\s*(second|minute|hour|day)s?\s*$')
+
+
+def parse_limit(rule: str) -> tuple[int, int]:
+    """``"50/minute"`` (or ``"50 per minute"``) -> ``(50, 60)``."""
+    match = _RULE.match(rule or '')
+    if not match:
+        raise ValueError(f'Invalid rate limit {rule!r}')
+    return int(match.group(1)), _PERIODS[match.group(2)]
+
+
+def slide(state, now: float, limit: float, window: int, cost: float = 1, force: bool = False):
+    """Charge ``cost`` against ``state``; the pure core of every store.
+
+    ``state`` is ``(window_index, current, previous)`` or None for a new key.
+    Returns ``(new_state, retry_after)``: ``retry_after`` is 0 when the hit is
+    allowed (and counted), otherwise the seconds until it would be. ``force``
+    counts the cost even when it does not fit (for work already done).
+    """
+    index = int(now // window)
+    current = previous = 0.0
+    if state:
+        if state[0] == index:
+            current, previous = state[1], state[2]
+        elif state[0] == index - 1:
+            previous = state[1]
+    elapsed = now - index * window
+    weight = 1 - elapsed / window
+    if force or previous * weight + current + cost <= limit:
+        return (index, current + cost, previous), 0.0
+    return (index, current, previous), _wait(current, previous, elapsed, limit, window, cost)
+
+
+def _wait(current, previous, elapsed, limit, window, cost) -> float:
+    if cost > limit:
+        return float(window)
+    room = limit - current - cost
+    if room >= 0 and previous > 0:
+        # The previous window fades out while this one is still open
+        return max((1 - room / previous) * window - elapsed, 0.0)
+    # Wait for the next window, where today's spend becomes the fading part
+    weight = (limit - cost) / current if current else 1.0
+    return (window - elapsed) + (1 - min(weight, 1.0)) * window
+
+
+class MemoryStore:
+    """Per-process state in an LRU mapping."""
+
+    def __init__(self, max_keys: int) -> None:
+        self._states = LRUCache(max_keys)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float, limit: float, window: int, cost: float,
+            force: bool = False) -> float:
+        return self.hit_all([(key, limit, window)], now, cost, force)
+
+    def hit_all(self, budgets, now: float, cost: float, force: bool = False) -> float:
+        """Charge ``cost`` to every ``(key, limit, window)`` if all have room; the longest wait."""
+        with self._lock:
+            results = [(key, *slide(self._states.get(key), now, limit, window, cost, force))
+                       for key, limit, window in budgets]
+            retry_after = max(wait for _, _, wait in results)
+            if not retry_after:
+                for key, state, _ in results:
+                    self._states.set(key, state)
+        return retry_after
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+class SQLiteStore:
+    """State shared across processes in one SQLite file."""
 
+    EVICT_EVERY = 256
 
-class SimpleLimiter:
-    """Naive in-memory rate limiter (best-effort, single-process)."""
+    def __init__(self, path: str, max_keys: int) -> None:
+        self.path = path
+        self.max_keys = max_keys
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limits ('
+                ' key TEXT PRIMARY KEY, window INTEGER NOT NULL,'
+                ' current REAL NOT NULL, previous REAL NOT NULL, touched REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_touched ON rate_limits (touched)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # Connections are per thread and never cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def hit(self, key: str, now: float, limit: float, window: int, cost: float,
+            force: bool = False) -> float:
+        return self.hit_all([(key, limit, window)], now, cost, force)
+
+    def hit_all(self, budgets, now: float, cost: float, force: bool = False) -> float:
+        """Charge ``cost`` to every ``(key, limit, window)`` if all have room; the longest wait."""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            results = []
+            for key, limit, window in budgets:
+                row = conn.execute(
+                    'SELECT window, current, previous FROM rate_limits WHERE key = ?', (key,)
+                ).fetchone()
+                results.append((key, *slide(row, now, limit, window, cost, force)))
+            retry_after = max(wait for _, _, wait in results)
+            if not retry_after:
+                conn.executemany(
+                    'INSERT INTO rate_limits (key, window, current, previous, touched)'
+                    ' VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET'
+                    ' window = excluded.window, current = excluded.current,'
+                    ' previous = excluded.previous, touched = excluded.touched',
+                    [(key, *state, now) for key, state, _ in results],
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        self._hits += 1
+        if self._hits % self.EVICT_EVERY == 0:
+            self.evict()
+        return retry_after
+
+    def evict(self) -> int:
+        """Drop the keys idle longest beyond ``max_keys``; return how many."""
+        conn = self._connect()
+        excess = conn.execute('SELECT count(*) FROM rate_limits').fetchone()[0] - self.max_keys
+        if excess <= 0:
+            return 0
+        conn.execute(
+            'DELETE FROM rate_limits WHERE key IN'
+            ' (SELECT key FROM rate_limits ORDER BY touched LIMIT ?)', (excess,)
+        )
+        return excess
+
+    def __len__(self) -> int:
+        return self._connect().execute('SELECT count(*) FROM rate_limits').fetchone()[0]
+
+
+class RateLimiter:
+    """The app's one limiter: cost-weighted budgets per user and per IP."""
 
     def __init__(self) -> None:
-        self._buckets: dict[str, Deque[float]] = defaultdict(deque)
-        self._limit = 50
-        self._window = 60
+        self.store = None
+        self.budgets = {'ip': (50, 60), 'user': (200, 60)}
+        self.rejected = 0
 
     def init_app(self, app: Flask) -> None:
-        limit = app.config.get("RATE_LIMIT", "50/minute")
+        for kind, setting in (('ip', 'RATE_LIMIT'), ('user', 'RATE_LIMIT_USER')):
+            try:
+                self.budgets[kind] = parse_limit(app.config.get(setting) or '')
+            except ValueError:
+                app.logger.warning(f'Invalid {setting} config, using defaults')
+        max_keys = app.config.get('RATE_LIMIT_MAX_KEYS', 100_000)
+        if app.config.get('RATE_LIMIT_STORAGE', 'sqlite') == 'memory':
+            self.store = MemoryStore(max_keys)
+        else:
+            path = app.config.get('RATE_LIMIT_DB') or os.path.join(app.config['DB_DIR'], 'ratelimit.db')
+            self.store = SQLiteStore(path, max_keys)
+        app.extensions['rate_limiter'] = self
+        app.before_request(_enforce)
+
+    def hit(self, *keys: str, cost: float = 1, now: float | None = None, force: bool = False) -> float:
+        """Charge every key (``ip:...``, ``user:...``) or none; 0 when allowed, else seconds to wait."""
+        now = time.time() if now is None else now
+        budgets = [(key, *self.budgets[key.partition(':')[0]]) for key in keys]
         try:
-            amount, per = limit.split("/")
-            self._limit = int(amount)
-            self._window = 60 if per.startswith("minute") else 1
-        except Exception:  # pragma: no cover - fallback
-            app.logger.warning("Invalid RATE_LIMIT config, using defaults")
+            return self.store.hit_all(budgets, now, cost, force)
+        except sqlite3.Error as e:
+            # A wedged limiter must not take the API down with it
+            logger.warning(f'Rate limiter unavailable: {e}')
+            return 0.0
+
+    @staticmethod
+    def exempt(view):
+        """Never rate-limit ``view``."""
+        view.rate_limit_exempt = True
+        return view
+
+    @staticmethod
+    def cost(weight):
+        """Charge ``weight`` (a number, or a function returning one) per call of the view."""
+        def decorator(view):
+            view.rate_limit_cost = weight
+            return view
+        return decorator
+
+
+def upload_cost() -> float:
+    """One unit plus one per ``RATE_LIMIT_COST_BYTES`` of request body."""
+    return 1 + bytes_cost(request.content_length or 0)
+
+
+def bytes_cost(size: int) -> float:
+    return size / current_app.config.get('RATE_LIMIT_COST_BYTES', 1 << 20)
+
+
+def pixels_cost(width: int, height: int) -> float:
+    return width * height / current_app.config.get('RATE_LIMIT_COST_PIXELS', 4_000_000)
+
+
+def ids_cost() -> float:
+    """One unit plus one per hundred ids of a bulk request."""
+    ids = (request.get_json(silent=True) or {}).get('ids')
+    return 1 + (len(ids) / 100 if isinstance(ids, list) else 0)
+
 
-        @app.before_request
-        def _enforce():
-            if not app.config.get("ENABLE_RATE_LIMITS", True):
-                return
-            key = request.remote_addr or "anonymous"
-            bucket = self._buckets[key]
-            now = time.time()
+def _client_keys() -> list[str]:
+    keys = [f'ip:{request.remote_addr or "anonymous"}']
+    user = g.get('current_user')
+    if user:
+        keys.append(f'user:{user.id}')
+    return keys
 
-            while bucket and now - bucket[0] > self._window:
-                bucket.popleft()
 
-            if len(bucket) >= self._limit:
-                abort(429, description="Too many requests")
-            bucket.append(now)
+def charge(cost: float) -> None:
+    """Add ``cost`` for work the current request has already done.
 
+    Never rejects the current request; the next ones wait for it.
+    """
+    if cost <= 0 or not g.get('rate_limited'):
+        return
+    current_app.extensions['rate_limiter'].hit(*_client_keys(), cost=cost, force=True)
 
-limiter = SimpleLimiter()
 
+def _enforce():
+    g.rate_limited = False
+    if not current_app.config.get('ENABLE_RATE_LIMITS', True) or request.method == 'OPTIONS':
+        return None
+    view = current_app.view_functions.get(request.endpoint)
+    if view is None or getattr(view, 'rate_limit_exempt', False):
+        return None
+    weight = getattr(view, 'rate_limit_cost', 1)
+    cost = weight() if callable(weight) else weight
+    limiter = current_app.extensions['rate_limiter']
+    retry_after = limiter.hit(*_client_keys(), cost=cost)
+    if not retry_after:
+        g.rate_limited = True
+        return None
+    limiter.rejected += 1
+    response = jsonify({'error': 'Too many requests'})
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response, 429
@@ -0,0 +1,86 @@
+"""Per-request stage timers, reported as ``Server-Timing`` and in the log.
+
+Wrap a step in :func:`stage` (or :func:`record` a measured duration) and the
+response carries ``Server-Timing: read;dur=1.2, decode;dur=30.5, ...,
+total;dur=41.0``, which browser devtools show in the request's Timing tab.
+Repeated stages add up, e.g. ``db`` is the sum of every SQL statement. Timed
+requests are also logged with the same numbers as ``key=value`` fields, at
+INFO once they take ``SLOW_REQUEST_MS`` or longer and at DEBUG otherwise.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+
+from flask import Flask, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add ``seconds`` to stage ``name`` of the current request."""
+    if not has_request_context():
+        return
+    timings = g.get('stage_timings')
+    if timings is None:
+        return
+    timings[name] = timings.get(name, 0.0) + seconds * 1000
+
+
+@contextmanager
+def stage(name: str):
+    """Time the block as stage ``name``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def _start():
+    g.stage_timings = {}
+    g.stage_started = time.perf_counter()
+
+
+def _report(response):
+    timings = g.pop('stage_timings', None)
+    if not timings:
+        return response
+    total = (time.perf_counter() - g.stage_started) * 1000
+    entries = [f'{name};dur={ms:.1f}' for name, ms in timings.items()]
+    response.headers['Server-Timing'] = ', '.join([*entries, f'total;dur={total:.1f}'])
+
+    fields = {'endpoint': request.endpoint, 'status': response.status_code, 'total_ms': round(total, 1),
+              **{f'{name}_ms': round(ms, 1) for name, ms in timings.items()}}
+    slow = total >= current_app.config.get('SLOW_REQUEST_MS', 1000)
+    logger.log(logging.INFO if slow else logging.DEBUG,
+               'request timings ' + ' '.join(f'{key}={value}' for key, value in fields.items()),
+               extra={'timings': fields})
+    return response
+
+
+def _time_statements(engine) -> None:
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('timing_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('timing_started')
+        if started:
+            record('db', time.perf_counter() - started.pop())
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        started = context.connection.info.get('timing_started') if context.connection else None
+        if started:
+            started.pop()
+
+
+def init_app(app: Flask, engine) -> None:
+    """Report stage timings on every response; ``engine``'s statements count as ``db``."""
+    app.before_request(_start)
+    app.after_request(_report)
+    _time_statements(engine)
@@ -0,0 +1,158 @@
+"""Run the same workload against SQLite and PostgreSQL.
+
+    python benchmarks/bench_backends.py --rows 20000
+    python benchmarks/bench_backends.py --postgres postgresql://user:pw@localhost/bench
+    python benchmarks/bench_backends.py --temp-postgres   # needs initdb/pg_ctl on PATH
+
+Each backend gets a fresh schema, a bulk-loaded corpus and then timed list,
+search, facet and update requests through the Flask test client.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import create_app  # noqa: E402
+from app.bulk import bulk_insert_paintings  # noqa: E402
+from app.config import Config, database_url, engine_options  # noqa: E402
+from app.extensions import db  # noqa: E402
+
+WORDS = ("harbor", "sunset", "mountain", "portrait", "abstract", "forest", "river", "city")
+FOLDERS = ("", "sketches", "sketches/2024", "studies", "finished")
+
+
+def _rows(count: int, user_id: int) -> list[dict]:
+    return [
+        {
+            "user_id": user_id,
+            "title": f"{WORDS[i % len(WORDS)].title()} {WORDS[(i * 7) % len(WORDS)]} {i}",
+            "description": f"A {WORDS[(i * 3) % len(WORDS)]} study number {i}",
+            "tags": ", ".join({WORDS[i % 5], WORDS[(i * 5) % len(WORDS)]}),
+            "folder": FOLDERS[i % len(FOLDERS)],
+            "is_public": i % 3 != 0,
+            "filename": f"users/{user_id}/bench-{i}.png",
+            "file_size": 50_000 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def _timed(client, label: str, method: str, url: str, repeat: int, **kwargs) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        resp = getattr(client, method)(url, **kwargs)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code < 400, (label, resp.status_code, resp.get_data(as_text=True))
+    return {
+        "label": label,
+        "p50": statistics.median(samples),
+        "p95": sorted(samples)[max(0, int(len(samples) * 0.95) - 1)],
+        "queries": resp.headers.get("X-Query-Count", "?"),
+    }
+
+
+def run(url: str, rows: int, repeat: int, image_dir: str) -> list[dict]:
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url(url)
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(database_url(url))
+        IMAGE_DIR = image_dir
+        THUMBNAIL_DIR = os.path.join(image_dir, "thumbnails")
+        ENABLE_RATE_LIMITS = False
+        QUERY_BUDGET_MODE = "warn"
+        SLOW_QUERY_MS = 1e9
+        REAPER_ENABLED = False
+        RESPONSE_CACHE_BACKEND = "none"
+
+    results = []
+    start = time.perf_counter()
+    app = create_app(BenchConfig)
+    with app.app_context():
+        results.append({"label": "create_app + schema", "p50": (time.perf_counter() - start) * 1000,
+                        "p95": 0, "queries": "-"})
+        client = app.test_client()
+        client.post("/api/users", json={"username": "bench", "email": "bench@example.com",
+                                        "password": "bench-password"})
+        login = client.post("/api/auth/login", json={"username": "bench",
+                                                     "password": "bench-password"}).json
+        token, user_id = login["token"], login["user"]["id"]
+
+        start = time.perf_counter()
+        with db.engine.begin() as conn:
+            for offset in range(0, rows, 5000):
+                bulk_insert_paintings(conn, _rows(min(5000, rows - offset), user_id))
+        results.append({"label": f"bulk insert {rows}", "p50": (time.perf_counter() - start) * 1000,
+                        "p95": 0, "queries": "-"})
+
+        auth = {"Authorization": f"Bearer {token}"}
+        results += [
+            _timed(client, "public feed", "get", "/api/paintings", repeat),
+            _timed(client, "public feed, page 50", "get", "/api/paintings?page=50", repeat),
+            _timed(client, "user folder", "get", f"/api/paintings?user_id={user_id}&folder=sketches",
+                   repeat, headers=auth),
+            _timed(client, "search 1 word", "get", "/api/search?q=harb", repeat),
+            _timed(client, "search 2 words", "get", "/api/search?q=mountain+riv", repeat),
+            _timed(client, "facets", "get", "/api/facets", repeat),
+            _timed(client, "tag filter", "get", "/api/paintings?tag=forest", repeat),
+        ]
+        db.session.remove()
+        db.drop_all()
+    return results
+
+
+@contextmanager
+def temp_postgres():
+    """Start a throwaway PostgreSQL cluster and yield its URL."""
+    if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+        raise SystemExit("initdb/pg_ctl not found on PATH")
+    data = tempfile.mkdtemp(prefix="bench-pg-")
+    port = os.getenv("BENCH_PG_PORT", "54329")
+    subprocess.run(["initdb", "-D", data, "-U", "bench", "--auth=trust"], check=True,
+                   stdout=subprocess.DEVNULL)
+    subprocess.run(["pg_ctl", "-D", data, "-o", f"-p {port} -k {data}", "-w", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        subprocess.run(["createdb", "-h", data, "-p", port, "-U", "bench", "bench"], check=True)
+        yield f"postgresql://bench@localhost:{port}/bench?host={data}"
+    finally:
+        subprocess.run(["pg_ctl", "-D", data, "-m", "fast", "stop"], stdout=subprocess.DEVNULL)
+        shutil.rmtree(data, ignore_errors=True)
+
+
+def _print(name: str, results: list[dict]) -> None:
+    print(f"\n{name}")
+    print(f"  {'step':<28}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}")
+    for r in results:
+        print(f"  {r['label']:<28}{r['p50']:>10.1f}{r['p95']:>10.1f}{r['queries']:>9}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--postgres", help="PostgreSQL URL to benchmark against")
+    parser.add_argument("--temp-postgres", action="store_true",
+                        help="start a temporary PostgreSQL cluster with initdb/pg_ctl")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        _print("sqlite", run(f"sqlite:///{tmp}/bench.db", args.rows, args.repeat, tmp))
+        if args.postgres:
+            _print("postgresql", run(args.postgres, args.rows, args.repeat, tmp))
+        elif args.temp_postgres:
+            with temp_postgres() as url:
+                _print("postgresql", run(url, args.rows, args.repeat, tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Measure import and boot time of the API, as a worker process sees it.
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --imports   # slowest imports of ``app``
+
+Every sample runs in a fresh interpreter:
+
+* ``import app``: module import only
+* ``cold boot``: ``create_app()`` against an empty database (full bootstrap)
+* ``warm boot``: ``create_app()`` against a bootstrapped database, which is
+  what every gunicorn worker restart or new replica pays
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_TIMED = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+{boot}
+print(f"{{(imported - start) * 1000:.1f}} {{(time.perf_counter() - start) * 1000:.1f}}")
+"""
+
+_BOOT = "app.create_app()"
+
+
+def _sample(data_dir: str, boot: bool) -> tuple[float, float]:
+    env = {
+        **os.environ,
+        "DB_DIR": data_dir,
+        "DB_PATH": os.path.join(data_dir, "app.db"),
+        "IMAGE_DIR": os.path.join(data_dir, "images"),
+        "REAPER_ENABLED": "false",
+    }
+    env.pop("DATABASE_URL", None)
+    out = subprocess.run(
+        [sys.executable, "-c", _TIMED.format(boot=_BOOT if boot else "")],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(out[-2]), float(out[-1])
+
+
+def _report(label: str, samples: list[float]) -> None:
+    print(f"  {label:<12}{statistics.median(samples):>10.1f}{min(samples):>10.1f}{max(samples):>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", action="store_true", help="show the 15 slowest imports")
+    args = parser.parse_args()
+
+    if args.imports:
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                                cwd=BACKEND_DIR, capture_output=True, text=True)
+        rows = [line.split("|") for line in result.stderr.splitlines()[1:] if "|" in line]
+        for _, cumulative, name in sorted(rows, key=lambda r: -int(r[1]))[:15]:
+            print(f"{int(cumulative) / 1000:>8.1f} ms  {name.rstrip()}")
+        return
+
+    imports, cold, warm = [], [], []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+            imports.append(_sample(tmp, boot=False)[0])
+            cold.append(_sample(tmp, boot=True)[1])
+            warm.append(_sample(tmp, boot=True)[1])
+
+    print(f"  {'ms':<12}{'median':>10}{'min':>10}{'max':>10}")
+    _report("import app", imports)
+    _report("cold boot", cold)
+    _report("warm boot", warm)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""Gunicorn settings: keep Prometheus multiprocess samples consistent across workers."""
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples left by a previous run would be merged into this one's
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
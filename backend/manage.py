@@ -1,15 +1,29 @@
 from __future__ import annotations
 
 import click
-from flask.cli import with_appcontext
+from flask.cli import FlaskGroup, with_appcontext
 
 from app import create_app
 from app.extensions import db
 
-app = create_app()
 
+def _create_app():
+    # Commands bootstrap explicitly (or not at all) instead of on every boot
+    from app.config import Config
 
-@click.command("init-db")
+    class ManageConfig(Config):
+        AUTO_BOOTSTRAP = False
+        REAPER_ENABLED = False
+
+    return create_app(ManageConfig)
+
+
+@click.group(cls=FlaskGroup, create_app=_create_app)
+def cli():
+    """Management commands; the app is only built when a command runs."""
+
+
+@cli.command("init-db")
 @with_appcontext
 def init_db_command():
     """Create database tables."""
@@ -17,5 +31,52 @@ def init_db_command():
     click.echo("Database initialized.")
 
 
-app.cli.add_command(init_db_command)
+@cli.command("bootstrap")
+@click.option("--force", is_flag=True, help="Re-run even if the database is up to date.")
+def bootstrap_command(force):
+    """Create/upgrade the schema and seed data once, before workers start."""
+    from flask import current_app
+
+    from app.bootstrap import SCHEMA_VERSION, bootstrap
+
+    did_work = bootstrap(current_app._get_current_object(), force=force)
+    click.echo(f"Database {'bootstrapped' if did_work else 'already'} at version {SCHEMA_VERSION}.")
+
+
+@cli.command("reconcile-usage")
+@click.option("--stat-files", is_flag=True, help="Re-read file sizes from disk first.")
+@with_appcontext
+def reconcile_usage_command(stat_files):
+    """Recompute per-user storage totals and repair drift."""
+    from app.usage import reconcile_usage
+
+    drift = reconcile_usage(stat_files=stat_files)
+    for item in drift:
+        click.echo(f"user {item['user_id']}: {item['recorded']} -> {item['actual']}")
+    click.echo(f"Usage reconciled ({len(drift)} users repaired).")
+
+
+@cli.command("reap-files")
+@click.option("--max-per-second", type=float, default=None,
+              help="Throttle unlinks (default REAPER_MAX_FILES_PER_SECOND, 0 = unthrottled).")
+@with_appcontext
+def reap_files_command(max_per_second):
+    """Delete every queued image file that no painting references."""
+    from app.file_reaper import pending_count, reap_all
+
+    click.echo(f"{pending_count()} files queued.")
+    settled = reap_all(max_per_second=max_per_second)
+    click.echo(f"Reaped {settled} files.")
+
+
+@cli.command("expire-uploads")
+@with_appcontext
+def expire_uploads_command():
+    """Remove resumable upload sessions idle past UPLOAD_SESSION_TTL."""
+    from app.uploads import expire_sessions
+
+    click.echo(f"Expired {expire_sessions()} upload sessions.")
+
 
+if __name__ == "__main__":
+    cli()
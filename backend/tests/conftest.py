@@ -1,20 +1,81 @@
 import os
-import tempfile
+import shutil
+import subprocess
+from io import BytesIO
 
 import pytest
+from PIL import Image
 
 from app import create_app
+from app.config import Config, database_url, engine_options
 from app.extensions import db
+from app.models import User
+from app.utils.auth import issue_token
+from app.utils.query_budget import QueryCounter
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "config(**settings): override TestConfig settings for one test"
+    )
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--postgres", action="store_true",
+        help="run against a temporary PostgreSQL cluster (needs initdb/pg_ctl on PATH)",
+    )
+
+
+@pytest.fixture(scope="session")
+def postgres_url(request, tmp_path_factory):
+    """``TEST_DATABASE_URL``, a throwaway cluster under ``--postgres``, or None for SQLite."""
+    if os.getenv("TEST_DATABASE_URL"):
+        yield os.environ["TEST_DATABASE_URL"]
+        return
+    if not request.config.getoption("--postgres"):
+        yield None
+        return
+    if not shutil.which("initdb") or not shutil.which("pg_ctl"):
+        pytest.skip("initdb/pg_ctl not found on PATH")
+    data = tmp_path_factory.mktemp("pg")
+    port = os.getenv("TEST_PG_PORT", "54328")
+    subprocess.run(["initdb", "-D", str(data), "-U", "test", "--auth=trust"], check=True,
+                   stdout=subprocess.DEVNULL)
+    subprocess.run(["pg_ctl", "-D", str(data), "-o", f"-p {port} -k {data}", "-w", "start"],
+                   check=True, stdout=subprocess.DEVNULL)
+    try:
+        subprocess.run(["createdb", "-h", str(data), "-p", port, "-U", "test", "test"], check=True)
+        yield f"postgresql://test@localhost:{port}/test?host={data}"
+    finally:
+        subprocess.run(["pg_ctl", "-D", str(data), "-m", "fast", "stop"], stdout=subprocess.DEVNULL)
 
 
 @pytest.fixture()
-def app():
-    db_fd, db_path = tempfile.mkstemp()
-    os.close(db_fd)
-    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+def app(request, tmp_path, postgres_url):
+    # Config values are read at import time, so build a per-test config class
+    # instead of exporting DATABASE_URL after ``app.config`` was imported.
+    url = database_url(postgres_url or f"sqlite:///{tmp_path / 'app.db'}")
 
-    app = create_app()
-    app.config.update(TESTING=True)
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = url
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(url)
+        DB_DIR = str(tmp_path)
+        IMAGE_DIR = str(tmp_path / "images")
+        THUMBNAIL_DIR = str(tmp_path / "images" / "thumbnails")
+        UPLOAD_DIR = str(tmp_path / "uploads")
+        ENABLE_RATE_LIMITS = False
+        QUERY_BUDGET_MODE = "raise"
+        # Cheap hashes instead of a calibrated cost per test; per-process leases
+        PASSWORD_HASH_ITERATIONS = 2_000
+        LEASE_STORAGE = "memory"
+
+    marker = request.node.get_closest_marker("config")
+    for name, value in (marker.kwargs if marker else {}).items():
+        setattr(TestConfig, name, value)
+
+    app = create_app(TestConfig)
     with app.app_context():
         db.create_all()
         try:
@@ -22,10 +83,51 @@ def app():
         finally:
             db.session.remove()
             db.drop_all()
-    os.unlink(db_path)
+            db.engine.dispose()
 
 
 @pytest.fixture()
 def client(app):
     return app.test_client()
 
+
+@pytest.fixture()
+def query_counter(app):
+    """Collect SQL statements executed while the returned list is in scope."""
+    with QueryCounter(db.engine) as counter:
+        yield counter.statements
+
+
+@pytest.fixture()
+def make_user(app):
+    """Factory: ``make_user(name)`` stores and returns a new user."""
+    def make(name):
+        user = User(username=name, email=f"{name}@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture()
+def user(make_user):
+    return make_user("kim")
+
+
+@pytest.fixture()
+def auth_headers(app):
+    """Factory: ``auth_headers(user)`` is a Bearer header with a token the app issued."""
+    def make(user):
+        return {"Authorization": f"Bearer {issue_token(user)}"}
+    return make
+
+
+@pytest.fixture()
+def png():
+    """Factory: ``png(size, color)`` is a rewound in-memory PNG."""
+    def make(size=(16, 16), color="blue"):
+        buffer = BytesIO()
+        Image.new("RGB", size, color=color).save(buffer, format="PNG")
+        buffer.seek(0)
+        return buffer
+    return make
@@ -0,0 +1,112 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from app.utils.admission import AdmissionController, AdmissionRejected, decode_cost
+from app.utils.leases import LeaseStore
+
+
+def _upload(client, png):
+    return client.post("/api/paintings", data={"title": "t", "image": (png((64, 48)), "t.png")},
+                       content_type="multipart/form-data")
+
+
+def test_decode_cost_from_header_dimensions():
+    assert decode_cost(100, 50, "RGB") == 100 * 50 * 3 * 2
+    assert decode_cost(10, 10, "weird") == 10 * 10 * 4 * 2
+
+
+def test_waiters_queue_then_overflow_is_refused():
+    gate = AdmissionController(max_concurrent=1, memory_budget=1000, queue_size=1, queue_timeout=5)
+    release = threading.Event()
+    entered = []
+
+    def hold():
+        with gate.admit(100):
+            entered.append("holder")
+            release.wait(5)
+
+    def wait_in_line():
+        with gate.admit(100):
+            entered.append("waiter")
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while not entered:
+        pass
+    waiter = threading.Thread(target=wait_in_line)
+    waiter.start()
+    while not gate.stats()["waiting"]:
+        pass
+
+    with pytest.raises(AdmissionRejected) as refused:
+        gate._acquire(100)
+    assert refused.value.status == 503 and refused.value.retry_after >= 1
+
+    release.set()
+    holder.join()
+    waiter.join()
+    stats = gate.stats()
+    assert entered == ["holder", "waiter"]
+    assert stats["admitted"] == 2 and stats["rejected"] == 1 and stats["peak_waiting"] == 1
+    assert stats["active"] == 0 and stats["memory_in_use"] == 0
+
+
+def test_memory_budget_and_timeouts():
+    gate = AdmissionController(max_concurrent=4, memory_budget=1000, queue_size=4, queue_timeout=0.05)
+    with pytest.raises(AdmissionRejected) as too_big:
+        gate._acquire(1001)
+    assert too_big.value.status == 413
+
+    with gate.admit(800):
+        with pytest.raises(AdmissionRejected):
+            gate._acquire(300)
+    assert gate.stats()["timed_out"] == 1
+    with gate.admit(1000):
+        pass
+
+
+def test_upload_endpoint_sheds_load(client, app, png):
+    app.extensions["admission"] = gate = AdmissionController(
+        max_concurrent=1, memory_budget=1 << 20, queue_size=0, queue_timeout=0)
+    gate._acquire(1)
+    resp = _upload(client, png)
+    assert resp.status_code == 503
+    assert int(resp.headers["Retry-After"]) >= 1
+
+    gate._release(1, 0.0)
+    assert _upload(client, png).status_code == 201
+
+    app.extensions["admission"] = AdmissionController(memory_budget=1000)
+    assert _upload(client, png).status_code == 413
+
+    app.config["ADMIN_TOKEN"] = "secret"
+    stats = client.get("/api/admin/admission", headers={"X-Admin-Token": "secret"}).json
+    assert stats["rejected"] == 1
+
+
+def test_budget_is_shared_across_workers(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.db"))
+    workers = [AdmissionController(max_concurrent=2, memory_budget=1000, queue_size=1,
+                                   queue_timeout=0.1, store=store) for _ in range(2)]
+
+    with workers[0].admit(600):
+        with pytest.raises(AdmissionRejected):
+            with workers[1].admit(600):
+                pass
+        with workers[1].admit(400):
+            assert store.usage("decode") == (2, 1000)
+            assert workers[1].stats()["node_memory_in_use"] == 1000
+    assert store.usage("decode") == (0, 0)
+
+
+def test_leases_of_dead_workers_are_dropped(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.db"))
+    child = subprocess.Popen([sys.executable, "-c", "pass"])
+    child.wait()
+    store._connect().execute("INSERT INTO leases (pool, pid, cost) VALUES ('decode', ?, 900)", (child.pid,))
+
+    assert store.try_acquire("decode", 500, slots=2, budget=1000) is not None
+    assert store.usage("decode") == (1, 500)
@@ -0,0 +1,37 @@
+from flask import g
+
+from app.extensions import db
+
+
+def test_current_user_resolved_once_and_cached(client, app, query_counter, user, auth_headers):
+    headers = auth_headers(user)
+
+    resp = client.post("/api/auth/verify", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json["user"]["username"] == "kim"
+
+    query_counter.clear()
+    assert client.post("/api/auth/verify", headers=headers).status_code == 200
+    assert len(query_counter) == 0
+
+    with app.test_request_context(headers=headers):
+        app.preprocess_request()
+        assert g.current_user.id == user.id
+
+
+def test_invalid_tokens_are_rejected(client, app):
+    assert client.post("/api/auth/verify").status_code == 400
+    assert client.post("/api/auth/verify", headers={"Authorization": "Bearer nope"}).status_code == 401
+    resp = client.delete("/api/paintings", json={"ids": [1]}, headers={"Authorization": "Token x"})
+    assert resp.status_code == 401
+    assert resp.json["error"] == "Malformed Authorization header"
+
+
+def test_deleted_user_token_stops_working_after_forget(client, app, user, auth_headers):
+    headers = auth_headers(user)
+    assert client.post("/api/auth/verify", headers=headers).status_code == 200
+
+    db.session.delete(user)
+    db.session.commit()
+    app.extensions["auth"].forget_user(user.id)
+    assert client.post("/api/auth/verify", headers=headers).status_code == 404
@@ -0,0 +1,20 @@
+from app.bootstrap import SCHEMA_VERSION, bootstrap, current_version
+from app.extensions import db
+from app.models import AppMeta, User
+
+
+def test_bootstrap_runs_once_per_database(app):
+    assert current_version() == SCHEMA_VERSION
+    assert User.query.filter_by(username="demo").count() == 1
+
+    assert bootstrap(app) is False
+    assert bootstrap(app, force=True) is True
+    assert User.query.filter_by(username="demo").count() == 1
+
+
+def test_outdated_database_is_upgraded(app):
+    db.session.get(AppMeta, "schema_version").value = "0"
+    db.session.commit()
+
+    assert bootstrap(app) is True
+    assert current_version() == SCHEMA_VERSION
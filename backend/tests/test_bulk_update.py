@@ -0,0 +1,67 @@
+from app.extensions import db
+from app.models import FacetCount, Painting, Tag
+
+
+def _paintings(user, count, **fields):
+    paintings = [
+        Painting(user_id=user.id, title=f"p{i}", filename=f"users/{user.id}/p{i}.png", **fields)
+        for i in range(count)
+    ]
+    db.session.add_all(paintings)
+    db.session.commit()
+    return [p.id for p in paintings]
+
+
+def test_bulk_update_moves_retags_and_publishes(client, make_user, auth_headers):
+    user = make_user("grace")
+    ids = _paintings(user, 5, tags="sketch, old")
+
+    resp = client.patch("/api/paintings", headers=auth_headers(user), json={
+        "ids": ids,
+        "changes": {"folder": "archive", "is_public": True,
+                    "add_tags": ["final"], "remove_tags": "old"},
+    })
+    assert resp.status_code == 200
+    assert resp.json["updated"] == 5
+
+    db.session.expire_all()
+    rows = Painting.query.all()
+    assert {(p.folder, p.is_public, p.tags) for p in rows} == {("archive", True, "sketch, final")}
+    assert dict(db.session.query(Tag.name, Tag.public_count).all()) == {"sketch": 5, "final": 5}
+    public_total = db.session.get(FacetCount, ("public", "_total", ""))
+    assert public_total.count == 5
+
+
+def test_bulk_update_checks_every_row(client, make_user, auth_headers):
+    owner, other = make_user("heidi"), make_user("ivan")
+    mine = _paintings(owner, 2)
+    theirs = _paintings(other, 1)
+    headers = auth_headers(owner)
+
+    resp = client.patch("/api/paintings", headers=headers,
+                        json={"ids": mine + theirs, "changes": {"folder": "x"}})
+    assert resp.status_code == 403
+    assert resp.json["ids"] == theirs
+
+    resp = client.patch("/api/paintings", headers=headers,
+                        json={"ids": mine + [9999], "changes": {"folder": "x"}})
+    assert resp.status_code == 404
+
+    assert client.patch("/api/paintings", json={"ids": mine, "changes": {"folder": "x"}}).status_code == 401
+    assert client.patch("/api/paintings", headers=headers,
+                        json={"ids": mine, "changes": {"filename": "x"}}).status_code == 400
+    db.session.expire_all()
+    assert {p.folder for p in Painting.query.all()} == {""}
+
+
+def test_bulk_update_query_count_is_flat(client, make_user, auth_headers):
+    user = make_user("judy")
+    headers = auth_headers(user)
+    counts = []
+    for size in (1, 5, 50):  # the first run creates the tags
+        ids = _paintings(user, size, tags="a")
+        resp = client.patch("/api/paintings", headers=headers,
+                            json={"ids": ids, "changes": {"folder": f"f{size}", "add_tags": "b"}})
+        assert resp.status_code == 200
+        counts.append(resp.headers["X-Query-Count"])
+    assert counts[1] == counts[2]
@@ -0,0 +1,46 @@
+from app.extensions import db
+from app.models import Painting
+
+
+def _painting(title, *, folder="", tags=""):
+    painting = Painting(title=title, folder=folder, tags=tags, is_public=True, filename=f"x/{title}.png")
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def test_cached_count_invalidated_by_writes(client, query_counter):
+    _painting("a")
+    assert client.get("/api/paintings").json["total"] == 1
+
+    query_counter.clear()
+    assert client.get("/api/paintings").json["total"] == 1
+    assert not any("count(" in sql.lower() for sql in query_counter)
+
+    _painting("b")
+    assert client.get("/api/paintings").json["total"] == 2
+
+
+def test_approx_count_uses_counters(client, query_counter):
+    _painting("a", folder="Drafts", tags="cat")
+    _painting("b", folder="Drafts", tags="dog")
+    _painting("c", tags="cat")
+
+    query_counter.clear()
+    resp = client.get("/api/paintings", query_string={"count": "approx", "folder": "Drafts"})
+    assert resp.json["total"] == 2
+    assert resp.json["pages"] == 1
+    assert not any("count(" in sql.lower() for sql in query_counter)
+
+    resp = client.get("/api/paintings", query_string={"count": "approx", "tag": "cat"})
+    assert resp.json["total"] == 2
+    # Two tags have no single counter, so this falls back to an exact count
+    resp = client.get("/api/paintings", query_string={"count": "approx", "tag": "cat,dog", "tag_mode": "any"})
+    assert resp.json["total"] == 3
+
+
+def test_count_none_and_invalid_mode(client):
+    _painting("a")
+    resp = client.get("/api/paintings", query_string={"count": "none"})
+    assert resp.json["total"] is None and resp.json["pages"] is None
+    assert client.get("/api/paintings", query_string={"count": "bogus"}).status_code == 400
@@ -0,0 +1,87 @@
+import os
+
+from app.extensions import db
+from app.file_reaper import pending_count, reap_batch
+from app.models import FacetCount, Painting, PendingFileDeletion, Tag
+
+
+def _upload(client, png, user, tags="sea"):
+    resp = client.post(
+        "/api/paintings",
+        data={"user_id": str(user.id), "title": "t", "tags": tags, "is_public": "true",
+              "image": (png(), "t.png")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 201
+    painting = db.session.get(Painting, resp.json["painting"]["id"])
+    return painting.id, [painting.filename, painting.thumbnail]
+
+
+def _exists(app, path):
+    return os.path.exists(os.path.join(app.config["IMAGE_DIR"], path))
+
+
+def test_delete_defers_file_removal_to_reaper(client, app, png, user, make_user, auth_headers):
+    painting_id, files = _upload(client, png, user)
+
+    assert client.delete(f"/api/paintings/{painting_id}").status_code == 401
+    assert client.delete(f"/api/paintings/{painting_id}",
+                         headers=auth_headers(make_user("lee"))).status_code == 403
+    resp = client.delete(f"/api/paintings/{painting_id}", headers=auth_headers(user))
+    assert resp.status_code == 200
+    assert db.session.get(Painting, painting_id) is None
+    assert all(_exists(app, path) for path in files)
+    assert pending_count() == 2
+    assert db.session.get(FacetCount, ("public", "_total", "")) is None
+
+    assert reap_batch(max_per_second=0) == 2
+    assert not any(_exists(app, path) for path in files)
+    assert pending_count() == 0
+
+
+def test_bulk_delete_and_image_replace(client, app, png, user, auth_headers):
+    uploads = [_upload(client, png, user) for _ in range(3)]
+    headers = auth_headers(user)
+
+    resp = client.put(f"/api/paintings/{uploads[2][0]}", headers=headers,
+                      data={"image": (png(), "new.png")}, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    assert pending_count() == 2  # the replaced original and thumbnail
+
+    ids = [painting_id for painting_id, _ in uploads[:2]]
+    resp = client.delete("/api/paintings", headers=headers, json={"ids": ids})
+    assert resp.status_code == 200
+    assert resp.json["deleted"] == 2
+    assert Painting.query.count() == 1
+    assert db.session.query(Tag.painting_count).filter_by(name="sea").scalar() == 1
+
+    reap_batch(max_per_second=0)
+    assert not any(_exists(app, path) for _, files in uploads for path in files)
+    survivor = db.session.get(Painting, uploads[2][0])
+    assert _exists(app, survivor.filename)
+
+
+def test_anonymous_paintings_cannot_be_deleted(client, png, user, auth_headers):
+    resp = client.post("/api/paintings", data={"title": "t", "image": (png(), "t.png")},
+                       content_type="multipart/form-data")
+    painting_id = resp.json["painting"]["id"]
+    headers = auth_headers(user)
+
+    assert client.delete(f"/api/paintings/{painting_id}").status_code == 401
+    assert client.delete(f"/api/paintings/{painting_id}", headers=headers).status_code == 403
+    resp = client.delete("/api/paintings", headers=headers, json={"ids": [painting_id]})
+    assert resp.status_code == 403
+    assert resp.json["ids"] == [painting_id]
+    resp = client.patch("/api/paintings", headers=headers, json={"ids": [painting_id], "changes": {"title": "x"}})
+    assert resp.status_code == 403
+    assert db.session.get(Painting, painting_id).title == "t"
+
+
+def test_reaper_skips_paths_in_use(client, app, png, user):
+    _, files = _upload(client, png, user)
+    db.session.add(PendingFileDeletion(path=files[0]))
+    db.session.commit()
+
+    assert reap_batch(max_per_second=0) == 1
+    assert _exists(app, files[0])
+    assert pending_count() == 0
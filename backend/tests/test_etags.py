@@ -0,0 +1,60 @@
+from app.extensions import db
+from app.models import Painting, User
+
+
+def _painting(title, **fields):
+    painting = Painting(title=title, filename=f"public/{title}.png", is_public=True, **fields)
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def test_list_revalidates_with_304_until_write(client, query_counter):
+    _painting("a")
+    first = client.get("/api/paintings")
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    query_counter.clear()
+    resp = client.get("/api/paintings", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.data == b""
+    assert len(query_counter) == 0
+
+    # Other parameters are another representation
+    assert client.get("/api/paintings", query_string={"page": 2},
+                      headers={"If-None-Match": etag}).status_code == 200
+
+    _painting("b")
+    resp = client.get("/api/paintings", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_painting_and_user_etags(client, app):
+    user = User.query.first()
+    painting = _painting("solo")
+
+    etag = client.get(f"/api/paintings/{painting.id}").headers["ETag"]
+    assert client.get(f"/api/paintings/{painting.id}", headers={"If-None-Match": etag}).status_code == 304
+
+    painting.title = "renamed"
+    db.session.commit()
+    assert client.get(f"/api/paintings/{painting.id}", headers={"If-None-Match": etag}).status_code == 200
+
+    etag = client.get(f"/api/users/{user.id}").headers["ETag"]
+    assert client.get(f"/api/users/{user.id}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_private_painting_needs_auth_before_304(client, auth_headers):
+    user = User.query.first()
+    painting = _painting("hidden", user_id=user.id)
+    painting.is_public = False
+    db.session.commit()
+
+    resp = client.get(f"/api/paintings/{painting.id}", headers=auth_headers(user))
+    assert resp.status_code == 200
+    assert "private" in resp.headers["Cache-Control"]
+    assert client.get(f"/api/paintings/{painting.id}",
+                      headers={"If-None-Match": resp.headers["ETag"]}).status_code == 403
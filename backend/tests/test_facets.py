@@ -0,0 +1,128 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.facets import backfill_facets
+from app.models import FacetCount, Painting, User
+
+
+def _painting(title, *, folder="", fmt="png", tags="", is_public=True, user_id=None):
+    painting = Painting(
+        title=title, folder=folder, format=fmt, tags=tags, is_public=is_public,
+        user_id=user_id, filename=f"x/{title}.{fmt}",
+    )
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def _values(items):
+    return {item["value"]: item["count"] for item in items}
+
+
+def test_facets_follow_writes(client):
+    a = _painting("a", folder="Drafts", fmt="png", tags="cat")
+    _painting("b", folder="Drafts", fmt="jpg", tags="cat, dog")
+    _painting("c", folder="", fmt="png", tags="dog", is_public=False)
+
+    body = client.get("/api/facets").json
+    assert body["total"] == 2
+    assert _values(body["format"]) == {"png": 1, "jpg": 1}
+    assert _values(body["folder"]) == {"Drafts": 2}
+    assert body["tag"][0] == {"value": "cat", "count": 2}
+
+    a.folder = "Final"
+    a.format = "webp"
+    db.session.commit()
+    body = client.get("/api/facets", query_string={"folder": "Drafts"}).json
+    assert body["total"] == 1
+    assert _values(body["format"]) == {"jpg": 1}
+    assert _values(body["folder"]) == {"Drafts": 1, "Final": 1}
+
+    db.session.delete(a)
+    db.session.commit()
+    assert client.get("/api/facets").json["total"] == 1
+    assert FacetCount.query.filter_by(value="webp").count() == 0
+
+
+def test_facets_per_user_scope(client):
+    user = User(username="dana", email="d@example.com", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    _painting("mine", user_id=user.id, is_public=False, tags="wip")
+    _painting("public", tags="cat")
+
+    body = client.get("/api/facets", query_string={"user_id": user.id}).json
+    assert body["total"] == 1
+    assert _values(body["tag"]) == {"wip": 1}
+
+
+def test_facets_narrowed_by_tag(client):
+    _painting("a", folder="Drafts", fmt="png", tags="cat")
+    _painting("b", folder="Other", fmt="jpg", tags="cat, dog")
+    _painting("c", fmt="jpg", tags="dog")
+
+    body = client.get("/api/facets", query_string={"tag": "cat"}).json
+    assert body["total"] == 2
+    assert _values(body["format"]) == {"png": 1, "jpg": 1}
+    assert _values(body["folder"]) == {"Drafts": 1, "Other": 1}
+    assert _values(body["tag"]) == {"cat": 2, "dog": 1}
+
+
+def test_facets_query_cost_is_flat(client, query_counter):
+    for i in range(10):
+        _painting(f"p{i}", folder=f"f{i % 3}", tags=f"t{i}")
+    query_counter.clear()
+    assert client.get("/api/facets").status_code == 200
+    # Scope version + the two facet reads
+    assert len(query_counter) == 3
+
+
+def test_backfill_facets(app):
+    db.session.execute(text(
+        "INSERT INTO paintings (title, filename, tags, is_public, format, folder, created_at, updated_at) "
+        "VALUES ('old', 'x.png', 'cat', TRUE, 'png', 'Drafts', '2024-01-01', '2024-01-01')"
+    ))
+    db.session.commit()
+    assert FacetCount.query.count() == 0
+
+    backfill_facets()
+    assert FacetCount.query.get(("public", "_total", "")).count == 1
+    assert FacetCount.query.get(("public:f:Drafts", "tag", "cat")).count == 1
+
+
+def test_format_filter_is_served_from_counts(client, query_counter):
+    _painting("a", folder="Drafts", fmt="png", tags="cat")
+    _painting("b", folder="Other", fmt="PNG", tags="dog")
+    _painting("c", folder="Drafts", fmt="jpg", tags="cat")
+
+    query_counter.clear()
+    body = client.get("/api/facets", query_string={"format": "png"}).json
+    assert len(query_counter) == 3
+    assert body["total"] == 2
+    assert body["format"] == [{"value": "png", "count": 2}]
+    assert _values(body["folder"]) == {"Drafts": 1, "Other": 1}
+    assert _values(body["tag"]) == {"cat": 1, "dog": 1}
+
+    body = client.get("/api/facets", query_string={"format": "png", "folder": "Drafts"}).json
+    assert body["total"] == 1
+    assert _values(body["tag"]) == {"cat": 1}
+    assert client.get("/api/facets", query_string={"format": "gif"}).json["total"] == 0
+
+
+def test_tag_filtered_facets_are_capped(client, app):
+    app.config["FACET_NARROW_MAX_ROWS"] = 2
+    for i in range(3):
+        _painting(f"p{i}", tags="cat")
+    body = client.get("/api/facets", query_string={"tag": "cat"}).json
+    assert body["total"] == 2
+    assert body["truncated"]
+
+
+def test_backfill_rebuilds_counts_without_format_scopes(app):
+    _painting("a", folder="Drafts", fmt="png", tags="cat")
+    db.session.query(FacetCount).filter(FacetCount.scope.like("%:t:%")).delete(synchronize_session=False)
+    db.session.commit()
+
+    backfill_facets()
+    assert FacetCount.query.get(("public:t:png", "folder", "Drafts")).count == 1
+    assert FacetCount.query.get(("public:t:png:f:Drafts", "tag", "cat")).count == 1
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app.extensions import db
+from app.models import FolderStat, Painting
+from app.schema import ensure_schema
+
+
+def _painting(title, folder, user_id, *, minutes=0, size=100, is_public=False):
+    painting = Painting(
+        title=title, folder=folder, user_id=user_id, is_public=is_public,
+        filename=f"u/{title}.png", thumbnail=f"u/{title}_thumb.jpg",
+        file_size=size, thumbnail_size=10,
+        created_at=datetime(2024, 1, 1) + timedelta(minutes=minutes),
+    )
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def _child(node, name):
+    return next(c for c in node["children"] if c["name"] == name)
+
+
+def test_folder_tree_counts_and_latest(client, user):
+    _painting("a", "art", user.id, minutes=1)
+    _painting("b", "art/2024", user.id, minutes=2)
+    newest = _painting("c", "art/2024", user.id, minutes=3)
+    _painting("d", "", user.id, minutes=0)
+
+    resp = client.get("/api/folders", query_string={"user_id": user.id})
+    assert resp.status_code == 200
+    root = resp.json["tree"]
+    assert root["painting_count"] == 1
+    assert root["subtree_count"] == 4
+    art = _child(root, "art")
+    assert (art["painting_count"], art["subtree_count"], art["subtree_bytes"]) == (1, 3, 330)
+    year = _child(art, "2024")
+    assert year["latest"]["painting_id"] == newest.id
+    assert root["latest"]["thumbnail_url"] == "/media/images/u/c_thumb.jpg"
+
+    # Moving the newest painting out re-points the folder at the next newest
+    newest.folder = "other"
+    db.session.commit()
+    year = _child(_child(client.get(f"/api/folders?user_id={user.id}").json["tree"], "art"), "2024")
+    assert year["painting_count"] == 1
+    assert year["latest"]["painting_id"] != newest.id
+
+    db.session.delete(newest)
+    db.session.commit()
+    assert FolderStat.query.get((f"user:{user.id}", "other")) is None
+
+
+def test_public_scope_tracks_visibility(client, user):
+    painting = _painting("a", "shared", user.id, is_public=True)
+    assert _child(client.get("/api/folders").json["tree"], "shared")["painting_count"] == 1
+
+    painting.is_public = False
+    db.session.commit()
+    assert client.get("/api/folders").json["tree"]["children"] == []
+
+
+def test_ensure_schema_adds_size_columns(app, tmp_path, user):
+    image = tmp_path / "images" / "u" / "legacy.png"
+    image.parent.mkdir(parents=True, exist_ok=True)
+    image.write_bytes(b"x" * 42)
+    _painting("legacy", "old", user.id)
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM folder_stats")
+        conn.exec_driver_sql("ALTER TABLE paintings DROP COLUMN file_size")
+        conn.exec_driver_sql("ALTER TABLE paintings DROP COLUMN thumbnail_size")
+
+    ensure_schema()
+
+    columns = {c["name"] for c in sa.inspect(db.engine).get_columns("paintings")}
+    assert {"file_size", "thumbnail_size"} <= columns
+    db.session.expire_all()
+    assert Painting.query.one().file_size == 42
+    assert FolderStat.query.get((f"user:{user.id}", "old")).total_bytes == 42
@@ -0,0 +1,45 @@
+from prometheus_client import REGISTRY
+
+from app.extensions import db
+from app.models import Painting
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_counted_per_endpoint(client):
+    before = _sample("http_requests_total", blueprint="tags", endpoint="tags.list_tags",
+                     method="GET", status="200")
+    assert client.get("/api/tags").status_code == 200
+    assert _sample("http_requests_total", blueprint="tags", endpoint="tags.list_tags",
+                   method="GET", status="200") == before + 1
+    assert _sample("http_request_duration_seconds_count", blueprint="tags",
+                   endpoint="tags.list_tags", method="GET") >= 1
+    assert _sample("http_requests_in_flight", blueprint="tags", endpoint="tags.list_tags") == 0
+    assert _sample("db_query_duration_seconds_count", operation="SELECT") > 0
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    assert b'endpoint="tags.list_tags"' in resp.data
+
+
+def test_image_pipeline_and_cache_metrics(client, png):
+    decoded = _sample("image_stage_duration_seconds_count", stage="decode")
+    bytes_in = _sample("image_bytes_total", direction="in")
+    resp = client.post("/api/paintings", data={"title": "t", "image": (png((40, 30), "red"), "t.png")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 201
+    for stage in ("write", "decode", "thumbnail", "encode"):
+        assert _sample("image_stage_duration_seconds_count", stage=stage) >= 1
+    assert _sample("image_stage_duration_seconds_count", stage="decode") == decoded + 1
+    size = db.session.get(Painting, resp.json["painting"]["id"]).file_size
+    assert _sample("image_bytes_total", direction="in") == bytes_in + size
+    assert _sample("image_pixels_sum") >= 40 * 30
+
+    hits = _sample("cache_requests_total", cache="response", result="hit")
+    client.get("/api/paintings")
+    client.get("/api/paintings")
+    assert _sample("cache_requests_total", cache="response", result="hit") == hits + 1
+
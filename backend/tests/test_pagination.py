@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Painting, User
+
+
+def _seed(count, *, user_id=None, is_public=True):
+    base = datetime(2024, 1, 1)
+    for i in range(count):
+        db.session.add(Painting(
+            user_id=user_id,
+            title=f"p{i}",
+            filename=f"public/p{i}.png",
+            is_public=is_public,
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            created_at=base + timedelta(minutes=i // 2),
+        ))
+    db.session.commit()
+
+
+def test_cursor_pagination_walks_every_row_once(client, monkeypatch):
+    monkeypatch.setenv("RESULTS_PER_PAGE", "4")
+    _seed(11)
+
+    seen, cursor, pages = [], "", 0
+    while cursor is not None:
+        resp = client.get("/api/paintings", query_string={"cursor": cursor})
+        assert resp.status_code == 200
+        assert resp.json["total"] == 11
+        seen.extend(p["id"] for p in resp.json["paintings"])
+        cursor = resp.json["next_cursor"]
+        pages += 1
+
+    assert pages == 3
+    assert len(seen) == len(set(seen)) == 11
+    ordered = sorted(
+        Painting.query.all(), key=lambda p: (p.created_at, p.id), reverse=True
+    )
+    assert seen == [p.id for p in ordered]
+
+
+def test_cursor_pagination_can_skip_total(client, monkeypatch):
+    monkeypatch.setenv("RESULTS_PER_PAGE", "4")
+    _seed(3)
+
+    resp = client.get("/api/paintings", query_string={"cursor": "", "count": "none"})
+    assert resp.status_code == 200
+    assert resp.json["total"] is None
+    assert resp.json["next_cursor"] is None
+    assert len(resp.json["paintings"]) == 3
+
+
+def test_offset_pagination_count_none(client):
+    _seed(2)
+    resp = client.get("/api/paintings", query_string={"count": "none"})
+    assert resp.status_code == 200
+    assert resp.json["total"] is None
+    assert resp.json["pages"] is None
+    assert len(resp.json["paintings"]) == 2
+
+
+def test_cursor_scoped_to_user(client, monkeypatch):
+    monkeypatch.setenv("RESULTS_PER_PAGE", "2")
+    user = User(username="carol", email="c@example.com")
+    user.set_password("secret123")
+    db.session.add(user)
+    db.session.commit()
+    _seed(3, user_id=user.id, is_public=False)
+    _seed(2)
+
+    first = client.get("/api/paintings", query_string={"cursor": "", "user_id": user.id})
+    second = client.get(
+        "/api/paintings",
+        query_string={"cursor": first.json["next_cursor"], "user_id": user.id},
+    )
+    ids = [p["id"] for p in first.json["paintings"] + second.json["paintings"]]
+    assert len(ids) == 3
+    assert all(p["user_id"] == user.id for p in first.json["paintings"])
+    assert second.json["next_cursor"] is None
+
+
+def test_invalid_cursor_rejected(client):
+    resp = client.get("/api/paintings", query_string={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+
+def test_list_serialization_is_not_n_plus_one(client, query_counter, make_user):
+    owners = [make_user(f"owner{i}") for i in range(5)]
+    for owner in owners:
+        _seed(3, user_id=owner.id)
+    names = {o.username for o in owners}
+    first_owner = owners[0].id
+    db.session.expire_all()
+
+    query_counter.clear()
+    resp = client.get("/api/paintings")
+    # Scope version + COUNT + page SELECT, independent of how many owners are on the page
+    assert len(query_counter) == 3
+    assert resp.status_code == 200
+    assert len(resp.json["paintings"]) == 15
+    assert {p["username"] for p in resp.json["paintings"]} == names
+
+    # The whole response is cached until the next write
+    query_counter.clear()
+    assert client.get("/api/paintings").headers["X-Cache"] == "HIT"
+    assert len(query_counter) == 0
+
+    query_counter.clear()
+    resp = client.get("/api/paintings", query_string={"user_id": first_owner, "cursor": ""})
+    assert resp.status_code == 200
+    assert len(query_counter) == 4
@@ -0,0 +1,76 @@
+import pytest
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+from app.extensions import db
+from app.models import User
+from app.bootstrap import load_password_cost
+from app.models import AppMeta
+from app.utils.leases import LeaseStore
+from app.utils.passwords import HasherBusy, PasswordHasher, calibrate
+
+
+def test_cost_never_drops_below_werkzeug_default():
+    assert calibrate(0.001) == DEFAULT_PBKDF2_ITERATIONS
+    hasher = PasswordHasher(1000)
+    assert hasher.iterations == DEFAULT_PBKDF2_ITERATIONS
+    assert hasher.verify(hasher.hash("secret"), "secret")
+    assert hasher.needs_rehash(generate_password_hash("x", "pbkdf2:sha256:1000"))
+    assert hasher.needs_rehash(generate_password_hash("x", "scrypt"))
+    assert not hasher.needs_rehash(hasher.hash("x"))
+
+
+def test_saturated_pool_rejects_instead_of_queueing():
+    hasher = PasswordHasher(DEFAULT_PBKDF2_ITERATIONS, workers=1, queue=0, wait=0)
+    assert hasher._slots.acquire(blocking=False)
+    with pytest.raises(HasherBusy):
+        hasher.hash("secret")
+    assert hasher.rejected == 1
+    hasher._slots.release()
+    assert hasher.hash("secret")
+
+
+def test_hashing_slots_are_shared_across_workers(tmp_path):
+    store = LeaseStore(str(tmp_path / "leases.db"))
+    workers = [PasswordHasher(DEFAULT_PBKDF2_ITERATIONS, workers=1, wait=0.05, store=store) for _ in range(2)]
+    lease = workers[0]._lease(0)
+    with pytest.raises(HasherBusy):
+        workers[1].hash("secret")
+    workers[0]._unlease(lease)
+    assert workers[1].verify(workers[1].hash("secret"), "secret")
+    assert store.usage("hash") == (0, 0)
+
+
+@pytest.mark.config(PASSWORD_HASH_ITERATIONS=0)
+def test_cost_is_calibrated_once_at_bootstrap(app):
+    stored = int(db.session.get(AppMeta, "password_hash_iterations").value)
+    assert app.extensions["passwords"].iterations == stored >= DEFAULT_PBKDF2_ITERATIONS
+
+    app.extensions["passwords"].use_iterations(1)
+    load_password_cost(app)
+    assert app.extensions["passwords"].iterations == stored
+
+    app.config["PASSWORD_HASH_ITERATIONS"] = stored + 10_000
+    load_password_cost(app)
+    assert app.extensions["passwords"].iterations == stored + 10_000
+
+
+def test_login_upgrades_weak_hash(client, app):
+    user = User(username="ada", email="ada@example.com",
+                password_hash=generate_password_hash("secret1", "pbkdf2:sha256:1000"))
+    db.session.add(user)
+    db.session.commit()
+
+    resp = client.post("/api/auth/login", json={"username": "ada", "password": "secret1"})
+    assert resp.status_code == 200
+    db.session.expire_all()
+    stored = db.session.get(User, user.id).password_hash
+    assert stored.startswith(app.extensions["passwords"].method + "$")
+    assert client.post("/api/auth/login", json={"username": "ada", "password": "secret1"}).status_code == 200
+
+
+def test_login_returns_503_when_hashing_is_saturated(client, app):
+    app.extensions["passwords"] = hasher = PasswordHasher(DEFAULT_PBKDF2_ITERATIONS, workers=1, queue=0, wait=0)
+    hasher._slots.acquire()
+    resp = client.post("/api/auth/login", json={"username": "demo", "password": "demo123456"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
@@ -0,0 +1,42 @@
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from app.models import User
+from app.utils import query_budget as budgets
+from app.utils.query_budget import QueryBudgetExceeded, query_budget
+
+
+def test_query_count_header(client):
+    resp = client.get("/api/users")
+    assert resp.status_code == 200
+    assert resp.headers["X-Query-Count"] == "1"
+
+
+def test_budget_exceeded_fails_in_tests(app, client):
+    @app.get("/_test/greedy")
+    @query_budget(1)
+    def greedy():
+        User.query.all()
+        User.query.all()
+        return {"ok": True}
+
+    with pytest.raises(QueryBudgetExceeded, match="budget 1"):
+        client.get("/_test/greedy")
+
+
+@pytest.mark.parametrize("debug, expected", [(False, None), (True, "1")])
+def test_default_mode_counts_only_when_debugging(debug, expected):
+    app = Flask("plain")
+    app.config.update(DEBUG=debug, QUERY_BUDGET_MODE="")
+    engine = create_engine("sqlite://")
+    budgets.init_app(app, engine)
+
+    @app.get("/one")
+    def one():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    assert app.test_client().get("/one").headers.get("X-Query-Count") == expected
+    assert bool(engine.dispatch.before_cursor_execute) is debug
@@ -0,0 +1,77 @@
+import pytest
+
+from app.extensions import db
+from app.models import Painting
+from app.utils.query_stats import QueryStats, is_full_scan, statement_shape
+
+
+def test_statement_shape_collapses_literals():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND x = 'a'  LIMIT 10") == (
+        "SELECT * FROM t WHERE id IN (...) AND x = ? LIMIT ?"
+    )
+
+
+def test_full_scan_detection():
+    assert is_full_scan(["SCAN paintings"])
+    assert not is_full_scan(["SEARCH paintings USING INDEX idx_public_created_id (is_public=?)"])
+    assert not is_full_scan(["SCAN paintings USING COVERING INDEX idx"])
+    assert is_full_scan(["Seq Scan on paintings  (cost=0.00..1.01 rows=1 width=4)"])
+
+
+def test_slow_queries_captured_with_plan(client, app):
+    if db.engine.dialect.name != "sqlite":
+        pytest.skip("asserts SQLite query plans; PostgreSQL seq-scans tables this small")
+    app.config["ADMIN_TOKEN"] = "s3cret"
+    stats = app.extensions["query_stats"]
+    stats.slow_ms = 0  # treat every statement as slow
+    db.session.add(Painting(title="a", filename="a.png", is_public=True))
+    db.session.commit()
+    stats.reset()
+
+    client.get("/api/paintings", query_string={"count": "none"})
+    # Unindexed column: should be flagged as a full scan
+    db.session.query(Painting).filter(Painting.title == "a").all()
+
+    assert client.get("/api/admin/slow-queries").status_code == 403
+    resp = client.get("/api/admin/slow-queries", headers={"X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200
+    queries = resp.json["queries"]
+    listing = next(q for q in queries if "paintings.is_public" in q["shape"] and "LIMIT" in q["shape"])
+    assert listing["plan"] and not listing["full_scan"]
+    assert "paintings.list_paintings" in listing["endpoints"]
+    by_title = next(q for q in queries if "paintings.title = ?" in q["shape"])
+    assert by_title["full_scan"]
+
+
+class _Cursor:
+    """DBAPI cursor stand-in whose EXPLAIN fails, as on an unexplainable statement."""
+
+    def __init__(self):
+        self.connection = self
+        self.executed = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, parameters=()):
+        self.executed.append(sql)
+        if sql.startswith("EXPLAIN"):
+            raise RuntimeError("cannot explain")
+
+    def close(self):
+        pass
+
+
+def test_failed_explain_is_rolled_back_to_a_savepoint():
+    cursor = _Cursor()
+    assert QueryStats._explain(cursor, "SELECT 1", None, "postgresql") is None
+    assert cursor.executed == [
+        "SAVEPOINT query_stats_explain",
+        "EXPLAIN SELECT 1",
+        "ROLLBACK TO SAVEPOINT query_stats_explain",
+        "RELEASE SAVEPOINT query_stats_explain",
+    ]
+
+    cursor = _Cursor()
+    QueryStats._explain(cursor, "SELECT 1", None, "sqlite")
+    assert cursor.executed == ["EXPLAIN QUERY PLAN SELECT 1"]
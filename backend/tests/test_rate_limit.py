@@ -0,0 +1,133 @@
+from io import BytesIO
+
+import pytest
+
+from app.config import Config
+from app.extensions import limiter
+from app.utils.rate_limit import MemoryStore, SQLiteStore, parse_limit, slide
+
+
+def test_parse_limit():
+    assert parse_limit("50/minute") == (50, 60)
+    assert parse_limit("1000 per day") == (1000, 86400)
+    with pytest.raises(ValueError):
+        parse_limit("lots")
+
+
+def test_forced_charges_count_past_the_limit():
+    state, wait = slide(None, 0.0, limit=5, window=60, cost=8, force=True)
+    assert wait == 0 and state[1] == 8
+    assert slide(state, 1.0, limit=5, window=60)[1] > 0
+
+
+def test_sliding_window_weights_previous_window():
+    state = None
+    for _ in range(10):
+        state, wait = slide(state, 5.0, limit=10, window=10)
+        assert wait == 0
+    state, wait = slide(state, 9.0, limit=10, window=10)
+    assert wait == pytest.approx(2.0)  # one second into the next window, 10 * 0.9 + 1 fits
+    # Halfway into the next window the previous ten still weigh five
+    for _ in range(5):
+        state, wait = slide(state, 15.0, limit=10, window=10)
+        assert wait == 0
+    state, wait = slide(state, 15.0, limit=10, window=10)
+    assert 0 < wait <= 1
+    assert slide(state, 30.0, limit=10, window=10)[1] == 0
+
+
+def test_sqlite_store_is_shared_and_bounded(tmp_path):
+    path = str(tmp_path / "rl.db")
+    worker_a, worker_b = SQLiteStore(path, max_keys=3), SQLiteStore(path, max_keys=3)
+    assert worker_a.hit("ip:1", 0.5, 2, 60, 1) == 0
+    assert worker_b.hit("ip:1", 0.6, 2, 60, 1) == 0
+    assert worker_a.hit("ip:1", 0.7, 2, 60, 1) > 0
+
+    for n in range(2, 7):
+        worker_b.hit(f"ip:{n}", 1.0 + n, 2, 60, 1)
+    assert worker_a.evict() == 3
+    assert len(worker_b) == 3
+    assert worker_a.hit("ip:1", 10.0, 2, 60, 1) == 0  # evicted, so starts fresh
+
+
+def test_hit_all_charges_every_budget_or_none():
+    store = MemoryStore(max_keys=10)
+    assert store.hit_all([("ip:1", 10, 60), ("user:1", 1, 10)], 0.0, 1) == 0
+    # The user budget is spent: wait for it, not the roomier IP one, and charge nothing
+    wait = store.hit_all([("ip:1", 10, 60), ("user:1", 1, 10)], 1.0, 1)
+    assert wait == pytest.approx(store.hit("user:1", 1.0, 1, 10, 1))
+    assert wait > 0
+    assert [store.hit("ip:1", 2.0, 10, 60, 1) for _ in range(9)] == [0] * 9
+
+
+def test_memory_store_evicts_idle_keys():
+    store = MemoryStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.hit(key, 0.0, 5, 60, 1)
+    assert len(store) == 2
+
+
+def test_requests_over_the_limit_get_429(client, app):
+    app.config["ENABLE_RATE_LIMITS"] = True
+    limiter.budgets["ip"] = (2, 60)
+    assert client.get("/api/tags").status_code == 200
+    assert client.get("/api/tags").status_code == 200
+    resp = client.get("/api/tags")
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+    assert client.get("/api/health").status_code == 200
+
+
+def test_budgets_are_charged_by_cost(client, app):
+    app.config.update(ENABLE_RATE_LIMITS=True, RATE_LIMIT_COST_BYTES=1000)
+    limiter.budgets["ip"] = (10, 60)
+    upload = {"title": "big", "image": (BytesIO(b"x" * 5000), "big.png")}
+    assert client.post("/api/paintings", data=upload, content_type="multipart/form-data").status_code != 429
+
+    upload = {"title": "big", "image": (BytesIO(b"x" * 5000), "big.png")}
+    resp = client.post("/api/paintings", data=upload, content_type="multipart/form-data")
+    assert resp.status_code == 429
+    assert 1 <= int(resp.headers["Retry-After"]) <= 120
+    assert client.get("/api/tags").status_code == 200  # cheap reads still fit
+
+
+def test_signed_in_users_also_spend_their_own_budget(client, app, user, auth_headers):
+    app.config["ENABLE_RATE_LIMITS"] = True
+    limiter.budgets.update(ip=(5, 60), user=(2, 60))
+    headers = auth_headers(user)
+
+    assert [client.get("/api/tags", headers=headers).status_code for _ in range(3)] == [200, 200, 429]
+    # The rejected call was charged to neither budget, so the address has three left
+    assert [client.get("/api/tags").status_code for _ in range(4)] == [200, 200, 200, 429]
+
+
+def test_users_sharing_an_address_share_its_budget(client, app, make_user, auth_headers):
+    app.config["ENABLE_RATE_LIMITS"] = True
+    limiter.budgets.update(ip=(3, 60), user=(10, 60))
+    first, second = auth_headers(make_user("ann")), auth_headers(make_user("bob"))
+
+    assert client.get("/api/tags", headers=first).status_code == 200
+    assert client.get("/api/tags", headers=first).status_code == 200
+    assert client.get("/api/tags", headers=second).status_code == 200
+    resp = client.get("/api/tags", headers=second)
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+@pytest.fixture()
+def behind_proxy(monkeypatch):
+    monkeypatch.setattr(Config, "TRUSTED_PROXY_HOPS", 1)
+
+
+def test_clients_behind_the_proxy_get_their_own_budgets(behind_proxy, app, client):
+    app.config["ENABLE_RATE_LIMITS"] = True
+    limiter.budgets["ip"] = (1, 60)
+
+    def get(*forwarded_for):
+        return client.get("/api/tags", headers={"X-Forwarded-For": ", ".join(forwarded_for)}).status_code
+
+    assert get("203.0.113.1") == 200
+    assert get("203.0.113.1") == 429
+    assert get("203.0.113.2") == 200
+    # Only the entry added by the trusted proxy counts, not one the client made up
+    assert get("198.51.100.9", "203.0.113.1") == 429
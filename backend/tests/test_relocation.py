@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from app.extensions import db
+from app.file_reaper import pending_count
+from app.models import Painting
+
+
+@pytest.fixture()
+def user(make_user):
+    return make_user("lena")
+
+
+def _upload(client, png, user, folder="", is_public=False):
+    resp = client.post(
+        "/api/paintings",
+        data={"user_id": str(user.id), "title": "t", "folder": folder,
+              "is_public": str(is_public).lower(), "image": (png((8, 8), "green"), "t.png")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 201
+    return resp.json["painting"]["id"]
+
+
+def _paths(painting_id):
+    painting = db.session.get(Painting, painting_id)
+    db.session.refresh(painting)
+    return painting.filename, painting.thumbnail
+
+
+def _on_disk(app, paths):
+    return all(os.path.exists(os.path.join(app.config["IMAGE_DIR"], p)) for p in paths)
+
+
+def test_folder_rename_moves_subfolders_and_files(client, app, png, user, auth_headers):
+    a = _upload(client, png, user, "trips")
+    b = _upload(client, png, user, "trips/2024")
+    other = _upload(client, png, user, "misc")
+    old_paths = _paths(a) + _paths(b)
+
+    resp = client.patch("/api/folders", headers=auth_headers(user),
+                        json={"path": "trips", "new_path": "travel"})
+    assert resp.status_code == 200
+    assert resp.json["updated"] == 2
+
+    assert db.session.get(Painting, a).folder == "travel"
+    assert db.session.get(Painting, b).folder == "travel/2024"
+    assert _paths(a)[0].startswith("lena/travel/")
+    assert _paths(b)[0].startswith("lena/travel_2024/")
+    assert _on_disk(app, _paths(a) + _paths(b) + _paths(other))
+    assert not any(os.path.exists(os.path.join(app.config["IMAGE_DIR"], p)) for p in old_paths)
+    assert pending_count() == 0
+
+    tree = client.get("/api/folders", query_string={"user_id": user.id}).json["tree"]
+    assert {child["name"] for child in tree["children"]} == {"travel", "misc"}
+
+
+def test_visibility_change_moves_files(client, app, png, user, auth_headers):
+    painting_id = _upload(client, png, user, "sketches")
+    headers = auth_headers(user)
+
+    resp = client.put(f"/api/paintings/{painting_id}", headers=headers, data={"is_public": "true"})
+    assert resp.status_code == 200
+    assert _paths(painting_id)[0].startswith("public/sketches/")
+    assert _on_disk(app, _paths(painting_id))
+
+    resp = client.patch("/api/paintings", headers=headers,
+                        json={"ids": [painting_id], "changes": {"is_public": False, "folder": "done"}})
+    assert resp.status_code == 200
+    assert _paths(painting_id)[0].startswith("lena/done/")
+    assert _on_disk(app, _paths(painting_id))
+
+
+def test_failed_move_is_rolled_back(client, app, png, user, auth_headers):
+    first = _upload(client, png, user, "src")
+    second = _upload(client, png, user, "src")
+    before = _paths(first) + _paths(second)
+
+    # Occupy the destination of one file so its rename fails midway
+    blocked = os.path.join(app.config["IMAGE_DIR"], "public", "src", os.path.basename(_paths(second)[0]))
+    os.makedirs(os.path.dirname(blocked))
+    open(blocked, "wb").close()
+
+    resp = client.patch("/api/folders", headers=auth_headers(user), json={"path": "src", "is_public": True})
+    assert resp.status_code == 409
+    assert _paths(first) + _paths(second) == before
+    assert _on_disk(app, before)
+    assert not db.session.get(Painting, first).is_public
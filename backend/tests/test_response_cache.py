@@ -0,0 +1,56 @@
+from app.extensions import db
+from app.models import Painting
+
+
+def _painting(title, **fields):
+    painting = Painting(title=title, filename=f"public/{title}.png", is_public=True, **fields)
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def test_feed_served_from_cache_until_write(client, app, query_counter):
+    _painting("a")
+    assert client.get("/api/paintings").headers["X-Cache"] == "MISS"
+
+    query_counter.clear()
+    resp = client.get("/api/paintings", query_string={"page": "1 "})
+    assert resp.headers["X-Cache"] == "MISS"  # different normalized params
+    resp = client.get("/api/paintings")
+    assert resp.headers["X-Cache"] == "HIT"
+    assert resp.json["total"] == 1
+
+    _painting("b")
+    resp = client.get("/api/paintings")
+    assert resp.headers["X-Cache"] == "MISS"
+    assert resp.json["total"] == 2
+
+    stats = app.extensions["response_cache"].stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.25
+
+
+def test_scopes_and_errors_are_cached_separately(client, app):
+    _painting("public one")
+    private = _painting("private one", user_id=1)
+    private.is_public = False
+    db.session.commit()
+
+    assert client.get("/api/paintings").json["total"] == 1
+    assert client.get("/api/paintings", query_string={"user_id": 1}).json["total"] == 1
+    assert client.get("/api/paintings", query_string={"count": "bogus"}).status_code == 400
+    assert client.get("/api/paintings", query_string={"count": "bogus"}).headers.get("X-Cache") == "MISS"
+
+
+def test_admin_cache_endpoints(client, app):
+    app.config["ADMIN_TOKEN"] = "secret"
+    headers = {"X-Admin-Token": "secret"}
+    client.get("/api/search", query_string={"q": "x"})
+    client.get("/api/search", query_string={"q": "x"})
+
+    stats = client.get("/api/admin/cache", headers=headers).json
+    assert stats["backend"] == "memory"
+    assert stats["hits"] == 1 and stats["entries"] == 1
+
+    assert client.delete("/api/admin/cache", headers=headers).status_code == 200
+    assert client.get("/api/admin/cache", headers=headers).json["entries"] == 0
@@ -0,0 +1,95 @@
+from app.extensions import db
+from app.models import Painting
+
+
+def _painting(title, *, description="", tags="", is_public=True, folder=""):
+    painting = Painting(
+        title=title,
+        description=description,
+        tags=tags,
+        folder=folder,
+        is_public=is_public,
+        filename=f"public/{title}.png",
+    )
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def _titles(resp):
+    assert resp.status_code == 200
+    return [item["title"] for item in resp.json["items"]]
+
+
+def test_search_ranks_title_matches_first(client):
+    _painting("Harbor", description="boats in a watercolor harbor")
+    _painting("Watercolor sunset")
+    _painting("Unrelated")
+
+    resp = client.get("/api/search", query_string={"q": "watercolor"})
+    assert _titles(resp) == ["Watercolor sunset", "Harbor"]
+    assert resp.json["total"] == 2
+
+
+def test_search_prefix_and_all_words(client):
+    _painting("Mountain lake at dawn")
+    _painting("Mountain pass")
+
+    assert set(_titles(client.get("/api/search", query_string={"q": "mount"}))) == {
+        "Mountain pass", "Mountain lake at dawn"
+    }
+    assert _titles(client.get("/api/search", query_string={"q": "mount lak"})) == [
+        "Mountain lake at dawn"
+    ]
+
+
+def test_search_tag_matches_whole_tokens(client):
+    _painting("Cat", tags="cat, animal")
+    _painting("Catalog", tags="catalog")
+
+    assert _titles(client.get("/api/search", query_string={"tag": "cat"})) == ["Cat"]
+
+
+def test_search_index_follows_updates_and_deletes(client):
+    painting = _painting("Old name")
+    painting.title = "Fresh name"
+    db.session.commit()
+
+    assert _titles(client.get("/api/search", query_string={"q": "old"})) == []
+    assert _titles(client.get("/api/search", query_string={"q": "fresh"})) == ["Fresh name"]
+
+    db.session.delete(painting)
+    db.session.commit()
+    assert _titles(client.get("/api/search", query_string={"q": "fresh"})) == []
+
+
+def test_search_excludes_private_and_pages(client):
+    _painting("Secret sketch", is_public=False)
+    for i in range(3):
+        _painting(f"Sketch {i}")
+
+    resp = client.get("/api/search", query_string={"q": "sketch", "per_page": 2, "page": 2})
+    assert resp.json["total"] == 3
+    assert len(_titles(resp)) == 1
+
+
+def test_tsquery_builder_matches_fts_semantics():
+    from app.search_index import build_tsquery
+
+    assert build_tsquery("Mount  Lak!") == "mount:* & lak:*"
+    assert build_tsquery("  ") is None
+
+
+def test_bulk_insert_is_searchable_and_counted(client):
+    from app.bulk import bulk_insert_paintings
+    from app.models import Tag
+
+    with db.engine.begin() as conn:
+        ids = bulk_insert_paintings(conn, [
+            {"title": f"Bulk {i}", "filename": f"public/bulk{i}.png", "is_public": True,
+             "tags": "bulk"}
+            for i in range(3)
+        ])
+    assert ids == sorted(ids) and len(ids) == 3
+    assert len(_titles(client.get("/api/search", query_string={"q": "bulk"}))) == 3
+    assert db.session.query(Tag.painting_count).filter_by(name="bulk").scalar() == 3
@@ -0,0 +1,106 @@
+from sqlalchemy import text
+
+from app.extensions import db
+from app.models import Painting, Tag, painting_tags
+from app.tags import backfill_tags, parse_tags
+
+
+def _painting(title, tags, *, is_public=True):
+    painting = Painting(title=title, tags=tags, is_public=is_public, filename=f"public/{title}.png")
+    db.session.add(painting)
+    db.session.commit()
+    return painting
+
+
+def _counts():
+    return {t.name: (t.painting_count, t.public_count) for t in Tag.query.all()}
+
+
+def _titles(resp):
+    assert resp.status_code == 200
+    return sorted(p["title"] for p in resp.json["paintings"])
+
+
+def test_parse_tags_normalizes():
+    assert parse_tags(" Cat,  Oil   Paint ,cat,, ") == ["cat", "oil paint"]
+    assert parse_tags(None) == []
+
+
+def test_index_follows_painting_writes(app):
+    first = _painting("one", "cat, dog")
+    _painting("two", "cat", is_public=False)
+    assert _counts() == {"cat": (2, 1), "dog": (1, 1)}
+
+    first.tags = "dog, bird"
+    first.is_public = False
+    db.session.commit()
+    assert _counts() == {"cat": (1, 0), "dog": (1, 0), "bird": (1, 0)}
+
+    db.session.delete(first)
+    db.session.commit()
+    assert _counts() == {"cat": (1, 0)}
+    assert db.session.query(painting_tags).count() == 1
+
+
+def test_tag_filters_match_whole_tags(client):
+    _painting("a", "cat, animal")
+    _painting("b", "catalog")
+    _painting("c", "cat, dog")
+
+    assert _titles(client.get("/api/paintings?tag=cat")) == ["a", "c"]
+    assert _titles(client.get("/api/paintings?tag=cat&tag=dog")) == ["c"]
+    assert _titles(client.get("/api/paintings?tag=animal,dog&tag_mode=any")) == ["a", "c"]
+
+
+def test_popular_tags(client):
+    _painting("a", "cat, dog")
+    _painting("b", "cat")
+    _painting("c", "dog, secret", is_public=False)
+
+    resp = client.get("/api/tags/popular")
+    assert resp.json["tags"] == [{"name": "cat", "count": 2}, {"name": "dog", "count": 1}]
+
+    resp = client.get("/api/tags", query_string={"prefix": "d"})
+    assert [t["name"] for t in resp.json["tags"]] == ["dog"]
+
+
+def test_private_tags_are_listed_for_their_owner_only(client, make_user, auth_headers):
+    owner, other = make_user("ann"), make_user("bob")
+    _painting("a", "shared")
+    private = _painting("b", "shared, secret", is_public=False)
+    private.user_id = owner.id
+    db.session.commit()
+
+    def names(path, user=None, **params):
+        resp = client.get(path, query_string=params, headers=auth_headers(user) if user else {})
+        assert resp.status_code == 200
+        return [t["name"] for t in resp.json["tags"]]
+
+    assert names("/api/tags") == ["shared"]
+    assert names("/api/tags", prefix="se") == []
+    assert names("/api/tags", other, prefix="se") == []
+    assert names("/api/tags", owner, prefix="se") == ["secret"]
+    assert names("/api/tags/popular", user_id=owner.id) == []
+    assert names("/api/tags/popular", owner, user_id=owner.id) == ["secret", "shared"]
+
+
+def test_prefix_at_the_top_of_unicode(client):
+    _painting("a", "z\U0010ffff, z\U0010ffffy, \ud7ffa, zz")
+    for prefix, names in (("\U0010ffff", []), ("z\U0010ffff", ["z\U0010ffff", "z\U0010ffffy"]),
+                          ("\ud7ff", ["\ud7ffa"])):
+        resp = client.get("/api/tags", query_string={"prefix": prefix})
+        assert resp.status_code == 200
+        assert [t["name"] for t in resp.json["tags"]] == names
+
+
+def test_backfill_from_existing_column(app):
+    # Simulate rows written before the index existed
+    db.session.execute(text(
+        "INSERT INTO paintings (title, filename, tags, is_public, format, folder, created_at, updated_at) "
+        "VALUES ('old', 'x.png', 'Legacy, Cat', TRUE, 'png', '', '2024-01-01', '2024-01-01')"
+    ))
+    db.session.commit()
+    assert _counts() == {}
+
+    backfill_tags()
+    assert _counts() == {"legacy": (1, 1), "cat": (1, 1)}
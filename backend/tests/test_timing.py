@@ -0,0 +1,67 @@
+import logging
+
+import pytest
+
+from app.config import Config
+
+
+def _stages(resp):
+    header = resp.headers["Server-Timing"]
+    return {entry.split(";")[0]: float(entry.split("dur=")[1]) for entry in header.split(", ")}
+
+
+def test_upload_reports_stage_timings(client, png):
+    resp = client.post("/api/paintings", data={"title": "t", "image": (png(), "t.png")},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 201
+    stages = _stages(resp)
+    for name in ("read", "quota", "probe", "queue", "write", "decode", "thumbnail", "encode",
+                 "commit", "db", "total"):
+        assert name in stages
+    assert stages["total"] >= stages["decode"] + stages["thumbnail"] + stages["encode"]
+
+
+def test_media_reports_stage_timings(client, png):
+    created = client.post("/api/paintings", data={"title": "t", "image": (png(), "t.png")},
+                          content_type="multipart/form-data").json["painting"]
+    resp = client.get(created["image_url"])
+    assert resp.status_code == 200
+    assert {"lookup", "open", "total"} <= set(_stages(resp))
+    resp.close()
+
+    missing = client.get("/media/images/nope.png")
+    assert missing.status_code == 404
+    assert "lookup" in _stages(missing)
+
+
+def test_slow_requests_are_logged_with_fields(app, client, caplog):
+    app.config["SLOW_REQUEST_MS"] = 0
+    with caplog.at_level(logging.INFO, logger="app.utils.timing"):
+        client.get("/media/images/nope.png")
+    record = next(r for r in caplog.records if r.name == "app.utils.timing")
+    assert record.levelno == logging.INFO
+    assert record.timings["status"] == 404
+    assert record.timings["endpoint"] == "media.serve_image"
+    assert "lookup_ms" in record.timings
+
+
+@pytest.fixture()
+def metrics_off(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", False)
+
+
+def test_db_time_does_not_need_metrics(metrics_off, app, client):
+    resp = client.get("/api/tags")
+    assert resp.status_code == 200
+    assert "db" in _stages(resp)
+    assert client.get("/metrics").status_code == 404
+
+
+def test_cors_exposes_timing_and_validators(client):
+    resp = client.options("/api/paintings", headers={
+        "Origin": "https://gallery.example", "Access-Control-Request-Method": "PATCH"})
+    assert "PATCH" in resp.headers["Access-Control-Allow-Methods"]
+
+    resp = client.get("/api/paintings", headers={"Origin": "https://gallery.example"})
+    exposed = {h.strip().lower() for h in resp.headers["Access-Control-Expose-Headers"].split(",")}
+    assert {"etag", "server-timing", "retry-after"} <= exposed
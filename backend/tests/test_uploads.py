@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from app.extensions import db
+from app.models import Painting, UploadChunk, UploadSession
+from app.uploads import claim, expire_sessions, spool_path
+
+
+def _open(client, size, **extra):
+    resp = client.post("/api/uploads", json={"filename": "canvas.png", "size": size,
+                                             "title": "Canvas", "tags": "big", **extra})
+    assert resp.status_code == 201
+    return resp.json
+
+
+def _put(client, upload_id, offset, chunk):
+    return client.put(f"/api/uploads/{upload_id}?offset={offset}", data=chunk,
+                      content_type="application/octet-stream")
+
+
+def test_chunks_in_any_order_then_finalize(client, png):
+    data = png((120, 80), "green").getvalue()
+    upload = _open(client, len(data), is_public=True)
+    half = len(data) // 2
+
+    resp = _put(client, upload["id"], half, data[half:])
+    assert resp.json["received"] == [[half, len(data)]]
+    assert not resp.json["complete"]
+    assert client.post(f"/api/uploads/{upload['id']}/complete").status_code == 409
+
+    _put(client, upload["id"], half, data[half:])  # retried chunk is harmless
+    assert _put(client, upload["id"], 0, data[:half]).json["complete"]
+    assert client.get(f"/api/uploads/{upload['id']}").json["received"] == [[0, len(data)]]
+
+    resp = client.post(f"/api/uploads/{upload['id']}/complete")
+    assert resp.status_code == 201
+    painting = resp.json["painting"]
+    assert (painting["title"], painting["tags"], painting["width"], painting["is_public"]) == ("Canvas", "big", 120, True)
+    assert db.session.get(UploadSession, upload["id"]) is None
+    assert not os.path.exists(spool_path(upload["id"]))
+    assert client.get(f"/api/uploads/{upload['id']}").status_code == 404
+
+
+def test_parallel_chunks(app, png):
+    data = png((120, 80), "green").getvalue()
+    with app.test_client() as client:
+        upload = _open(client, len(data))
+    size = 64
+    offsets = range(0, len(data), size)
+
+    def send(offset):
+        with app.app_context(), app.test_client() as worker:
+            return _put(worker, upload["id"], offset, data[offset:offset + size]).status_code
+
+    with ThreadPoolExecutor(4) as pool:
+        assert set(pool.map(send, offsets)) == {200}
+    with app.test_client() as client:
+        assert client.post(f"/api/uploads/{upload['id']}/complete").status_code == 201
+    assert Painting.query.count() == 1
+
+
+def test_stale_finalize_claim_is_taken_over(client, app, png):
+    data = png().getvalue()
+    upload = _open(client, len(data))
+    _put(client, upload["id"], 0, data)
+    # A worker claimed the session and died before finishing
+    assert claim(upload["id"])
+    assert client.post(f"/api/uploads/{upload['id']}/complete").status_code == 409
+
+    stale = datetime.utcnow() - timedelta(seconds=app.config["UPLOAD_FINALIZE_TIMEOUT"] + 1)
+    db.session.get(UploadSession, upload["id"]).claimed_at = stale
+    db.session.commit()
+    assert client.post(f"/api/uploads/{upload['id']}/complete").status_code == 201
+    assert Painting.query.count() == 1
+
+
+def test_rejects_bad_chunks_and_expires_sessions(client):
+    upload = _open(client, 10)
+    assert _put(client, upload["id"], 8, b"xyz").status_code == 416
+    assert client.put(f"/api/uploads/{upload['id']}", data=b"x").status_code == 400
+    assert client.post("/api/uploads", json={"filename": "x.exe", "size": 5}).status_code == 400
+    _put(client, upload["id"], 0, b"abc")
+
+    assert expire_sessions() == 0
+    assert expire_sessions(datetime.utcnow() + timedelta(days=2)) == 1
+    assert UploadChunk.query.count() == 0
+    assert not os.path.exists(spool_path(upload["id"]))
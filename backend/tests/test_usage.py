@@ -0,0 +1,51 @@
+from app.extensions import db
+from app.models import Painting, UserUsage
+from app.usage import reconcile_usage
+
+
+def _upload(client, png, user_id):
+    return client.post(
+        "/api/paintings",
+        data={"user_id": str(user_id), "title": "t", "image": (png(color="red"), "t.png")},
+        content_type="multipart/form-data",
+    )
+
+
+def test_usage_follows_uploads_and_deletes(client, png, user):
+    assert _upload(client, png, user.id).status_code == 201
+    assert _upload(client, png, user.id).status_code == 201
+
+    usage = client.get(f"/api/users/{user.id}/usage").json["usage"]
+    sizes = db.session.query(Painting.file_size, Painting.thumbnail_size).all()
+    assert usage["painting_count"] == 2
+    assert usage["original_bytes"] == sum(f for f, _ in sizes) > 0
+    assert usage["derivative_bytes"] == sum(t for _, t in sizes) > 0
+
+    db.session.delete(Painting.query.first())
+    db.session.commit()
+    assert client.get(f"/api/users/{user.id}/usage").json["usage"]["painting_count"] == 1
+
+
+def test_quota_rejects_before_saving(client, app, png, user):
+    app.config["QUOTA_MAX_PAINTINGS"] = 1
+    assert _upload(client, png, user.id).status_code == 201
+
+    resp = _upload(client, png, user.id)
+    assert resp.status_code == 403
+    assert "quota" in resp.json["error"].lower()
+    assert Painting.query.count() == 1
+
+    app.config.update(QUOTA_MAX_PAINTINGS=0, QUOTA_MAX_BYTES=10)
+    assert _upload(client, png, user.id).status_code == 403
+
+
+def test_reconcile_repairs_drift(client, png, user):
+    _upload(client, png, user.id)
+    db.session.get(UserUsage, user.id).painting_count = 7
+    db.session.commit()
+
+    drift = reconcile_usage()
+    assert [item["user_id"] for item in drift] == [user.id]
+    db.session.expire_all()
+    assert db.session.get(UserUsage, user.id).painting_count == 1
+    assert reconcile_usage() == []
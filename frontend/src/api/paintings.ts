@@ -21,10 +21,13 @@ export type Painting = {
 
 export type PaginatedPaintings = {
   paintings: Painting[];
-  total: number;
-  page: number;
+  // null when requested with `count: "none"`
+  total: number | null;
+  page?: number;
   per_page: number;
-  pages: number;
+  pages?: number | null;
+  // Present in cursor mode (`cursor` param); null on the last page
+  next_cursor?: string | null;
 };
 
 export const fetchPaintings = async (params: Record<string, unknown>) => {
@@ -34,6 +37,50 @@ export const fetchPaintings = async (params: Record<string, unknown>) => {
   return data;
 };
 
+export type SearchResults = {
+  items: Painting[];
+  total: number | null;
+  page: number;
+  per_page: number;
+};
+
+export const searchPaintings = async (params: Record<string, unknown>) => {
+  const { data } = await api.get<SearchResults>("/api/search", { params });
+  return data;
+};
+
+export type FacetValue = { value: string; count: number };
+
+export type Facets = {
+  total: number;
+  // Tag-filtered counts cover only the newest matches when true
+  truncated?: boolean;
+  format: FacetValue[];
+  folder: FacetValue[];
+  tag: FacetValue[];
+};
+
+export const fetchFacets = async (params: Record<string, unknown>) => {
+  const { data } = await api.get<Facets>("/api/facets", { params });
+  return data;
+};
+
+export type FolderNode = {
+  name: string;
+  path: string;
+  painting_count: number;
+  total_bytes: number;
+  subtree_count: number;
+  subtree_bytes: number;
+  latest: { painting_id: number; thumbnail_url: string | null; created_at: string | null } | null;
+  children: FolderNode[];
+};
+
+export const fetchFolderTree = async (params: Record<string, unknown>) => {
+  const { data } = await api.get<{ scope: string; tree: FolderNode }>("/api/folders", { params });
+  return data;
+};
+
 export const fetchPainting = async (id: string) => {
   const { data } = await api.get<Painting>(`/api/paintings/${id}`);
   return data;
@@ -51,6 +98,103 @@ export const updatePainting = async (id: string, payload: FormData | object) =>
   return data;
 };
 
+export type BulkPaintingChanges = {
+  title?: string;
+  description?: string;
+  folder?: string;
+  tags?: string;
+  is_public?: boolean;
+  add_tags?: string[];
+  remove_tags?: string[];
+};
+
+export const bulkUpdatePaintings = async (ids: number[], changes: BulkPaintingChanges) => {
+  const { data } = await api.patch<{ updated: number; ids: number[] }>("/api/paintings", { ids, changes });
+  return data;
+};
+
+export const deletePainting = async (id: number | string) => {
+  const { data } = await api.delete<{ id: number }>(`/api/paintings/${id}`);
+  return data;
+};
+
+export const bulkDeletePaintings = async (ids: number[]) => {
+  const { data } = await api.delete<{ deleted: number; ids: number[] }>("/api/paintings", { data: { ids } });
+  return data;
+};
+
+export const updateFolder = async (payload: { path: string; new_path?: string; is_public?: boolean }) => {
+  const { data } = await api.patch<{ path: string; updated: number }>("/api/folders", payload);
+  return data;
+};
+
+export type UploadSession = {
+  id: string;
+  filename: string;
+  size: number;
+  // Merged [start, end) byte ranges already stored
+  received: [number, number][];
+  complete: boolean;
+  expires_at: string;
+  chunk_size?: number;
+};
+
+export type UploadMeta = {
+  title?: string;
+  folder?: string;
+  is_public?: boolean;
+  description?: string;
+  tags?: string;
+};
+
+export const createUpload = async (payload: UploadMeta & { filename: string; size: number }) => {
+  const { data } = await api.post<UploadSession>("/api/uploads", payload);
+  return data;
+};
+
+export const getUpload = async (id: string) => {
+  const { data } = await api.get<UploadSession>(`/api/uploads/${id}`);
+  return data;
+};
+
+export const uploadChunk = async (id: string, offset: number, chunk: Blob) => {
+  const { data } = await api.put<UploadSession>(`/api/uploads/${id}`, chunk, {
+    params: { offset },
+    headers: { "Content-Type": "application/octet-stream" },
+  });
+  return data;
+};
+
+export const completeUpload = async (id: string) => {
+  const { data } = await api.post<{ painting: Painting }>(`/api/uploads/${id}/complete`);
+  return data;
+};
+
+// Send `file` in parallel chunks, skipping ranges the server already has.
+// Pass the id of an interrupted upload as `resumeId` to continue it.
+export const resumableUpload = async (
+  file: File,
+  meta: UploadMeta = {},
+  { parallel = 3, resumeId }: { parallel?: number; resumeId?: string } = {}
+) => {
+  const session = resumeId
+    ? await getUpload(resumeId)
+    : await createUpload({ ...meta, filename: file.name, size: file.size });
+  const chunkSize = session.chunk_size ?? 4 * 1024 * 1024;
+  const pending: number[] = [];
+  for (let offset = 0; offset < file.size; offset += chunkSize) {
+    const end = Math.min(offset + chunkSize, file.size);
+    if (!session.received.some(([start, stop]) => start <= offset && end <= stop)) pending.push(offset);
+  }
+  const worker = async () => {
+    for (let offset = pending.shift(); offset !== undefined; offset = pending.shift()) {
+      await uploadChunk(session.id, offset, file.slice(offset, offset + chunkSize));
+    }
+  };
+  await Promise.all(Array.from({ length: parallel }, worker));
+  return completeUpload(session.id);
+};
+
 export const importRemoteImage = async (payload: { image_url: string; format?: string }) => {
   // The backend will attempt to import AND save the image as a painting when possible.
   const { data } = await api.post<any>("/api/paintings/import-url", payload);
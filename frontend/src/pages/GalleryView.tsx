@@ -1,6 +1,6 @@
 import { useQuery, useQueryClient } from "@tanstack/react-query";
 import { useEffect } from "react";
-import { fetchPaintings } from "../api/paintings";
+import { fetchPaintings, searchPaintings } from "../api/paintings";
 import { useGalleryStore } from "../store/galleryStore";
 import GalleryGrid from "../components/GalleryGrid";
 import FolderBreadcrumbs from "../components/FolderBreadcrumbs";
@@ -18,14 +18,21 @@ const GalleryView = () => {
 
   const { data, isLoading } = useQuery({
     queryKey: ["paintings", search, folder, tag, format, viewMode, userId],
-    queryFn: () =>
-      fetchPaintings({
+    queryFn: async () => {
+      const params = {
         q: search,
         folder,
         tag: tag || undefined,
         format: format === "ALL" ? undefined : format,
         ...(userId ? { user_id: userId } : {})
-      })
+      };
+      // Text queries go through the ranked full-text search endpoint
+      if (search) {
+        const results = await searchPaintings(params);
+        return { paintings: results.items };
+      }
+      return fetchPaintings(params);
+    }
   });
 
   const queryClient = useQueryClient();